@@ -0,0 +1,73 @@
+import time
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Turma
+
+
+# ======================== ANOS LETIVOS ========================
+# Lista de anos que têm turmas (geral e por professor), usada nos filtros de
+# ano das telas. Fica em cache sob uma versão única que os signals de Turma e
+# Disciplina trocam a cada alteração.
+
+ANOS_TIMEOUT = 60 * 60 * 24
+CHAVE_VERSAO = 'anos_letivos:versao'
+SESSAO_ANO_PROFESSOR = 'ano_filtro_professor'
+
+
+def versao_anos():
+    versao = cache.get(CHAVE_VERSAO)
+    if versao is None:
+        versao = time.time_ns()
+        cache.set(CHAVE_VERSAO, versao, None)
+    return versao
+
+
+def invalidar_anos():
+    cache.set(CHAVE_VERSAO, time.time_ns(), None)
+
+
+def anos_com_turmas(professor=None):
+    """Anos (decrescente) com turmas; com professor, só onde ele leciona"""
+    professor_id = professor.id if professor else None
+    chave = f'anos_letivos:{versao_anos()}:{professor_id or "todos"}'
+
+    anos = cache.get(chave)
+    if anos is None:
+        turmas = Turma.objects.all()
+        if professor_id:
+            turmas = turmas.filter(disciplina__professor_id=professor_id)
+
+        anos = list(turmas.order_by('-ano').values_list('ano', flat=True).distinct())
+        cache.set(chave, anos, ANOS_TIMEOUT)
+
+    return anos
+
+
+def escolher_ano(request, professor=None):
+    """Resolve o ano do filtro (GET → sessão do professor → ano atual).
+
+    Retorna (ano_filtro, anos_disponiveis), com o ano escolhido sempre
+    presente na lista.
+    """
+    ano_atual = timezone.localdate().year
+    padrao = request.session.get(SESSAO_ANO_PROFESSOR, ano_atual) if professor else ano_atual
+
+    ano_filtro = request.GET.get('ano')
+    try:
+        ano_filtro = int(ano_filtro) if ano_filtro else padrao
+    except ValueError:
+        ano_filtro = padrao
+    else:
+        # Se veio do GET, o professor leva o ano para as outras telas
+        if professor and request.GET.get('ano'):
+            request.session[SESSAO_ANO_PROFESSOR] = ano_filtro
+
+    anos_disponiveis = list(anos_com_turmas(professor)) or [ano_atual]
+
+    if ano_filtro not in anos_disponiveis:
+        anos_disponiveis.append(ano_filtro)
+        anos_disponiveis.sort(reverse=True)
+
+    return ano_filtro, anos_disponiveis
@@ -0,0 +1,182 @@
+import time
+
+from django.core.cache import cache
+from django.db.models import F, FilteredRelation, Q
+
+from .models import Disciplina, Nota, expressao_media, expressao_situacao
+
+
+# ======================== BOLETIM DO ALUNO ========================
+# O boletim fica em cache por aluno e só é refeito quando muda uma nota dele
+# (invalidar_boletim_aluno) ou as disciplinas da turma (invalidar_boletins_turma).
+
+BOLETIM_TIMEOUT = 60 * 60 * 24
+BIMESTRES = ('nota1', 'nota2', 'nota3', 'nota4')
+
+
+def chave_boletim(aluno_id):
+    return f'boletim:aluno:{aluno_id}'
+
+
+def chave_versao_turma(turma_id):
+    return f'boletim:turma:{turma_id}:versao'
+
+
+def versao_turma(turma_id):
+    versao = cache.get(chave_versao_turma(turma_id))
+    if versao is None:
+        versao = time.time_ns()
+        cache.set(chave_versao_turma(turma_id), versao, None)
+    return versao
+
+
+def invalidar_boletim_aluno(aluno_id):
+    cache.delete(chave_boletim(aluno_id))
+
+
+def invalidar_boletins_turma(turma_id):
+    """Troca a versão da turma → todos os boletins dela deixam de valer (O(1))"""
+    cache.set(chave_versao_turma(turma_id), time.time_ns(), None)
+
+
+def montar_boletim(aluno):
+    """Monta o boletim com uma consulta só (disciplinas + professor + nota do aluno)"""
+    disciplinas = (
+        Disciplina.objects.filter(turma_id=aluno.turma_id)
+        .annotate(nota_aluno=FilteredRelation('nota', condition=Q(nota__aluno_id=aluno.id)))
+        .annotate(
+            nota_id=F('nota_aluno__id'),
+            media_aluno=expressao_media('nota_aluno__'),
+            **{campo: F(f'nota_aluno__{campo}') for campo in BIMESTRES}
+        )
+        .annotate(situacao_aluno=expressao_situacao(F('media_aluno')))
+        .values(
+            'id', 'nome', 'professor__nome_completo', 'nota_id', 'media_aluno', 'situacao_aluno', *BIMESTRES
+        )
+        .order_by('id')
+    )
+    return resumir_boletim(disciplinas)
+
+
+def montar_boletins(alunos):
+    """Boletins de vários alunos de uma vez, sem cache: {aluno_id: boletim}.
+
+    Duas consultas no total (disciplinas das turmas e notas dessas
+    disciplinas), em vez de uma por aluno como em montar_boletim.
+    """
+    turma_ids = {aluno.turma_id for aluno in alunos}
+
+    disciplinas_por_turma = {}
+    for d in (
+        Disciplina.objects.filter(turma_id__in=turma_ids)
+        .values('id', 'turma_id', 'nome', 'professor__nome_completo')
+        .order_by('id')
+    ):
+        disciplinas_por_turma.setdefault(d['turma_id'], []).append(d)
+
+    notas = {
+        (n['aluno_id'], n['disciplina_id']): n
+        for n in (
+            Nota.objects.filter(disciplina__turma_id__in=turma_ids)
+            .annotate(media_aluno=expressao_media())
+            .annotate(situacao_aluno=expressao_situacao(F('media_aluno')))
+            .values('id', 'aluno_id', 'disciplina_id', 'media_aluno', 'situacao_aluno', *BIMESTRES)
+        )
+    }
+
+    boletins = {}
+    for aluno in alunos:
+        linhas = []
+        for d in disciplinas_por_turma.get(aluno.turma_id, []):
+            nota = notas.get((aluno.id, d['id']), {})
+            linhas.append({
+                **d,
+                'nota_id': nota.get('id'),
+                'media_aluno': nota.get('media_aluno'),
+                'situacao_aluno': nota.get('situacao_aluno'),
+                **{campo: nota.get(campo) for campo in BIMESTRES},
+            })
+        boletins[aluno.id] = resumir_boletim(linhas)
+    return boletins
+
+
+def resumir_boletim(disciplinas):
+    """Boletim a partir de uma linha por disciplina da turma (com a nota do aluno ou None)"""
+    disciplinas_com_notas = []
+    soma_medias = 0
+    total_disciplinas_com_media = 0
+    total_notas_lancadas = 0
+
+    # LÓGICA DA SITUAÇÃO GERAL
+    tem_reprovacao = False
+    tem_recuperacao = False
+    todas_aprovadas = True
+
+    for d in disciplinas:
+        nota = None
+
+        if d['nota_id'] is not None:
+            valores = [d[campo] for campo in BIMESTRES]
+            nota = dict(zip(BIMESTRES, valores), media=d['media_aluno'], situacao=d['situacao_aluno'])
+            total_notas_lancadas += sum(1 for v in valores if v is not None)
+
+        disciplinas_com_notas.append({
+            'disciplina': {
+                'id': d['id'],
+                'nome': d['nome'],
+                'professor': {'nome_completo': d['professor__nome_completo']},
+            },
+            'nota': nota,
+        })
+
+        if nota and nota['media']:
+            soma_medias += nota['media']
+            total_disciplinas_com_media += 1
+
+            if nota['situacao'] == 'reprovado':
+                tem_reprovacao = True
+                todas_aprovadas = False
+            elif nota['situacao'] == 'recuperacao':
+                tem_recuperacao = True
+                todas_aprovadas = False
+        else:
+            todas_aprovadas = False
+
+    total_notas_possiveis = len(disciplinas_com_notas) * 4
+    media_geral = soma_medias / total_disciplinas_com_media if total_disciplinas_com_media > 0 else None
+
+    # SITUAÇÃO GERAL (só quando todas as notas já foram lançadas)
+    situacao_geral, situacao_classe = "--", ""
+    if total_notas_lancadas == total_notas_possiveis and total_notas_possiveis > 0:
+        if tem_reprovacao:
+            situacao_geral, situacao_classe = "Reprovado", "reprovado"
+        elif tem_recuperacao:
+            situacao_geral, situacao_classe = "Recuperação", "recuperacao"
+        elif todas_aprovadas:
+            situacao_geral, situacao_classe = "Aprovado", "aprovado"
+
+    return {
+        'disciplinas_com_notas': disciplinas_com_notas,
+        'media_geral': media_geral,
+        'total_notas_lancadas': total_notas_lancadas,
+        'total_notas_possiveis': total_notas_possiveis,
+        'situacao_geral': situacao_geral,
+        'situacao_classe': situacao_classe,
+    }
+
+
+def obter_boletim(aluno):
+    """Boletim do aluno vindo do cache; refeito se a turma ou a versão mudou"""
+    versao = versao_turma(aluno.turma_id)
+    guardado = cache.get(chave_boletim(aluno.id))
+
+    if guardado and guardado['turma_id'] == aluno.turma_id and guardado['versao'] == versao:
+        return guardado['boletim']
+
+    boletim = montar_boletim(aluno)
+    cache.set(
+        chave_boletim(aluno.id),
+        {'turma_id': aluno.turma_id, 'versao': versao, 'boletim': boletim},
+        BOLETIM_TIMEOUT,
+    )
+    return boletim
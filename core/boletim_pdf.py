@@ -0,0 +1,47 @@
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import cm
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+
+# ======================== BOLETIM EM PDF ========================
+# Só desenha: recebe o boletim já montado (listas de texto) e devolve os bytes
+# do PDF. Não importa nada do Django, para rodar nos processos do pool sem
+# configurar o projeto nem abrir conexão com o banco.
+
+ESTILO_TABELA = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1e3a8a')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('ALIGN', (2, 0), (-1, -1), 'CENTER'),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#cbd5e1')),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f1f5f9')]),
+])
+
+
+def renderizar_boletim(boletim):
+    """boletim: {'titulo', 'cabecalho': [linhas], 'tabela': [[...]], 'rodape': [linhas]} → bytes"""
+    estilos = getSampleStyleSheet()
+    saida = BytesIO()
+    documento = SimpleDocTemplate(
+        saida, pagesize=A4, title=boletim['titulo'],
+        leftMargin=1.5 * cm, rightMargin=1.5 * cm, topMargin=1.5 * cm, bottomMargin=1.5 * cm,
+    )
+
+    tabela = Table(boletim['tabela'], repeatRows=1, colWidths=[4.5 * cm, 4.5 * cm] + [1.3 * cm] * 5 + [2.2 * cm])
+    tabela.setStyle(ESTILO_TABELA)
+
+    documento.build([
+        Paragraph(escape(boletim['titulo']), estilos['Title']),
+        *[Paragraph(escape(linha), estilos['Normal']) for linha in boletim['cabecalho']],
+        Spacer(1, 0.5 * cm),
+        tabela,
+        Spacer(1, 0.5 * cm),
+        *[Paragraph(escape(linha), estilos['Normal']) for linha in boletim['rodape']],
+    ])
+    return saida.getvalue()
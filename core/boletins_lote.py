@@ -0,0 +1,94 @@
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from pypdf import PdfWriter
+
+from .boletim import montar_boletins
+from .boletim_pdf import renderizar_boletim
+from .models import SITUACOES
+
+
+# ======================== BOLETINS EM LOTE ========================
+# Fim de bimestre: gera o boletim em PDF de todos os alunos de uma turma ou
+# de um ano. Os dados são os do boletim do painel_aluno, mas montados para
+# todos os alunos com poucas consultas (montar_boletins) no processo
+# principal; só o desenho dos PDFs, que é o que pesa, vai para um pool de
+# processos.
+
+FORMATOS = ('zip', 'pdf')
+
+
+def formatar_nota(valor):
+    return '--' if valor is None else f'{valor:.1f}'.replace('.', ',')
+
+
+def boletim_para_pdf(aluno, boletim):
+    """Boletim do aluno em listas de texto, prontas para o renderizador"""
+    tabela = [['Disciplina', 'Professor', '1º', '2º', '3º', '4º', 'Média', 'Situação']]
+    for item in boletim['disciplinas_com_notas']:
+        nota = item['nota'] or {}
+        tabela.append([
+            item['disciplina']['nome'],
+            item['disciplina']['professor']['nome_completo'],
+            *[formatar_nota(nota.get(f'nota{b}')) for b in range(1, 5)],
+            formatar_nota(nota.get('media')),
+            SITUACOES.get(nota.get('situacao'), '--'),
+        ])
+
+    return {
+        'titulo': f'Boletim Escolar {aluno.turma.ano}',
+        'cabecalho': [
+            f'Aluno(a): {aluno.nome_completo}',
+            f'Turma: {aluno.turma.nome} — {aluno.turma.get_turno_display()}',
+        ],
+        'tabela': tabela,
+        'rodape': [
+            f"Média geral: {formatar_nota(boletim['media_geral'])}",
+            f"Situação: {boletim['situacao_geral']}",
+        ],
+    }
+
+
+def nome_arquivo(aluno):
+    return f'{aluno.turma.nome} - {aluno.nome_completo} ({aluno.id}).pdf'.replace('/', '-')
+
+
+def gerar_boletins(alunos, saida, formato='zip', processos=None, progresso=None):
+    """Escreve os boletins dos alunos (queryset) em saida, como zip ou PDF único.
+
+    processos: tamanho do pool (padrão: todos os núcleos).
+    progresso: função chamada com (prontos, total) a cada boletim.
+    Retorna quantos boletins foram gerados.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f'Formato deve ser um de {FORMATOS}.')
+
+    alunos = list(alunos.select_related('turma').order_by('turma__nome', 'nome_completo', 'id'))
+    boletins = montar_boletins(alunos)
+    dados = [boletim_para_pdf(aluno, boletins[aluno.id]) for aluno in alunos]
+    total = len(dados)
+
+    processos = processos or os.cpu_count() or 1
+    # Lotes grandes o bastante para diluir o custo de enviar aos processos
+    tamanho_lote = max(1, min(32, total // (processos * 4) or 1))
+
+    with ProcessPoolExecutor(max_workers=processos) as pool:
+        pdfs = pool.map(renderizar_boletim, dados, chunksize=tamanho_lote)
+
+        if formato == 'zip':
+            with zipfile.ZipFile(saida, 'w', zipfile.ZIP_DEFLATED) as arquivo:
+                for prontos, (aluno, pdf) in enumerate(zip(alunos, pdfs), start=1):
+                    arquivo.writestr(nome_arquivo(aluno), pdf)
+                    if progresso:
+                        progresso(prontos, total)
+        else:
+            unico = PdfWriter()
+            for prontos, pdf in enumerate(pdfs, start=1):
+                unico.append(BytesIO(pdf))
+                if progresso:
+                    progresso(prontos, total)
+            unico.write(saida)
+
+    return total
@@ -0,0 +1,232 @@
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.urls import reverse
+
+from .cpf import so_digitos
+from .models import Aluno, Disciplina, Gestor, IndiceBusca, Professor, Turma
+
+
+# ======================== ÍNDICE DE BUSCA ========================
+# Pessoas, turmas e disciplinas ficam em IndiceBusca com um texto só (sem
+# acentos, em minúsculas; CPF só com dígitos), espelhado na tabela FTS5
+# core_indicebusca_fts. A busca casa cada palavra digitada como prefixo
+# ("joao sil" acha "João da Silva") sem varrer as tabelas de origem.
+
+MODELOS = {'aluno': Aluno, 'professor': Professor, 'gestor': Gestor, 'turma': Turma, 'disciplina': Disciplina}
+PESSOAS = ('aluno', 'professor', 'gestor')
+MAXIMO_PALAVRAS = 8
+
+
+def normalizar(texto):
+    """Minúsculas e sem acentos ("João" → "joao")"""
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+
+def juntar(*partes):
+    return ' '.join(normalizar(str(parte)) for parte in partes if parte)
+
+
+def texto_indexado(nome, cpf, email):
+    """Texto de uma pessoa: nome, CPF canônico (só dígitos) e e-mail"""
+    return juntar(nome, so_digitos(cpf), email)
+
+
+def consulta_fts(termo):
+    """Expressão MATCH do FTS5 (todas as palavras, como prefixo), ou '' se não houver o que buscar"""
+    termo = termo or ''
+    if re.fullmatch(r'[\d.\-\s/]+', termo.strip()):
+        # CPF, formatado ou não, é um número só no índice
+        palavras = [so_digitos(termo)]
+    else:
+        palavras = re.findall(r'\w+', normalizar(termo))
+    return ' '.join(f'"{palavra}"*' for palavra in palavras[:MAXIMO_PALAVRAS] if palavra)
+
+
+# ------------------ LINHAS DO ÍNDICE ------------------
+# Uma função por tipo: recebe um queryset do modelo e gera as linhas com
+# uma consulta só (values_list com os relacionamentos).
+
+def linhas_alunos(alunos):
+    for pk, nome, cpf, email, turma_id, turma, ano in alunos.values_list(
+        'pk', 'nome_completo', 'cpf', 'user__email', 'turma_id', 'turma__nome', 'turma__ano',
+    ):
+        yield IndiceBusca(
+            tipo='aluno', objeto_id=pk, nome=nome, detalhe=f'Aluno(a) — {turma} ({ano})',
+            texto=texto_indexado(nome, cpf, email), turma_id=turma_id,
+        )
+
+
+def linhas_professores(professores):
+    for pk, nome, cpf, email in professores.values_list('pk', 'nome_completo', 'cpf', 'user__email'):
+        yield IndiceBusca(
+            tipo='professor', objeto_id=pk, nome=nome, detalhe=f'Professor(a) — {email}',
+            texto=texto_indexado(nome, cpf, email),
+        )
+
+
+def linhas_gestores(gestores):
+    cargos = dict(Gestor.CARGO_CHOICES)
+    for pk, nome, cpf, email, cargo in gestores.values_list('pk', 'nome_completo', 'cpf', 'user__email', 'cargo'):
+        yield IndiceBusca(
+            tipo='gestor', objeto_id=pk, nome=nome, detalhe=f'Gestor(a) — {cargos.get(cargo, cargo)}',
+            texto=texto_indexado(nome, cpf, email),
+        )
+
+
+def linhas_turmas(turmas):
+    turnos = dict(Turma.TURNO_CHOICES)
+    for pk, nome, ano, turno in turmas.values_list('pk', 'nome', 'ano', 'turno'):
+        yield IndiceBusca(
+            tipo='turma', objeto_id=pk, nome=nome, detalhe=f'Turma — {ano}, {turnos.get(turno, turno)}',
+            texto=juntar(nome, ano, turnos.get(turno, turno)), turma_id=pk,
+        )
+
+
+def linhas_disciplinas(disciplinas):
+    for pk, nome, turma_id, turma, ano, professor_id, professor in disciplinas.values_list(
+        'pk', 'nome', 'turma_id', 'turma__nome', 'turma__ano', 'professor_id', 'professor__nome_completo',
+    ):
+        yield IndiceBusca(
+            tipo='disciplina', objeto_id=pk, nome=nome, detalhe=f'{turma} ({ano}) — {professor}',
+            texto=juntar(nome, turma, ano), turma_id=turma_id, professor_id=professor_id,
+        )
+
+
+LINHAS = {
+    'aluno': linhas_alunos,
+    'professor': linhas_professores,
+    'gestor': linhas_gestores,
+    'turma': linhas_turmas,
+    'disciplina': linhas_disciplinas,
+}
+
+
+# ------------------ MANUTENÇÃO ------------------
+def indexar(tipo, queryset):
+    """Refaz no índice as linhas desses objetos (queryset do modelo do tipo)"""
+    linhas = list(LINHAS[tipo](queryset.order_by()))
+    if linhas:
+        IndiceBusca.objects.filter(tipo=tipo, objeto_id__in=[linha.objeto_id for linha in linhas]).delete()
+        IndiceBusca.objects.bulk_create(linhas)
+
+
+def remover(tipo, objeto_id):
+    IndiceBusca.objects.filter(tipo=tipo, objeto_id=objeto_id).delete()
+
+
+def indexar_usuario(user):
+    """O e-mail mudou: refaz as linhas das pessoas desse usuário"""
+    for tipo in PESSOAS:
+        indexar(tipo, MODELOS[tipo].objects.filter(user=user))
+
+
+def reindexar():
+    """Reconstrói o índice inteiro a partir das tabelas; retorna quantas linhas"""
+    IndiceBusca.objects.all().delete()
+    total = 0
+    for tipo, modelo in MODELOS.items():
+        total += len(IndiceBusca.objects.bulk_create(LINHAS[tipo](modelo.objects.order_by()), batch_size=5000))
+    with connection.cursor() as cursor:
+        cursor.execute("INSERT INTO core_indicebusca_fts(core_indicebusca_fts) VALUES ('optimize')")
+    return total
+
+
+# ------------------ CONSULTA ------------------
+# CROSS JOIN obriga o SQLite a partir do FTS (poucas linhas) e só então ler o
+# índice; com JOIN ele às vezes percorre todas as linhas do tipo e testa o
+# MATCH uma a uma.
+
+def ids_encontrados(tipo, termo):
+    """Subconsulta com os ids dos objetos desse tipo que casam com o termo (para id__in)"""
+    return RawSQL(
+        "SELECT i.objeto_id FROM core_indicebusca_fts f "
+        "CROSS JOIN core_indicebusca i ON i.id = f.rowid "
+        "WHERE core_indicebusca_fts MATCH %s AND i.tipo = %s",
+        (consulta_fts(termo), tipo),
+    )
+
+
+def filtrar_por_busca(queryset, tipo, termo):
+    """Restringe o queryset (do modelo do tipo) aos objetos que casam com o termo"""
+    if not consulta_fts(termo):
+        return queryset.none()
+    return queryset.filter(pk__in=ids_encontrados(tipo, termo))
+
+
+def visiveis(perfil):
+    """(condição SQL, parâmetros) do que o papel pode encontrar, ou None se nada.
+
+    Gestão vê tudo (gestores, só o superusuário); professor, as turmas onde
+    leciona, os alunos delas e as próprias disciplinas; aluno, as disciplinas
+    da turma.
+    """
+    if perfil.is_superuser:
+        return '1 = 1', []
+    if perfil.is_gestor:
+        return "i.tipo <> 'gestor'", []
+    if perfil.is_professor:
+        return (
+            "(i.tipo = 'disciplina' AND i.professor_id = %s) OR (i.tipo IN ('aluno', 'turma') "
+            "AND i.turma_id IN (SELECT turma_id FROM core_disciplina WHERE professor_id = %s))",
+            [perfil.professor.id, perfil.professor.id],
+        )
+    if perfil.is_aluno:
+        return "i.tipo = 'disciplina' AND i.turma_id = %s", [perfil.aluno.turma_id]
+    return None
+
+
+def buscar(termo, tipos=None, perfil=None, limite=20):
+    """Linhas do índice mais relevantes para o termo (bm25 do FTS5, depois nome).
+
+    tipos: restringe aos tipos dados; perfil: só o que o papel pode ver.
+    """
+    consulta = consulta_fts(termo)
+    permissao = ('1 = 1', []) if perfil is None else visiveis(perfil)
+    if not consulta or permissao is None:
+        return []
+
+    condicao, parametros = permissao
+    tipos = list(tipos or MODELOS)
+    marcadores = ', '.join(['%s'] * len(tipos))
+    return list(IndiceBusca.objects.raw(
+        "SELECT i.id, i.tipo, i.objeto_id, i.nome, i.detalhe, i.turma_id FROM core_indicebusca_fts f "
+        "CROSS JOIN core_indicebusca i ON i.id = f.rowid "
+        f"WHERE core_indicebusca_fts MATCH %s AND i.tipo IN ({marcadores}) AND ({condicao}) "
+        "ORDER BY f.rank, i.nome LIMIT %s",
+        [consulta, *tipos, *parametros, limite],
+    ))
+
+
+# ------------------ BUSCA GLOBAL (TYPEAHEAD) ------------------
+def url_resultado(linha, perfil):
+    """Tela que o resultado abre para o papel (a mesma que ele já acessa pelo menu)"""
+    gestao = perfil.is_superuser or perfil.is_gestor
+    if linha.tipo == 'aluno':
+        return reverse('editar_aluno', args=[linha.objeto_id]) if gestao else reverse('disciplinas_turma', args=[linha.turma_id])
+    if linha.tipo == 'professor':
+        return reverse('editar_professor', args=[linha.objeto_id])
+    if linha.tipo == 'gestor':
+        return reverse('editar_gestor', args=[linha.objeto_id])
+    if linha.tipo == 'turma':
+        return reverse('listar_disciplinas_turma' if gestao else 'disciplinas_turma', args=[linha.objeto_id])
+    if perfil.is_aluno:
+        return reverse('painel_aluno')
+    return reverse('visualizar_disciplinas' if gestao else 'lancar_nota', args=[linha.objeto_id])
+
+
+def resultados_typeahead(termo, perfil, limite=8):
+    """Resultados da busca global prontos para o JSON"""
+    return [
+        {
+            'tipo': linha.tipo,
+            'id': linha.objeto_id,
+            'nome': linha.nome,
+            'detalhe': linha.detalhe,
+            'url': url_resultado(linha, perfil),
+        }
+        for linha in buscar(termo, perfil=perfil, limite=limite)
+    ]
@@ -0,0 +1,116 @@
+import re
+
+from django.core.exceptions import ValidationError
+
+from .models import CadastroCPF
+
+
+# ======================== CPF ========================
+# Os cadastros guardam o CPF formatado ("000.000.000-00"), cada modelo com o
+# seu unique. A forma canônica — só os 11 dígitos — fica em CadastroCPF, uma
+# linha por pessoa com índice único, mantida pelos signals: um SELECT pelo
+# índice responde se o CPF já existe em qualquer papel e de quem é.
+
+TIPOS = dict(CadastroCPF.TIPO_CHOICES)
+
+
+def so_digitos(texto):
+    return re.sub(r'\D', '', str(texto or ''))
+
+
+def digitos_verificadores(base):
+    """Os dois dígitos verificadores dos 9 primeiros dígitos"""
+    digitos = [int(d) for d in base]
+    for peso_inicial in (10, 11):
+        soma = sum(d * peso for d, peso in zip(digitos, range(peso_inicial, 1, -1)))
+        digitos.append(0 if soma % 11 < 2 else 11 - soma % 11)
+    return f'{digitos[-2]}{digitos[-1]}'
+
+
+def cpf_valido(cpf):
+    """11 dígitos (formatado ou não), não todos iguais, com os verificadores certos"""
+    digitos = so_digitos(cpf)
+    return (
+        len(digitos) == 11
+        and len(set(digitos)) > 1
+        and digitos[9:] == digitos_verificadores(digitos[:9])
+    )
+
+
+def formatar_cpf(cpf):
+    digitos = so_digitos(cpf)
+    return f'{digitos[:3]}.{digitos[3:6]}.{digitos[6:9]}-{digitos[9:]}'
+
+
+def gerar_cpf(numero):
+    """CPF válido e formatado a partir de um número de até 9 dígitos (dados sintéticos)"""
+    base = f'{numero:09d}'
+    return formatar_cpf(base + digitos_verificadores(base))
+
+
+# ------------------ CONSULTAS ------------------
+def dono_do_cpf(cpf):
+    """(tipo, objeto_id) da pessoa com esse CPF, em qualquer papel, ou None"""
+    return CadastroCPF.objects.filter(cpf=so_digitos(cpf)).values_list('tipo', 'objeto_id').first()
+
+
+def donos_dos_cpfs(cpfs):
+    """{cpf só com dígitos: (tipo, objeto_id)} para vários CPFs, numa consulta"""
+    return {
+        cpf: (tipo, objeto_id)
+        for cpf, tipo, objeto_id in CadastroCPF.objects.filter(
+            cpf__in={so_digitos(cpf) for cpf in cpfs},
+        ).values_list('cpf', 'tipo', 'objeto_id')
+    }
+
+
+def validar_cpf_cadastro(cpf, tipo, objeto_id=None):
+    """Validação dos formulários de cadastro: CPF válido e livre (fora o próprio cadastro).
+
+    Retorna o CPF formatado; levanta ValidationError.
+    """
+    if not cpf_valido(cpf):
+        raise ValidationError("CPF inválido.")
+    conferir_cpf_livre(cpf, tipo, objeto_id)
+    return formatar_cpf(cpf)
+
+
+def conferir_cpf_livre(cpf, tipo, objeto_id=None):
+    """ValidationError se o CPF já for de outra pessoa, em qualquer papel"""
+    dono = dono_do_cpf(cpf)
+    if dono is not None and dono != (tipo, objeto_id):
+        if dono[0] == tipo:
+            raise ValidationError("Este CPF já está cadastrado.")
+        raise ValidationError(f"Este CPF já está cadastrado como {TIPOS[dono[0]].lower()}.")
+
+
+def validar_cpf_pessoa(pessoa):
+    """Conferência do Model.clean() e do pre_save: o erro vai para o campo cpf.
+
+    Só confere CPF novo ou alterado (_cpf_original vem do post_init, em
+    core/signals.py).
+    """
+    if not pessoa._state.adding and pessoa.cpf == pessoa._cpf_original:
+        return
+    try:
+        conferir_cpf_livre(pessoa.cpf, pessoa._meta.model_name, pessoa.pk)
+    except ValidationError as erro:
+        raise ValidationError({'cpf': erro.messages})
+
+
+# ------------------ MANUTENÇÃO ------------------
+def registrar_cpf(tipo, objeto_id, cpf):
+    """Grava o CPF canônico do cadastro (o pre_save já conferiu que está livre)"""
+    CadastroCPF.objects.update_or_create(tipo=tipo, objeto_id=objeto_id, defaults={'cpf': so_digitos(cpf)})
+
+
+def liberar_cpf(tipo, objeto_id):
+    CadastroCPF.objects.filter(tipo=tipo, objeto_id=objeto_id).delete()
+
+
+def registrar_cpfs_em_lote(tipo, pessoas):
+    """Registra os CPFs de pessoas criadas com bulk_create (que não dispara signals)"""
+    CadastroCPF.objects.bulk_create(
+        [CadastroCPF(tipo=tipo, objeto_id=pessoa.pk, cpf=so_digitos(pessoa.cpf)) for pessoa in pessoas],
+        batch_size=5000,
+    )
@@ -0,0 +1,148 @@
+import numpy as np
+
+from .models import LIMITE_APROVACAO, LIMITE_REPROVACAO, Disciplina, Nota, Turma
+
+
+# ======================== DISTRIBUIÇÃO DE NOTAS ========================
+# Estatísticas do ano letivo inteiro (por turma e por disciplina): média,
+# mediana, desvio padrão, histograma e quantos alunos ficam abaixo de 4 e de 6.
+# As notas do ano vêm numa consulta só para arrays NumPy e tudo é calculado
+# em lote; bimestre não lançado vira NaN e fica fora da média, como em
+# Nota.media.
+
+FAIXAS = 10                 # histograma de 0 a 10, de 1 em 1 ponto
+
+
+def carregar_notas(ano):
+    """Uma consulta → (turma_ids, disciplina_ids, aluno_ids, notas[n, 4] com NaN)"""
+    linhas = list(
+        Nota.objects.filter(disciplina__turma__ano=ano)
+        .values_list('disciplina__turma_id', 'disciplina_id', 'aluno_id', 'nota1', 'nota2', 'nota3', 'nota4')
+    )
+    if not linhas:
+        vazio = np.empty(0, dtype=np.int64)
+        return vazio, vazio, vazio, np.empty((0, 4))
+
+    ids = np.array([linha[:3] for linha in linhas], dtype=np.int64)
+    notas = np.array([linha[3:] for linha in linhas], dtype=float)   # None → NaN
+    return ids[:, 0], ids[:, 1], ids[:, 2], notas
+
+
+def medias_das_linhas(notas):
+    """Média dos bimestres lançados de cada linha (NaN se nenhum)"""
+    lancadas = ~np.isnan(notas)
+    quantidade = lancadas.sum(axis=1)
+    soma = np.where(lancadas, notas, 0).sum(axis=1)
+
+    medias = np.full(len(notas), np.nan)
+    np.divide(soma, quantidade, out=medias, where=quantidade > 0)
+    return medias
+
+
+def medias_por_chave(chaves, valores):
+    """Média dos valores de cada chave (linha de chaves[n, k]), ignorando NaN.
+
+    Retorna (chaves únicas[m, k], médias[m]).
+    """
+    validos = ~np.isnan(valores)
+    unicas, indice = np.unique(chaves[validos], axis=0, return_inverse=True)
+    indice = indice.reshape(-1)
+    soma = np.bincount(indice, weights=valores[validos], minlength=len(unicas))
+    return unicas, soma / np.bincount(indice, minlength=len(unicas))
+
+
+def estatisticas_por_grupo(grupos, valores):
+    """Estatísticas de valores agrupados por id, sem laço por grupo.
+
+    Retorna {grupo_id: {...}}. Valores NaN (sem nota) são descartados.
+    """
+    validos = ~np.isnan(valores)
+    grupos, valores = grupos[validos], valores[validos]
+    if not len(valores):
+        return {}
+
+    chaves, indice = np.unique(grupos, return_inverse=True)
+    total_grupos = len(chaves)
+
+    contagem = np.bincount(indice, minlength=total_grupos)
+    media = np.bincount(indice, weights=valores, minlength=total_grupos) / contagem
+    quadrados = np.bincount(indice, weights=valores ** 2, minlength=total_grupos) / contagem
+    desvio = np.sqrt(np.maximum(quadrados - media ** 2, 0))
+
+    # Mediana: ordena por (grupo, valor) e pega o meio de cada fatia
+    ordem = np.lexsort((valores, indice))
+    ordenados = valores[ordem]
+    inicio = np.cumsum(contagem) - contagem
+    mediana = (ordenados[inicio + (contagem - 1) // 2] + ordenados[inicio + contagem // 2]) / 2
+
+    faixa = np.minimum(np.floor(valores).astype(np.int64), FAIXAS - 1)
+    histograma = np.bincount(
+        indice * FAIXAS + faixa, minlength=total_grupos * FAIXAS
+    ).reshape(total_grupos, FAIXAS)
+
+    abaixo_4 = np.bincount(indice, weights=valores < LIMITE_REPROVACAO, minlength=total_grupos)
+    abaixo_6 = np.bincount(indice, weights=valores < LIMITE_APROVACAO, minlength=total_grupos)
+
+    return {
+        int(chave): {
+            'alunos': int(contagem[i]),
+            'media': round(float(media[i]), 2),
+            'mediana': round(float(mediana[i]), 2),
+            'desvio_padrao': round(float(desvio[i]), 2),
+            'histograma': histograma[i].tolist(),
+            'abaixo_4': int(abaixo_4[i]),
+            'abaixo_6': int(abaixo_6[i]),
+        }
+        for i, chave in enumerate(chaves)
+    }
+
+
+def distribuicao_notas(ano):
+    """Distribuição das médias do ano, por disciplina e por turma.
+
+    Disciplina: uma média por aluno (Nota.media).
+    Turma: a média geral de cada aluno nas disciplinas daquela turma (média
+    das médias, como no boletim). A turma é a da disciplina, não a atual do
+    aluno: quem trocou de turma no meio do ano entra em cada uma com as
+    notas que teve lá.
+    """
+    turma_ids, disciplina_ids, aluno_ids, notas = carregar_notas(ano)
+    medias = medias_das_linhas(notas)
+
+    por_disciplina = estatisticas_por_grupo(disciplina_ids, medias)
+
+    # Média geral por aluno no ano e por (turma da disciplina, aluno)
+    alunos, media_geral = medias_por_chave(aluno_ids[:, None], medias)
+    pares, media_na_turma = medias_por_chave(np.column_stack([turma_ids, aluno_ids]), medias)
+    por_turma = estatisticas_por_grupo(pares[:, 0], media_na_turma)
+
+    nomes_turmas = dict(Turma.objects.filter(ano=ano).values_list('id', 'nome'))
+    nomes_disciplinas = {
+        d['id']: d for d in
+        Disciplina.objects.filter(turma__ano=ano).values('id', 'nome', 'turma_id')
+    }
+
+    return {
+        'ano': ano,
+        'faixas': [f'{i}–{i + 1}' for i in range(FAIXAS)],
+        'geral': estatisticas_por_grupo(np.zeros(len(alunos), dtype=np.int64), media_geral).get(0),
+        'turmas': [
+            {'id': turma_id, 'nome': nomes_turmas.get(turma_id, ''), **dados}
+            for turma_id, dados in sorted(por_turma.items(), key=lambda item: nomes_turmas.get(item[0], ''))
+        ],
+        'disciplinas': [
+            {
+                'id': disciplina_id,
+                'nome': nomes_disciplinas[disciplina_id]['nome'],
+                'turma': nomes_turmas.get(nomes_disciplinas[disciplina_id]['turma_id'], ''),
+                **dados,
+            }
+            for disciplina_id, dados in sorted(
+                por_disciplina.items(),
+                key=lambda item: (
+                    nomes_turmas.get(nomes_disciplinas[item[0]]['turma_id'], ''),
+                    nomes_disciplinas[item[0]]['nome'],
+                ),
+            )
+        ],
+    }
@@ -0,0 +1,35 @@
+from functools import wraps
+
+from django.db import connection, transaction
+
+
+# ======================== ESCRITA CONCORRENTE (SQLITE) ========================
+# O SQLite tem um escritor por vez. Numa transação comum (DEFERRED), quem lê
+# primeiro e só depois grava tenta subir a trava no meio do caminho e, se
+# outro escritor chegou antes, falha na hora com "database is locked" — o
+# timeout não ajuda nesse caso. Com transaction_mode IMMEDIATE (perfil de
+# produção em notas/settings.py) o BEGIN já pega a trava de escrita e quem
+# chega depois espera a vez. As views que gravam fazem o POST inteiro numa
+# transação dessas: a conferência (notas atuais, choques da grade) e a
+# gravação ficam juntas, e a trava é pedida uma vez só.
+
+def escrita_imediata(view):
+    """Executa o POST da view numa transação (BEGIN IMMEDIATE no perfil de produção)"""
+    @wraps(view)
+    def envolvida(request, *args, **kwargs):
+        if request.method != 'POST':
+            return view(request, *args, **kwargs)
+        with transaction.atomic():
+            return view(request, *args, **kwargs)
+    return envolvida
+
+
+def pragmas_sqlite():
+    """Configuração efetiva da conexão atual (para relatórios e conferência)"""
+    with connection.cursor() as cursor:
+        valores = {}
+        for pragma in ('journal_mode', 'synchronous', 'busy_timeout', 'mmap_size', 'cache_size'):
+            cursor.execute(f'PRAGMA {pragma}')
+            valores[pragma] = cursor.fetchone()[0]
+    valores['transaction_mode'] = connection.settings_dict.get('OPTIONS', {}).get('transaction_mode') or 'DEFERRED'
+    return valores
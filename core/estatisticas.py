@@ -0,0 +1,267 @@
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, NullIf
+from django.utils import timezone
+
+from .grade import DIAS, HORARIOS
+from .models import Aluno, AulaGrade, Disciplina, Nota, Professor, ResumoAnoLetivo, Turma
+
+
+# ======================== CONTADORES DAS DISCIPLINAS ========================
+# Disciplina guarda alunos_matriculados e lancadas_b1..b4 (ver core/signals.py),
+# então as barras de progresso viram leitura direta dos campos.
+
+CONTADORES_DISCIPLINA = (
+    'alunos_matriculados', 'lancadas_b1', 'lancadas_b2', 'lancadas_b3', 'lancadas_b4',
+)
+
+
+def contagens_reais():
+    """Subqueries que contam, direto nas tabelas, o que os contadores deveriam ter"""
+    alunos_turma = (
+        Aluno.objects.filter(turma=OuterRef('turma'))
+        .order_by()
+        .values('turma')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    expressoes = {'alunos_matriculados': alunos_turma}
+
+    # Count(campo) ignora NULL → conta só os bimestres preenchidos
+    for i in range(1, 5):
+        expressoes[f'lancadas_b{i}'] = (
+            Nota.objects.filter(disciplina=OuterRef('pk'))
+            .order_by()
+            .values('disciplina')
+            .annotate(total=Count(f'nota{i}'))
+            .values('total')
+        )
+
+    return {
+        campo: Coalesce(Subquery(sub, output_field=IntegerField()), Value(0))
+        for campo, sub in expressoes.items()
+    }
+
+
+def anotar_contagens_reais(disciplinas):
+    """Anota real_<contador> em cada disciplina (usado pela conferência)"""
+    return disciplinas.annotate(**{
+        f'real_{campo}': expressao for campo, expressao in contagens_reais().items()
+    })
+
+
+def recontar_disciplinas(disciplinas):
+    """Regrava os contadores a partir das tabelas com um único UPDATE"""
+    return disciplinas.update(**contagens_reais())
+
+
+def atualizar_contadores_disciplinas(filtro, **deltas):
+    """Soma deltas nos contadores com F() (atômico, sem ler as linhas antes).
+
+    filtro: kwargs de Disciplina.objects.filter, ex. {'pk': 3} ou {'turma_id': 5}
+    """
+    deltas = {campo: valor for campo, valor in deltas.items() if valor}
+    if deltas:
+        Disciplina.objects.filter(**filtro).update(**{
+            campo: F(campo) + valor for campo, valor in deltas.items()
+        })
+
+
+def bimestres_lancados(nota):
+    """(1, 0, 1, 0) → quais bimestres da nota estão preenchidos"""
+    return tuple(
+        int(nota.__dict__.get(f'nota{i}') is not None)
+        for i in range(1, 5)
+    )
+
+
+def deltas_bimestres(antes, depois):
+    return {
+        f'lancadas_b{i}': d - a
+        for i, (a, d) in enumerate(zip(antes, depois), start=1)
+    }
+
+
+def progresso_disciplina(disciplina):
+    """Monta o dicionário usado nos cards de disciplina"""
+    return {
+        'disciplina': disciplina,
+        'alunos_count': disciplina.alunos_matriculados,
+        'notas_lancadas': disciplina.notas_lancadas,
+        'notas_possiveis': disciplina.notas_possiveis,
+        'percentual': disciplina.percentual_lancado,
+    }
+
+
+def estatisticas_professor(professor, ano):
+    """Estatísticas do painel do professor para um ano letivo (uma consulta só)"""
+    disciplinas = Disciplina.objects.filter(professor=professor, turma__ano=ano).select_related('turma')
+
+    disciplinas_detalhadas = [progresso_disciplina(d) for d in disciplinas]
+
+    # Cada aluno pertence a uma única turma, então somar os alunos das turmas
+    # distintas já dá o total sem duplicatas.
+    alunos_por_turma = {
+        item['disciplina'].turma_id: item['alunos_count']
+        for item in disciplinas_detalhadas
+    }
+
+    return {
+        'total_disciplinas': len(disciplinas_detalhadas),
+        'total_turmas': len(alunos_por_turma),
+        'total_alunos': sum(alunos_por_turma.values()),
+        'total_notas_lancadas': sum(item['notas_lancadas'] for item in disciplinas_detalhadas),
+        'total_notas_possiveis': sum(item['notas_possiveis'] for item in disciplinas_detalhadas),
+        'disciplinas_detalhadas': disciplinas_detalhadas,
+    }
+
+
+# ======================== INDICADORES DAS TURMAS ========================
+# Alunos, disciplinas, grade preenchida e notas lançadas de cada turma, em
+# subqueries correlacionadas da própria consulta das turmas. Com a paginação
+# por (ano, nome, id) o SQLite percorre o índice e só calcula as linhas da
+# página.
+
+def agregado(queryset, agrupar, total=Count('id')):
+    """Subquery com um total do queryset correlacionado (0 se não houver linhas).
+
+    agrupar: campo igual em todas as linhas da correlação (ex. a FK do OuterRef),
+    para o GROUP BY devolver uma linha só.
+    """
+    sub = queryset.order_by().values(agrupar).annotate(total=total).values('total')
+    return Coalesce(Subquery(sub, output_field=IntegerField()), Value(0))
+
+
+def por_turma(modelo, total=Count('id')):
+    """Total das linhas do modelo na turma"""
+    return agregado(modelo.objects.filter(turma=OuterRef('pk')), 'turma', total)
+
+
+def percentual(parte, todo):
+    return Coalesce(F(parte) * 100 / NullIf(F(todo), 0), Value(0))
+
+
+def com_indicadores(turmas):
+    """Anota total_alunos, total_disciplinas, aulas_na_grade / capacidade_grade,
+    notas_lancadas / notas_possiveis e os dois percentuais (inteiros)"""
+    return turmas.annotate(
+        total_alunos=por_turma(Aluno),
+        total_disciplinas=por_turma(Disciplina),
+        aulas_na_grade=por_turma(AulaGrade),
+        capacidade_grade=Case(
+            *[When(turno=turno, then=Value(len(DIAS) * len(horarios))) for turno, horarios in HORARIOS.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        ),
+        # Mesma conta das barras de progresso das disciplinas (contadores)
+        notas_lancadas=por_turma(Disciplina, Sum(
+            F('lancadas_b1') + F('lancadas_b2') + F('lancadas_b3') + F('lancadas_b4')
+        )),
+        notas_possiveis=por_turma(Disciplina, Sum(F('alunos_matriculados') * 4)),
+    ).annotate(
+        percentual_grade=percentual('aulas_na_grade', 'capacidade_grade'),
+        percentual_notas=percentual('notas_lancadas', 'notas_possiveis'),
+    )
+
+
+# ======================== CARGA DOS PROFESSORES ========================
+# Para distribuir as aulas: disciplinas, turmas, aulas na grade e alunos de
+# cada professor no ano, também em subqueries da consulta dos professores
+# (pelos índices de professor em Disciplina e AulaGrade), para ordenar por
+# carga no próprio banco.
+
+ORDENACOES_CARGA = {
+    'nome': ['nome_completo', 'id'],
+    'aulas': ['-aulas_na_grade', '-total_disciplinas', 'nome_completo', 'id'],
+    'disciplinas': ['-total_disciplinas', '-aulas_na_grade', 'nome_completo', 'id'],
+    'turmas': ['-total_turmas', '-aulas_na_grade', 'nome_completo', 'id'],
+    'alunos': ['-alunos_atendidos', '-aulas_na_grade', 'nome_completo', 'id'],
+}
+
+
+def com_carga(professores, ano):
+    """Anota total_disciplinas, total_turmas, aulas_na_grade, aulas_previstas e alunos_atendidos no ano"""
+    disciplinas = Disciplina.objects.filter(professor=OuterRef('pk'), turma__ano=ano)
+    return professores.annotate(
+        total_disciplinas=agregado(disciplinas, 'professor'),
+        total_turmas=agregado(disciplinas, 'professor', Count('turma', distinct=True)),
+        aulas_previstas=agregado(disciplinas, 'professor', Sum('aulas_semanais')),
+        aulas_na_grade=agregado(AulaGrade.objects.filter(professor=OuterRef('pk'), ano=ano), 'professor'),
+        # Soma o contador de alunos de uma disciplina por turma (a de menor
+        # id): cada aluno conta uma vez e nada de varrer as matrículas
+        alunos_atendidos=agregado(
+            disciplinas.filter(pk=Subquery(
+                Disciplina.objects.filter(professor=OuterRef('professor'), turma=OuterRef('turma'))
+                .order_by('pk').values('pk')[:1]
+            )),
+            'professor',
+            Sum('alunos_matriculados'),
+        ),
+    )
+
+
+# ======================== RESUMO DO ANO LETIVO ========================
+def contar_lancadas():
+    """Expressão que soma os bimestres preenchidos (Count ignora NULL)"""
+    return Count('nota1') + Count('nota2') + Count('nota3') + Count('nota4')
+
+
+def contar_professores_ano(ano):
+    return Professor.objects.filter(disciplina__turma__ano=ano).distinct().count()
+
+
+def contar_resumo_ano(ano):
+    """Contagens feitas direto nas tabelas (usadas para reconstruir e conferir o resumo)"""
+    notas = Nota.objects.filter(disciplina__turma__ano=ano).aggregate(total=contar_lancadas())
+
+    return {
+        'total_turmas': Turma.objects.filter(ano=ano).count(),
+        'total_alunos': Aluno.objects.filter(turma__ano=ano).count(),
+        'total_professores': contar_professores_ano(ano),
+        'total_disciplinas': Disciplina.objects.filter(turma__ano=ano).count(),
+        'total_notas_lancadas': notas['total'] or 0,
+    }
+
+
+def recalcular_resumo_ano(ano):
+    resumo, _ = ResumoAnoLetivo.objects.update_or_create(ano=ano, defaults=contar_resumo_ano(ano))
+    return resumo
+
+
+def obter_resumo_ano(ano):
+    """Lê o resumo do ano; se ainda não existir, conta nas tabelas sem gravar.
+
+    Só leitura: quem cria a linha são os signals e o recalcular_resumos, não
+    um GET com qualquer ?ano= (que ainda pegaria o lock de escrita).
+    """
+    resumo = ResumoAnoLetivo.objects.filter(ano=ano).first()
+    if resumo is None:
+        resumo = ResumoAnoLetivo(ano=ano, **contar_resumo_ano(ano))
+    return resumo
+
+
+def aplicar_delta_resumo(ano, **deltas):
+    """Soma os deltas nos contadores do ano com F(), sem ler a linha antes.
+
+    Se o ano ainda não tem resumo, ele é montado do zero (o que já inclui a
+    alteração que disparou o delta).
+    """
+    deltas = {campo: valor for campo, valor in deltas.items() if valor}
+    if not deltas:
+        return
+
+    atualizados = ResumoAnoLetivo.objects.filter(ano=ano).update(
+        atualizado_em=timezone.now(),
+        **{campo: F(campo) + valor for campo, valor in deltas.items()}
+    )
+    if not atualizados:
+        recalcular_resumo_ano(ano)
+
+
+def atualizar_professores_resumo(ano):
+    """Professores distintos não dá para manter com soma; reconta só esse campo"""
+    atualizados = ResumoAnoLetivo.objects.filter(ano=ano).update(
+        total_professores=contar_professores_ano(ano),
+        atualizado_em=timezone.now(),
+    )
+    if not atualizados:
+        recalcular_resumo_ano(ano)
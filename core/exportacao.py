@@ -0,0 +1,89 @@
+import csv
+import tempfile
+
+from django.db.models import F, FilteredRelation, Q
+from openpyxl import Workbook
+
+from .models import Aluno
+
+
+# ======================== EXPORTAÇÃO DE NOTAS ========================
+# Uma linha por aluno × disciplina × bimestre (bimestre sem nota sai vazio),
+# vinda de uma consulta só: aluno → turma → disciplinas da turma, com LEFT
+# JOIN na nota daquele aluno naquela disciplina. A consulta é percorrida com
+# .iterator() e as linhas são geradas uma a uma, então a memória não cresce
+# com o tamanho da exportação.
+
+TAMANHO_LOTE = 2000
+CABECALHO = ['Ano', 'Turma', 'Turno', 'Disciplina', 'Professor', 'Aluno', 'CPF', 'Bimestre', 'Nota']
+TURNOS = {'manha': 'Manhã', 'tarde': 'Tarde', 'noite': 'Noite'}
+
+
+def consulta_exportacao(turma=None, disciplina=None, ano=None):
+    """Aluno × disciplina da turma, com as 4 notas (ou NULL) — uma consulta"""
+    alunos = (
+        Aluno.objects.filter(turma__disciplina__isnull=False)
+        .annotate(disciplina_id=F('turma__disciplina__id'))
+        .annotate(nota_exportada=FilteredRelation(
+            'nota', condition=Q(nota__disciplina_id=F('disciplina_id'))
+        ))
+    )
+    if turma is not None:
+        alunos = alunos.filter(turma_id=turma)
+    if disciplina is not None:
+        # Pela anotação: filter(turma__disciplina__id=...) abriria outro JOIN
+        alunos = alunos.filter(disciplina_id=disciplina)
+    if ano is not None:
+        alunos = alunos.filter(turma__ano=ano)
+
+    return alunos.order_by(
+        'turma__nome', 'turma_id', 'turma__disciplina__nome', 'disciplina_id', 'nome_completo', 'id'
+    ).values_list(
+        'turma__ano', 'turma__nome', 'turma__turno', 'turma__disciplina__nome',
+        'turma__disciplina__professor__nome_completo', 'nome_completo', 'cpf',
+        'nota_exportada__nota1', 'nota_exportada__nota2', 'nota_exportada__nota3', 'nota_exportada__nota4',
+    )
+
+
+def linhas_exportacao(**escopo):
+    """Gera as linhas (já com cabeçalho) sem carregar a consulta inteira"""
+    yield CABECALHO
+    for ano, turma, turno, disciplina, professor, aluno, cpf, *notas in (
+        consulta_exportacao(**escopo).iterator(chunk_size=TAMANHO_LOTE)
+    ):
+        for bimestre, nota in enumerate(notas, start=1):
+            yield [ano, turma, TURNOS.get(turno, turno), disciplina, professor, aluno, cpf, bimestre, nota]
+
+
+class Eco:
+    """'Arquivo' cujo write devolve o texto — para o csv.writer gerar strings"""
+
+    def write(self, valor):
+        return valor
+
+
+def gerar_csv(linhas):
+    """Texto CSV (;, vírgula decimal — o mesmo formato que a importação lê)"""
+    escritor = csv.writer(Eco(), delimiter=';')
+    for linha in linhas:
+        yield escritor.writerow([
+            str(valor).replace('.', ',') if isinstance(valor, float) else ('' if valor is None else valor)
+            for valor in linha
+        ])
+
+
+def gerar_xlsx(linhas):
+    """Planilha em modo write_only num arquivo temporário (em disco, não em memória).
+
+    XLSX é um zip e só fica pronto no final, então não dá para mandar aos
+    pedaços enquanto é escrito; o arquivo devolvido é lido em streaming.
+    """
+    planilha = Workbook(write_only=True)
+    folha = planilha.create_sheet('Notas')
+    for linha in linhas:
+        folha.append(linha)
+
+    arquivo = tempfile.TemporaryFile()
+    planilha.save(arquivo)
+    arquivo.seek(0)
+    return arquivo
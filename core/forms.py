@@ -7,6 +7,7 @@ from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 from django.contrib.auth import update_session_auth_hash
+from .cpf import validar_cpf_cadastro
 
 
 # --- LOGIN ---
@@ -144,17 +145,7 @@ class ProfessorForm(forms.ModelForm):
         return email
 
     def clean_cpf(self):
-        cpf = self.cleaned_data.get('cpf')
-
-        qs = Professor.objects.filter(cpf=cpf)
-
-        if self.instance.pk:
-            qs = qs.exclude(pk=self.instance.pk)
-
-        if qs.exists():
-            raise ValidationError("Este CPF já está cadastrado.")
-
-        return cpf
+        return validar_cpf_cadastro(self.cleaned_data.get('cpf'), 'professor', self.instance.pk)
 
     def clean_cep(self):
         cep = self.cleaned_data.get('cep')
@@ -349,17 +340,7 @@ class AlunoForm(forms.ModelForm):
         return email
 
     def clean_cpf(self):
-        cpf = self.cleaned_data.get('cpf')
-
-        qs = Aluno.objects.filter(cpf=cpf)
-
-        if self.instance.pk:
-            qs = qs.exclude(pk=self.instance.pk)
-
-        if qs.exists():
-            raise ValidationError("Este CPF já está cadastrado.")
-
-        return cpf
+        return validar_cpf_cadastro(self.cleaned_data.get('cpf'), 'aluno', self.instance.pk)
 
     def clean_cep(self):
         cep = self.cleaned_data.get('cep')
@@ -619,17 +600,7 @@ class GestorForm(forms.ModelForm):
         return email
 
     def clean_cpf(self):
-        cpf = self.cleaned_data.get('cpf')
-
-        qs = Gestor.objects.filter(cpf=cpf)
-
-        if self.instance.pk:
-            qs = qs.exclude(pk=self.instance.pk)
-
-        if qs.exists():
-            raise ValidationError("Este CPF já está cadastrado.")
-
-        return cpf
+        return validar_cpf_cadastro(self.cleaned_data.get('cpf'), 'gestor', self.instance.pk)
 
     def clean_cep(self):
         cep = self.cleaned_data.get('cep')
@@ -713,3 +684,42 @@ class DisciplinaForm(forms.ModelForm):
         model = Disciplina
         fields = ['nome', 'professor']
 
+
+
+# --- IMPORTAÇÃO DE NOTAS ---
+class ImportarNotasForm(forms.Form):
+    arquivo = forms.FileField(
+        label="Planilha (.csv ou .xlsx)",
+        help_text="Colunas: CPF e/ou Aluno, Disciplina e Nota1 a Nota4.",
+    )
+    turma = forms.ModelChoiceField(queryset=Turma.objects.order_by('-ano', 'nome'), label="Turma")
+    disciplina = forms.ModelChoiceField(
+        queryset=Disciplina.objects.select_related('turma').order_by('-turma__ano', 'turma__nome', 'nome'),
+        required=False,
+        label="Disciplina",
+        help_text="Deixe em branco para importar todas as disciplinas da turma.",
+    )
+    simular = forms.BooleanField(
+        required=False,
+        initial=True,
+        label="Só simular (mostra as mudanças sem gravar)",
+    )
+
+    def clean_arquivo(self):
+        arquivo = self.cleaned_data['arquivo']
+        if not arquivo.name.lower().endswith(('.csv', '.xlsx')):
+            raise ValidationError("Envie um arquivo .csv ou .xlsx.")
+        return arquivo
+
+    def clean(self):
+        dados = super().clean()
+        turma, disciplina = dados.get('turma'), dados.get('disciplina')
+        if turma and disciplina and disciplina.turma_id != turma.id:
+            raise ValidationError("A disciplina escolhida não é dessa turma.")
+        return dados
+
+    def disciplinas(self):
+        """Escopo da importação: a disciplina escolhida ou todas as da turma"""
+        if self.cleaned_data.get('disciplina'):
+            return Disciplina.objects.filter(pk=self.cleaned_data['disciplina'].pk)
+        return Disciplina.objects.filter(turma=self.cleaned_data['turma'])
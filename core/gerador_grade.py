@@ -0,0 +1,388 @@
+import random
+from collections import defaultdict
+
+
+# ======================== GERADOR DE GRADES ========================
+# Monta as grades de todas as turmas de um ano de uma vez, sem choque de
+# professor. É um problema de restrições: cada aula semanal de cada
+# disciplina é uma variável e os valores são os horários da semana do turno.
+#
+# - Turnos diferentes não disputam horário (a restrição no banco é por ano e
+#   turno), então cada turno é resolvido à parte.
+# - As aulas de uma mesma disciplina são intercambiáveis e viram um "grupo";
+#   os horários livres de turma e professor são máscaras de bits, e o domínio
+#   de um grupo é turma_livre & professor_livre, menos os dias em que a
+#   disciplina já atingiu o máximo de aulas por dia.
+# - Busca: escolhe o grupo com menos folga (domínio − aulas restantes),
+#   confere a cada passo que nenhuma turma/professor ficou sem horários para
+#   o que falta (forward checking) e tenta primeiro o horário que menos tira
+#   das outras disciplinas da turma e do professor. Se empacar, recomeça com
+#   outra ordem aleatória de desempate (reinícios).
+# - Espalhar a disciplina pela semana (no máximo ceil(aulas / 5) por dia) é
+#   o ideal, mas em escolas muito cheias pode não ter solução; nesse caso o
+#   limite é afrouxado em um e, por último, retirado (NIVEIS).
+# - Sem limite por dia, o problema é colorir as arestas de um grafo
+#   bipartido turma–professor com os horários como cores, o que sempre tem
+#   solução quando nenhuma turma/professor passa do número de horários
+#   (teorema de König). Esse último nível não usa busca: colore aresta por
+#   aresta, trocando cores em cadeias alternadas quando preciso. Assim, o
+#   gerador só falha quando a carga não cabe mesmo.
+#
+# Não importa nada do Django: recebe e devolve ids.
+
+DIAS_SEMANA = 5
+# Aulas além do ideal permitidas por dia em cada nível (None: sem limite)
+NIVEIS = (0, 1, None)
+
+
+class SemSolucao(Exception):
+    pass
+
+
+def maximo_por_dia(aulas, folga=0):
+    """Ideal: no máximo ceil(aulas / 5) aulas da mesma disciplina no mesmo dia"""
+    if folga is None:
+        return aulas
+    return -(-aulas // DIAS_SEMANA) + folga
+
+
+def resolver(turmas, disciplinas, horarios_por_turno, rotulos=None, semente=0, tentativas=10, limite_retrocessos=2000):
+    """Grade sem choques para todas as turmas.
+
+    turmas: {turma_id: turno}
+    disciplinas: [(disciplina_id, turma_id, professor_id, aulas_semanais)]
+    horarios_por_turno: {turno: horários por dia}
+    rotulos: {('turma' | 'professor', id): nome}, para as mensagens
+    Retorna ({turma_id: {(dia, horario): disciplina_id}}, folga), com dia de 0
+    a 4 e folga = o nível de NIVEIS que foi preciso usar (0 é o ideal).
+    Levanta SemSolucao se alguma turma ou professor tiver aulas demais.
+    """
+    por_turno = defaultdict(list)
+    for disciplina in disciplinas:
+        if disciplina[3] > 0:
+            por_turno[turmas[disciplina[1]]].append(disciplina)
+
+    # Confere a capacidade de todos os turnos antes de buscar em qualquer um
+    buscas = []
+    for turno, lista in por_turno.items():
+        if not horarios_por_turno.get(turno):
+            raise SemSolucao(f'Turno sem horários definidos: {turno}.')
+        buscas.append(Busca(lista, horarios_por_turno[turno], semente, rotulos))
+
+    grades = {turma_id: {} for turma_id in turmas}
+    pior_nivel = 0
+    for busca in buscas:
+        for nivel, folga in enumerate(NIVEIS):
+            resultado = busca.resolver(folga, tentativas, limite_retrocessos)
+            if resultado is not None:
+                break
+        pior_nivel = max(pior_nivel, nivel)
+
+        for turma_id, celulas in resultado.items():
+            grades[turma_id].update(celulas)
+    return grades, NIVEIS[pior_nivel]
+
+
+class Busca:
+    """Busca com retrocesso para um turno"""
+
+    def __init__(self, disciplinas, horarios, semente, rotulos=None):
+        self.horarios = horarios
+        self.rotulos = rotulos or {}
+        self.total_horarios = DIAS_SEMANA * horarios
+        self.mascara_dia = [((1 << horarios) - 1) << (dia * horarios) for dia in range(DIAS_SEMANA)]
+        self.aleatorio = random.Random(semente)
+
+        self.turmas = sorted({d[1] for d in disciplinas})
+        self.professores = sorted({d[2] for d in disciplinas})
+        indice_turma = {t: i for i, t in enumerate(self.turmas)}
+        indice_professor = {p: i for i, p in enumerate(self.professores)}
+
+        # Grupo = disciplina: (id, turma, professor, aulas)
+        self.grupos = [(d[0], indice_turma[d[1]], indice_professor[d[2]], d[3]) for d in disciplinas]
+        self.grupos_da_turma = [[] for _ in self.turmas]
+        self.grupos_do_professor = [[] for _ in self.professores]
+        for g, (_, turma, professor, _) in enumerate(self.grupos):
+            self.grupos_da_turma[turma].append(g)
+            self.grupos_do_professor[professor].append(g)
+
+        self.verificar_capacidade()
+
+    def rotulo(self, tipo, id):
+        return self.rotulos.get((tipo, id), f'{tipo} {id}')
+
+    def verificar_capacidade(self):
+        """O único caso sem solução: turma ou professor com mais aulas que horários"""
+        carga_turma = defaultdict(int)
+        carga_professor = defaultdict(int)
+        for _, turma, professor, aulas in self.grupos:
+            carga_turma[turma] += aulas
+            carga_professor[professor] += aulas
+        for turma, carga in carga_turma.items():
+            if carga > self.total_horarios:
+                raise SemSolucao(
+                    f"{self.rotulo('turma', self.turmas[turma])}: {carga} aulas semanais "
+                    f"para {self.total_horarios} horários."
+                )
+        for professor, carga in carga_professor.items():
+            if carga > self.total_horarios:
+                raise SemSolucao(
+                    f"{self.rotulo('professor', self.professores[professor])}: {carga} aulas "
+                    f"no turno para {self.total_horarios} horários."
+                )
+
+    def resolver(self, folga, tentativas, limite_retrocessos):
+        """Solução com esse nível de folga por dia, ou None se não achar"""
+        if folga is None:
+            return self.colorir()
+
+        self.maximo = [maximo_por_dia(aulas, folga) for _, _, _, aulas in self.grupos]
+        for _ in range(tentativas):
+            resultado = self.tentar(limite_retrocessos)
+            if resultado is not None:
+                return resultado
+        return None
+
+    def tentar(self, limite_retrocessos):
+        grupos = self.grupos
+        self.turma_livre = [(1 << self.total_horarios) - 1] * len(self.turmas)
+        self.professor_livre = [(1 << self.total_horarios) - 1] * len(self.professores)
+        self.restantes = [g[3] for g in grupos]
+        self.por_dia = [[0] * DIAS_SEMANA for _ in grupos]
+        self.restantes_turma = [sum(grupos[g][3] for g in lista) for lista in self.grupos_da_turma]
+        self.restantes_professor = [sum(grupos[g][3] for g in lista) for lista in self.grupos_do_professor]
+        # Desempate aleatório por tentativa
+        self.sorteio = [self.aleatorio.random() for _ in grupos]
+
+        pilha = []          # [(grupo, candidatos, posição do candidato atual)]
+        retrocessos = 0
+        escolhido = self.escolher()
+
+        while True:
+            if escolhido is None:
+                return self.resultado((g, candidatos[posicao]) for g, candidatos, posicao in pilha)
+
+            if escolhido is not False:
+                g, candidatos = escolhido
+                pilha.append([g, candidatos or self.ordenar_candidatos(g), -1])
+
+            # Próximo candidato do topo da pilha (desfazendo o anterior)
+            while pilha:
+                topo = pilha[-1]
+                g, candidatos, posicao = topo
+                if posicao >= 0:
+                    self.desfazer(g, candidatos[posicao])
+                posicao += 1
+                if posicao < len(candidatos):
+                    topo[2] = posicao
+                    self.atribuir(g, candidatos[posicao])
+                    break
+                pilha.pop()
+                retrocessos += 1
+                if retrocessos > limite_retrocessos:
+                    return None
+            else:
+                return None
+
+            escolhido = self.escolher()
+
+    def dominio(self, g):
+        _, turma, professor, _ = self.grupos[g]
+        livre = self.turma_livre[turma] & self.professor_livre[professor]
+        for dia, quantidade in enumerate(self.por_dia[g]):
+            if quantidade >= self.maximo[g]:
+                livre &= ~self.mascara_dia[dia]
+        return livre
+
+    def escolher(self):
+        """Próxima decisão: (grupo, horários a tentar ou None para ordenar todos).
+
+        False se algum grupo, turma ou professor ficou sem saída; None se acabou.
+        """
+        dominios = {}
+        # Por turma/professor: horários que algum grupo ainda pode usar (uns)
+        # e que dois ou mais podem usar (dois)
+        uns_turma, dois_turma = [0] * len(self.turmas), [0] * len(self.turmas)
+        uns_professor, dois_professor = [0] * len(self.professores), [0] * len(self.professores)
+
+        for g, restantes in enumerate(self.restantes):
+            if not restantes:
+                continue
+            _, turma, professor, _ = self.grupos[g]
+            dominio = dominios[g] = self.dominio(g)
+            if dominio.bit_count() < restantes:
+                return False
+            dois_turma[turma] |= uns_turma[turma] & dominio
+            uns_turma[turma] |= dominio
+            dois_professor[professor] |= uns_professor[professor] & dominio
+            uns_professor[professor] |= dominio
+
+        if not dominios:
+            return None
+
+        folga_turma = [u.bit_count() - r for u, r in zip(uns_turma, self.restantes_turma)]
+        folga_professor = [u.bit_count() - r for u, r in zip(uns_professor, self.restantes_professor)]
+        if min(folga_turma) < 0 or min(folga_professor) < 0:
+            return False
+
+        # Turma/professor sem folga precisa usar todos esses horários: o que
+        # só um grupo pode ocupar é dele (jogada forçada)
+        for uns, dois, folgas, grupos_de in (
+            (uns_turma, dois_turma, folga_turma, self.grupos_da_turma),
+            (uns_professor, dois_professor, folga_professor, self.grupos_do_professor),
+        ):
+            for i, folga in enumerate(folgas):
+                unicos = uns[i] & ~dois[i]
+                if folga == 0 and unicos:
+                    horario = (unicos & -unicos).bit_length() - 1
+                    g = next(g for g in grupos_de[i] if dominios.get(g, 0) >> horario & 1)
+                    return g, [horario]
+
+        melhor = min(
+            dominios,
+            key=lambda g: (
+                min(dominios[g].bit_count() - self.restantes[g],
+                    folga_turma[self.grupos[g][1]], folga_professor[self.grupos[g][2]]),
+                dominios[g].bit_count() - self.restantes[g],
+                -self.restantes_professor[self.grupos[g][2]],
+                self.sorteio[g],
+            ),
+        )
+        return melhor, None
+
+    def ordenar_candidatos(self, g):
+        """Horários do domínio, primeiro os que menos atrapalham os outros grupos"""
+        _, turma, professor, _ = self.grupos[g]
+        dominio = self.dominio(g)
+        vizinhos = [
+            self.dominio(h)
+            for h in self.grupos_da_turma[turma] + self.grupos_do_professor[professor]
+            if h != g and self.restantes[h]
+        ]
+
+        candidatos = []
+        horario = 0
+        while dominio:
+            if dominio & 1:
+                bit = 1 << horario
+                disputa = sum(1 for v in vizinhos if v & bit)
+                dia = horario // self.horarios
+                candidatos.append((self.por_dia[g][dia], disputa, self.aleatorio.random(), horario))
+            dominio >>= 1
+            horario += 1
+        candidatos.sort()
+        return [c[3] for c in candidatos]
+
+    def atribuir(self, g, horario):
+        _, turma, professor, _ = self.grupos[g]
+        bit = 1 << horario
+        self.turma_livre[turma] &= ~bit
+        self.professor_livre[professor] &= ~bit
+        self.restantes[g] -= 1
+        self.restantes_turma[turma] -= 1
+        self.restantes_professor[professor] -= 1
+        self.por_dia[g][horario // self.horarios] += 1
+
+    def desfazer(self, g, horario):
+        _, turma, professor, _ = self.grupos[g]
+        bit = 1 << horario
+        self.turma_livre[turma] |= bit
+        self.professor_livre[professor] |= bit
+        self.restantes[g] += 1
+        self.restantes_turma[turma] += 1
+        self.restantes_professor[professor] += 1
+        self.por_dia[g][horario // self.horarios] -= 1
+
+    def colorir(self):
+        """Sem limite por dia: coloração das arestas turma–professor (sempre acha).
+
+        Cada aula é uma aresta e cada horário uma cor. Para a aresta (t, p),
+        pega um horário a livre na turma e b livre no professor; se a estiver
+        ocupado no professor, troca a ↔ b na cadeia de aulas que alterna a e b
+        a partir dele — num grafo bipartido a cadeia não volta à turma t, e a
+        fica livre nos dois.
+        """
+        na_turma = [{} for _ in self.turmas]            # horário → aula
+        no_professor = [{} for _ in self.professores]
+        horario_da_aula, grupo_da_aula = [], []
+        por_dia = [[0] * DIAS_SEMANA for _ in self.grupos]
+
+        for g, (_, turma, professor, aulas) in enumerate(self.grupos):
+            for _ in range(aulas):
+                aula = len(grupo_da_aula)
+                grupo_da_aula.append(g)
+                horario_da_aula.append(None)
+
+                # Livre na turma; de preferência livre também no professor
+                # (evita a troca em cadeia) e num dia com menos aulas da disciplina
+                a = min(
+                    (h for h in range(self.total_horarios) if h not in na_turma[turma]),
+                    key=lambda h: (h in no_professor[professor], por_dia[g][h // self.horarios], h),
+                )
+                if a in no_professor[professor]:
+                    b = next(h for h in range(self.total_horarios) if h not in no_professor[professor])
+                    self.trocar_cadeia(professor, a, b, na_turma, no_professor, horario_da_aula, grupo_da_aula, por_dia)
+
+                horario_da_aula[aula] = a
+                na_turma[turma][a] = no_professor[professor][a] = aula
+                por_dia[g][a // self.horarios] += 1
+
+        return self.resultado(zip(grupo_da_aula, horario_da_aula))
+
+    def trocar_cadeia(self, professor, a, b, na_turma, no_professor, horario_da_aula, grupo_da_aula, por_dia):
+        """Troca a ↔ b nas aulas da cadeia alternada que começa no professor"""
+        cadeia = []
+        no_lado_professor, vertice, cor = True, professor, a
+        while True:
+            mapa = no_professor[vertice] if no_lado_professor else na_turma[vertice]
+            if cor not in mapa:
+                break
+            aula = mapa[cor]
+            cadeia.append(aula)
+            _, turma, prof, _ = self.grupos[grupo_da_aula[aula]]
+            vertice = turma if no_lado_professor else prof
+            no_lado_professor = not no_lado_professor
+            cor = b if cor == a else a
+
+        for aula in cadeia:
+            g = grupo_da_aula[aula]
+            _, turma, prof, _ = self.grupos[g]
+            antigo = horario_da_aula[aula]
+            del na_turma[turma][antigo], no_professor[prof][antigo]
+            por_dia[g][antigo // self.horarios] -= 1
+        for aula in cadeia:
+            g = grupo_da_aula[aula]
+            _, turma, prof, _ = self.grupos[g]
+            novo = b if horario_da_aula[aula] == a else a
+            horario_da_aula[aula] = novo
+            na_turma[turma][novo] = no_professor[prof][novo] = aula
+            por_dia[g][novo // self.horarios] += 1
+
+    def resultado(self, aulas):
+        """[(grupo, horário)] → {turma_id: {(dia, horario): disciplina_id}}"""
+        grades = defaultdict(dict)
+        for g, horario in aulas:
+            disciplina_id, turma, _, _ = self.grupos[g]
+            grades[self.turmas[turma]][divmod(horario, self.horarios)] = disciplina_id
+        return grades
+
+
+def conferir(turmas, disciplinas, grades):
+    """Problemas de uma solução (lista vazia = ok): choques de professor e aulas a mais ou a menos"""
+    professor_de = {d[0]: d[2] for d in disciplinas}
+    problemas = []
+
+    ocupados = {}
+    contagem = defaultdict(int)
+    for turma_id, celulas in grades.items():
+        for (dia, horario), disciplina_id in celulas.items():
+            contagem[disciplina_id] += 1
+            chave = (professor_de[disciplina_id], turmas[turma_id], dia, horario)
+            if chave in ocupados:
+                problemas.append(f'Choque: professor {chave[0]} nas turmas {ocupados[chave]} e {turma_id}.')
+            ocupados[chave] = turma_id
+
+    for disciplina_id, _, _, aulas in disciplinas:
+        if contagem[disciplina_id] != aulas:
+            problemas.append(f'Disciplina {disciplina_id}: {contagem[disciplina_id]} de {aulas} aulas.')
+    return problemas
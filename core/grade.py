@@ -0,0 +1,401 @@
+import hashlib
+import json
+import time
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.template.loader import render_to_string
+
+from .gerador_grade import resolver
+from .models import AulaGrade, Disciplina, Turma
+
+
+# ======================== GRADE HORÁRIA ========================
+# Cada célula da grade é uma linha de AulaGrade (turma, dia, horário →
+# disciplina). O banco não deixa a turma ter duas aulas no mesmo horário nem
+# o professor estar em duas turmas ao mesmo tempo; aqui ficam as leituras
+# indexadas e a gravação, que confere os choques antes para dar uma mensagem
+# melhor que a do IntegrityError.
+
+DIAS = tuple(dia for dia, _ in AulaGrade.DIA_CHOICES)
+NOMES_DIAS = tuple(nome for _, nome in AulaGrade.DIA_CHOICES)
+CHAVE_CHOQUE = ('professor_id', 'ano', 'turno', 'dia', 'horario')
+
+# Horários de cada turno; AulaGrade.horario é a posição nesta lista
+HORARIOS = {
+    'manha': [
+        '07:00 às 07:45',
+        '07:45 às 08:30',
+        '08:50 às 09:35',
+        '09:35 às 10:20',
+        '10:30 às 11:15',
+        '11:15 às 12:00',
+    ],
+    'tarde': [
+        '13:00 às 13:45',
+        '13:45 às 14:30',
+        '14:50 às 15:35',
+        '15:35 às 16:20',
+        '16:30 às 17:15',
+        '17:15 às 18:00',
+    ],
+    'noite': [
+        '19:00 às 19:45',
+        '19:45 às 20:30',
+        '20:40 às 21:25',
+        '21:25 às 22:00',
+    ],
+}
+
+
+class GradeInvalida(Exception):
+    pass
+
+
+def turno_canonico(turno):
+    """'Manhã' / ' manha ' → 'manha' (chave de HORARIOS); None se o turno não existir"""
+    turno = (turno or '').strip().lower().replace('ã', 'a').replace('á', 'a')
+    return turno if turno in HORARIOS else None
+
+
+def horarios_do_turno(turno):
+    """Rótulos dos horários do turno (aceita 'Manhã' além de 'manha'); [] se não existir"""
+    return HORARIOS.get(turno_canonico(turno), [])
+
+
+def aulas_fora_do_turno(turma_id, turno):
+    """Aulas da turma num horário que o turno não tem (ex. 6º horário ao passar para a noite)"""
+    return AulaGrade.objects.filter(turma_id=turma_id, horario__gte=len(horarios_do_turno(turno)))
+
+
+def celulas_da_grade(turma_id):
+    """{(dia, horario): (disciplina_id, nome)} — uma consulta pelo índice da turma"""
+    return {
+        (dia, horario): (disciplina_id, nome)
+        for dia, horario, disciplina_id, nome in AulaGrade.objects.filter(turma_id=turma_id)
+        .values_list('dia', 'horario', 'disciplina_id', 'disciplina__nome')
+    }
+
+
+def formatar_grade(horarios, celulas):
+    """{rótulo do horário: {dia: nome da disciplina}}, ou None se a grade estiver vazia"""
+    if not horarios or not celulas:
+        return None
+    return {
+        rotulo: {dia: celulas.get((dia, i), (None, ''))[1] for dia in DIAS}
+        for i, rotulo in enumerate(horarios)
+    }
+
+
+def horarios_ocupados(turma, professores):
+    """{(professor_id, dia, horario)} em que esses professores dão aula em outras turmas"""
+    return set(
+        AulaGrade.objects.filter(ano=turma.ano, turno=turma.turno, professor_id__in=professores)
+        .exclude(turma_id=turma.id)
+        .values_list('professor_id', 'dia', 'horario')
+    )
+
+
+def choques(aulas, **novos):
+    """Aulas (queryset) que bateriam com outras se passassem a ter os valores novos.
+
+    novos: professor_id, ano e/ou turno — o que a edição da disciplina ou da
+    turma vai mudar. Duas consultas, qualquer que seja o tamanho da grade.
+    """
+    movidas = {}
+    for aula in aulas.values('id', *CHAVE_CHOQUE):
+        movidas[aula.pop('id')] = tuple(novos.get(campo, aula[campo]) for campo in CHAVE_CHOQUE)
+    if not movidas:
+        return []
+
+    chaves = set(movidas.values())
+    outras = set(
+        AulaGrade.objects.filter(
+            professor_id__in={c[0] for c in chaves}, ano__in={c[1] for c in chaves}, turno__in={c[2] for c in chaves},
+        )
+        .exclude(id__in=movidas)
+        .values_list(*CHAVE_CHOQUE)
+    )
+    return sorted(aula_id for aula_id, chave in movidas.items() if chave in outras)
+
+
+def salvar_grade(turma, celulas):
+    """Grava a grade da turma. celulas: {(dia, horario): disciplina (da turma)}.
+
+    Só mexe nas células que mudaram e devolve quantas foram. Levanta
+    GradeInvalida se algum professor já estiver ocupado no horário em outra
+    turma (nada é gravado).
+    """
+    atuais = {chave: disciplina_id for chave, (disciplina_id, _) in celulas_da_grade(turma.id).items()}
+    novas = {chave: d for chave, d in celulas.items() if atuais.get(chave) != d.id}
+    removidas = [chave for chave in atuais if chave not in celulas or chave in novas]
+
+    ocupados = horarios_ocupados(turma, {d.professor_id for d in novas.values()})
+    conflitos = sorted(
+        f'{d.nome} ({dict(AulaGrade.DIA_CHOICES)[dia]}, {horario + 1}º horário)'
+        for (dia, horario), d in novas.items()
+        if (d.professor_id, dia, horario) in ocupados
+    )
+    if conflitos:
+        raise GradeInvalida('Professor já ocupado em outra turma: ' + ', '.join(conflitos) + '.')
+
+    try:
+        with transaction.atomic():
+            for dia in DIAS:
+                horarios = [horario for d, horario in removidas if d == dia]
+                if horarios:
+                    AulaGrade.objects.filter(turma=turma, dia=dia, horario__in=horarios).delete()
+            AulaGrade.objects.bulk_create([
+                AulaGrade(
+                    turma=turma, disciplina=d, professor_id=d.professor_id,
+                    ano=turma.ano, turno=turma.turno, dia=dia, horario=horario,
+                )
+                for (dia, horario), d in novas.items()
+            ])
+    except IntegrityError:
+        # Outra grade pegou o mesmo professor e horário entre a conferência e a gravação
+        raise GradeInvalida('A grade foi alterada por outra pessoa ao mesmo tempo; confira e salve de novo.')
+
+    if novas or removidas:
+        invalidar_grades_turmas([turma])
+    return len(set(novas) | set(removidas))
+
+
+# ======================== GERAÇÃO AUTOMÁTICA ========================
+def gerar_grades_ano(ano, horarios_por_turno):
+    """Grades de todas as turmas do ano pelo gerador (nada é gravado).
+
+    horarios_por_turno: {turno: horários por dia}.
+    Retorna (turmas, grades, folga) com grades = {turma_id: {(dia, horario):
+    disciplina}} e folga como em gerador_grade.resolver. Levanta SemSolucao, ou
+    GradeInvalida se alguma turma tem um turno fora de HORARIOS.
+    """
+    turmas = list(Turma.objects.filter(ano=ano).order_by('nome', 'id'))
+
+    # O gerador agrupa pelo turno: 'Manhã' e 'manha' precisam cair no mesmo
+    turnos = {t.id: turno_canonico(t.turno) for t in turmas}
+    sem_turno = [f'{t.nome} ("{t.turno}")' for t in turmas if turnos[t.id] is None]
+    if sem_turno:
+        raise GradeInvalida(
+            f"Turno desconhecido nas turmas {', '.join(sem_turno)}; corrija o turno "
+            f"({', '.join(HORARIOS)}) antes de gerar as grades."
+        )
+    disciplinas = list(Disciplina.objects.filter(turma__ano=ano).select_related('professor').order_by('id'))
+
+    rotulos = {('turma', t.id): f'Turma {t.nome}' for t in turmas}
+    rotulos.update({('professor', d.professor_id): d.professor.nome_completo for d in disciplinas})
+
+    resultado, folga = resolver(
+        turnos,
+        [(d.id, d.turma_id, d.professor_id, d.aulas_semanais) for d in disciplinas],
+        horarios_por_turno,
+        rotulos,
+    )
+
+    por_id = {d.id: d for d in disciplinas}
+    grades = {
+        turma_id: {(DIAS[dia], horario): por_id[disciplina_id] for (dia, horario), disciplina_id in celulas.items()}
+        for turma_id, celulas in resultado.items()
+    }
+    return turmas, grades, folga
+
+
+# A prévia mostrada é a que vai para o banco: fica na sessão com a impressão
+# das entradas do gerador no momento em que foi gerada; "aplicar" grava essa
+# prévia, e não uma nova geração, e recusa se as entradas mudaram desde então.
+
+SESSAO_PREVIA_GRADES = 'previa_grades'
+
+
+def impressao_do_ano(ano, horarios_por_turno):
+    """Hash de tudo que o gerador usa no ano: turnos das turmas e disciplinas (turma, professor, aulas)"""
+    entradas = [
+        sorted(horarios_por_turno.items()),
+        list(Turma.objects.filter(ano=ano).order_by('id').values_list('id', 'turno')),
+        list(
+            Disciplina.objects.filter(turma__ano=ano).order_by('id')
+            .values_list('id', 'turma_id', 'professor_id', 'aulas_semanais')
+        ),
+    ]
+    return hashlib.sha256(json.dumps(entradas).encode()).hexdigest()
+
+
+def guardar_previa(ano, impressao, grades):
+    """Prévia em forma de sessão (JSON): {'ano', 'impressao', 'grades': {turma_id: [[dia, horario, disciplina_id]]}}"""
+    return {
+        'ano': ano,
+        'impressao': impressao,
+        'grades': {
+            str(turma_id): [[dia, horario, d.id] for (dia, horario), d in celulas.items()]
+            for turma_id, celulas in grades.items()
+        },
+    }
+
+
+def aplicar_previa(previa, horarios_por_turno):
+    """Grava exatamente as grades da prévia guardada. Retorna as turmas.
+
+    Levanta GradeInvalida se turmas ou disciplinas do ano mudaram depois da
+    prévia (a conferência e a gravação ficam na mesma transação).
+    """
+    ano = previa['ano']
+    with transaction.atomic():
+        if impressao_do_ano(ano, horarios_por_turno) != previa['impressao']:
+            raise GradeInvalida(
+                f'Turmas ou disciplinas de {ano} mudaram depois da prévia; visualize de novo antes de aplicar.'
+            )
+        turmas = list(Turma.objects.filter(ano=ano).order_by('nome', 'id'))
+        por_id = Disciplina.objects.in_bulk(
+            {disciplina_id for celulas in previa['grades'].values() for _, _, disciplina_id in celulas}
+        )
+        aplicar_grades_ano(turmas, {
+            int(turma_id): {(dia, horario): por_id[disciplina_id] for dia, horario, disciplina_id in celulas}
+            for turma_id, celulas in previa['grades'].items()
+        })
+    return turmas
+
+
+def aplicar_grades_ano(turmas, grades):
+    """Troca, de uma vez, as grades dessas turmas pelas geradas"""
+    with transaction.atomic():
+        AulaGrade.objects.filter(turma__in=turmas).delete()
+        AulaGrade.objects.bulk_create([
+            AulaGrade(
+                turma=turma, disciplina=d, professor_id=d.professor_id,
+                ano=turma.ano, turno=turma.turno, dia=dia, horario=horario,
+            )
+            for turma in turmas
+            for (dia, horario), d in grades.get(turma.id, {}).items()
+        ], batch_size=1000)
+        invalidar_grades_turmas(turmas)
+
+
+# ======================== GRADE DA TURMA EM CACHE ========================
+# A grade formatada e o HTML da tabela são os mesmos para todos os alunos da
+# turma: ficam em cache por versão da grade, que muda quando a grade (ou o
+# nome de uma disciplina dela, ou o turno) muda.
+
+GRADE_TIMEOUT = 60 * 60 * 24
+
+
+def chave_grade_turma(turma_id):
+    return f'grade:turma:{turma_id}'
+
+
+def chave_versao_grade(turma_id):
+    return f'grade:turma:{turma_id}:versao'
+
+
+def versao_grade(turma_id):
+    versao = cache.get(chave_versao_grade(turma_id))
+    if versao is None:
+        versao = time.time_ns()
+        cache.set(chave_versao_grade(turma_id), versao, None)
+    return versao
+
+
+def invalidar_grades(turmas):
+    """Troca a versão da grade dessas turmas (ids)"""
+    versao = time.time_ns()
+    cache.set_many({chave_versao_grade(t): versao for t in set(turmas) if t}, None)
+
+
+def invalidar_grades_turmas(turmas):
+    """Grades dessas turmas e semanas de quem dá aula nelas, depois do commit"""
+    turma_ids = [turma.id for turma in turmas]
+    professores = list(
+        Disciplina.objects.filter(turma_id__in=turma_ids).values_list('professor_id', flat=True).distinct()
+    )
+
+    def invalidar():
+        invalidar_grades(turma_ids)
+        invalidar_semanas(professores)
+
+    transaction.on_commit(invalidar)
+
+
+def obter_grade_turma(turma):
+    """{'grade': formatar_grade(...), 'html': tabela pronta} da turma, com cache"""
+    versao = versao_grade(turma.id)
+    em_cache = cache.get(chave_grade_turma(turma.id))
+    if em_cache and em_cache['versao'] == versao:
+        return em_cache
+
+    grade = formatar_grade(horarios_do_turno(turma.turno), celulas_da_grade(turma.id))
+    resultado = {
+        'versao': versao,
+        'grade': grade,
+        'html': render_to_string('core/grade_tabela.html', {'grade_horario': grade, 'nomes_dias': NOMES_DIAS}),
+    }
+    cache.set(chave_grade_turma(turma.id), resultado, GRADE_TIMEOUT)
+    return resultado
+
+
+# ======================== SEMANA DO PROFESSOR ========================
+# Todas as aulas do professor no ano, de todas as turmas, numa consulta pelo
+# índice (professor, ano, ...) da restrição de choque. Fica em cache por
+# professor e ano; qualquer mudança numa grade com disciplina dele troca a
+# versão do professor (invalidar_semanas), como no boletim.
+
+SEMANA_TIMEOUT = 60 * 60 * 24
+
+
+def chave_semana(professor_id, ano):
+    return f'grade:semana:{professor_id}:{ano}'
+
+
+def chave_versao_professor(professor_id):
+    return f'grade:professor:{professor_id}:versao'
+
+
+def versao_professor(professor_id):
+    versao = cache.get(chave_versao_professor(professor_id))
+    if versao is None:
+        versao = time.time_ns()
+        cache.set(chave_versao_professor(professor_id), versao, None)
+    return versao
+
+
+def invalidar_semanas(professores):
+    """Troca a versão desses professores (ids) → as semanas deles são refeitas"""
+    versao = time.time_ns()
+    cache.set_many({chave_versao_professor(p): versao for p in set(professores) if p}, None)
+
+
+def montar_semana(professor_id, ano):
+    """[{turno, linhas: [{horario, aulas: [{turma, disciplina} ou None por dia]}]}]
+
+    Só entram os turnos em que o professor tem aula.
+    """
+    aulas = {}
+    for turno, dia, horario, turma_id, turma, disciplina in (
+        AulaGrade.objects.filter(professor_id=professor_id, ano=ano)
+        .values_list('turno', 'dia', 'horario', 'turma_id', 'turma__nome', 'disciplina__nome')
+    ):
+        aulas.setdefault(turno, {})[(dia, horario)] = {'turma_id': turma_id, 'turma': turma, 'disciplina': disciplina}
+
+    nomes_turnos = dict(Turma.TURNO_CHOICES)
+    semana = []
+    for turno, horarios in HORARIOS.items():
+        if turno not in aulas:
+            continue
+        semana.append({
+            'turno': nomes_turnos.get(turno, turno),
+            'linhas': [
+                {'horario': rotulo, 'aulas': [aulas[turno].get((dia, i)) for dia in DIAS]}
+                for i, rotulo in enumerate(horarios)
+            ],
+        })
+    return {'semana': semana, 'total_aulas': sum(len(celulas) for celulas in aulas.values())}
+
+
+def obter_semana(professor_id, ano):
+    """montar_semana com cache (válido enquanto a versão do professor não mudar)"""
+    versao = versao_professor(professor_id)
+    em_cache = cache.get(chave_semana(professor_id, ano))
+    if em_cache and em_cache['versao'] == versao:
+        return em_cache['semana']
+
+    semana = montar_semana(professor_id, ano)
+    cache.set(chave_semana(professor_id, ano), {'versao': versao, 'semana': semana}, SEMANA_TIMEOUT)
+    return semana
@@ -0,0 +1,214 @@
+import csv
+import io
+import re
+import unicodedata
+from collections import defaultdict
+from itertools import chain
+
+from openpyxl import load_workbook
+
+from .cpf import TIPOS, cpf_valido, dono_do_cpf, so_digitos
+from .lancamento import NotaInvalida, comparar_lote, interpretar_nota, salvar_lote
+from .models import Aluno
+
+
+# ======================== IMPORTAÇÃO DE NOTAS ========================
+# Lê planilhas (CSV ou XLSX) linha a linha e grava em lotes de TAMANHO_LOTE
+# linhas, cada lote na sua transação, pelo mesmo caminho do lancar_nota
+# (salvar_lote). Só os índices de alunos/disciplinas do escopo ficam em
+# memória, nunca o arquivo inteiro.
+#
+# Uma linha = um aluno numa disciplina: CPF e/ou nome do aluno, a disciplina
+# (dispensável quando o escopo é uma disciplina só) e as colunas de bimestre.
+# Célula vazia não altera a nota, como no formulário.
+
+TAMANHO_LOTE = 2000
+LIMITE_PREVIA = 200
+LIMITE_ERROS = 200
+
+COLUNAS = {
+    'cpf': 'cpf',
+    'aluno': 'aluno',
+    'nome': 'aluno',
+    'nome do aluno': 'aluno',
+    'nome completo': 'aluno',
+    'disciplina': 'disciplina',
+}
+COLUNA_BIMESTRE = re.compile(r'(nota|bimestre|bim|b)?\s*([1-4])\s*o?\s*(bimestre|bim)?')
+
+
+class ImportacaoInvalida(ValueError):
+    pass
+
+
+def normalizar(texto):
+    """'  José  da SILVA ' → 'jose da silva' (sem acento, caixa ou espaços extras)"""
+    texto = unicodedata.normalize('NFKD', str(texto or ''))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.casefold().split())
+
+
+def aluno_nao_encontrado(cpf):
+    """Mensagem de erro, dizendo de quem é o CPF quando ele existe fora do escopo"""
+    dono = dono_do_cpf(cpf) if cpf else None
+    if dono is None:
+        return 'Aluno não encontrado no escopo da importação.'
+    if dono[0] == 'aluno':
+        return 'O CPF é de um aluno de outra turma, fora do escopo da importação.'
+    return f'O CPF é de um(a) {TIPOS[dono[0]].lower()}, não de um aluno.'
+
+
+def ler_linhas(arquivo, nome):
+    """Gera as linhas (tuplas) de um arquivo binário .csv ou .xlsx sem carregá-lo todo"""
+    if nome.lower().endswith('.xlsx'):
+        planilha = load_workbook(arquivo, read_only=True, data_only=True)
+        try:
+            yield from planilha.active.iter_rows(values_only=True)
+        finally:
+            planilha.close()
+        return
+
+    texto = io.TextIOWrapper(arquivo, encoding='utf-8-sig', newline='')
+    try:
+        primeira = texto.readline()
+        separador = ';' if primeira.count(';') > primeira.count(',') else ','
+        yield from csv.reader(chain([primeira], texto), delimiter=separador)
+    finally:
+        texto.detach()   # quem abriu o arquivo é quem fecha
+
+
+def mapear_cabecalho(cabecalho):
+    """{'cpf': i, 'aluno': i, 'disciplina': i, 1: i, ..., 4: i} a partir da 1ª linha"""
+    colunas = {}
+    for i, titulo in enumerate(cabecalho or ()):
+        titulo = normalizar(titulo)
+        if titulo in COLUNAS:
+            colunas.setdefault(COLUNAS[titulo], i)
+            continue
+        bimestre = COLUNA_BIMESTRE.fullmatch(titulo)
+        if bimestre:
+            colunas.setdefault(int(bimestre.group(2)), i)
+    return colunas
+
+
+def importar_planilha(linhas, disciplinas, simular=False):
+    """Importa as linhas para as disciplinas do escopo (queryset).
+
+    simular=True só compara com o banco (prévia), sem gravar nada.
+    Retorna um resumo com contagens, as primeiras mudanças e os erros.
+    """
+    disciplinas = list(disciplinas.select_related('turma'))
+    if not disciplinas:
+        raise ImportacaoInvalida('Nenhuma disciplina no escopo da importação.')
+
+    unica = disciplinas[0] if len(disciplinas) == 1 else None
+    por_turma_e_nome = {(d.turma_id, normalizar(d.nome)): d for d in disciplinas}
+    nomes_disciplinas = {d.id: f'{d.nome} ({d.turma.nome})' for d in disciplinas}
+
+    # Índices dos alunos do escopo: CPF só com dígitos e nome normalizado
+    por_cpf, por_nome, nomes_alunos = {}, defaultdict(list), {}
+    alunos = Aluno.objects.filter(turma_id__in={d.turma_id for d in disciplinas})
+    for aluno_id, turma_id, cpf, nome in alunos.values_list('id', 'turma_id', 'cpf', 'nome_completo'):
+        por_cpf[so_digitos(cpf)] = (aluno_id, turma_id)
+        por_nome[normalizar(nome)].append((aluno_id, turma_id))
+        nomes_alunos[aluno_id] = nome
+
+    linhas = iter(linhas)
+    colunas = mapear_cabecalho(next(linhas, None))
+    bimestres = [b for b in (1, 2, 3, 4) if b in colunas]
+    if 'cpf' not in colunas and 'aluno' not in colunas:
+        raise ImportacaoInvalida('A planilha precisa de uma coluna "CPF" ou "Aluno".')
+    if not bimestres:
+        raise ImportacaoInvalida('A planilha precisa de ao menos uma coluna de bimestre (ex. "Nota1").')
+    if unica is None and 'disciplina' not in colunas:
+        raise ImportacaoInvalida('Para importar várias disciplinas a planilha precisa da coluna "Disciplina".')
+
+    resultado = {
+        'simulacao': simular,
+        'linhas': 0,
+        'alteradas': 0,
+        'previa': [],
+        'erros': [],
+        'total_erros': 0,
+    }
+
+    def erro(numero, mensagem):
+        resultado['total_erros'] += 1
+        if len(resultado['erros']) < LIMITE_ERROS:
+            resultado['erros'].append({'linha': numero, 'mensagem': mensagem})
+
+    def celula(linha, coluna):
+        i = colunas.get(coluna)
+        return linha[i] if i is not None and i < len(linha) else None
+
+    # Na prévia nada é gravado entre os lotes: o que os lotes anteriores
+    # mudariam fica aqui, para cada lote ser comparado como na importação real
+    pendentes = defaultdict(dict)
+
+    def processar(lote):
+        if simular:
+            mudancas = comparar_lote(lote, pendentes)[3]
+            for mudanca in mudancas:
+                pendentes[(mudanca['disciplina_id'], mudanca['aluno_id'])][mudanca['bimestre']] = mudanca['depois']
+        else:
+            mudancas = salvar_lote(lote)
+
+        resultado['alteradas'] += len(mudancas)
+        for mudanca in mudancas[:LIMITE_PREVIA - len(resultado['previa'])]:
+            resultado['previa'].append({
+                **mudanca,
+                'aluno': nomes_alunos[mudanca['aluno_id']],
+                'disciplina': nomes_disciplinas[mudanca['disciplina_id']],
+            })
+
+    lote, no_lote = defaultdict(lambda: defaultdict(dict)), 0
+
+    for numero, linha in enumerate(linhas, start=2):
+        if not any(valor is not None and str(valor).strip() for valor in linha):
+            continue
+        resultado['linhas'] += 1
+
+        # Aluno: pelo CPF quando houver, senão pelo nome (que precisa ser único)
+        cpf, nome = so_digitos(celula(linha, 'cpf')), normalizar(celula(linha, 'aluno'))
+        cpf = cpf.zfill(11) if cpf else cpf   # planilhas perdem zeros à esquerda
+        if cpf:
+            encontrado = por_cpf.get(cpf)
+        else:
+            candidatos = por_nome.get(nome, [])
+            if len(candidatos) > 1:
+                erro(numero, f'Há mais de um aluno chamado "{celula(linha, "aluno")}"; informe o CPF.')
+                continue
+            encontrado = candidatos[0] if candidatos else None
+        if cpf and not cpf_valido(cpf):
+            erro(numero, f'CPF inválido: {celula(linha, "cpf")}.')
+            continue
+        if encontrado is None:
+            # A mensagem (uma consulta) só é montada enquanto ainda é guardada
+            erro(numero, aluno_nao_encontrado(cpf) if len(resultado['erros']) < LIMITE_ERROS else '')
+            continue
+        aluno_id, turma_id = encontrado
+
+        if unica is not None and turma_id == unica.turma_id:
+            disciplina = unica
+        else:
+            disciplina = por_turma_e_nome.get((turma_id, normalizar(celula(linha, 'disciplina'))))
+        if disciplina is None:
+            erro(numero, 'Disciplina não encontrada na turma do aluno.')
+            continue
+
+        for b in bimestres:
+            try:
+                valor = interpretar_nota(celula(linha, b))
+            except NotaInvalida as e:
+                erro(numero, f'{b}º bimestre: {e}')
+                continue
+            if valor is not None:
+                lote[disciplina][aluno_id][b] = valor
+
+        no_lote += 1
+        if no_lote >= TAMANHO_LOTE:
+            processar(lote)
+            lote, no_lote = defaultdict(lambda: defaultdict(dict)), 0
+
+    processar(lote)
+    return resultado
@@ -0,0 +1,358 @@
+from collections import defaultdict
+
+from django.db import IntegrityError, connection, transaction
+
+from .boletim import invalidar_boletim_aluno
+from .estatisticas import (
+    aplicar_delta_resumo, atualizar_contadores_disciplinas, bimestres_lancados, deltas_bimestres,
+)
+from .models import Nota
+
+
+# ======================== LANÇAMENTO DE NOTAS ========================
+# Caminho único de gravação de notas: lê as notas existentes uma vez, grava só
+# as células que mudaram (bulk_create / bulk_update) numa transação e acerta
+# os contadores que os signals manteriam, já que as operações em lote não
+# disparam post_save.
+
+NOTA_MINIMA = 0
+NOTA_MAXIMA = 10
+BIMESTRES = (1, 2, 3, 4)
+
+
+class NotaInvalida(ValueError):
+    pass
+
+
+def interpretar_nota(valor):
+    """'7,5' → 7.5 | '' → None (célula não preenchida). Levanta NotaInvalida.
+
+    Aceita também números (JSON, planilhas).
+    """
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        valor = str(valor)
+    if valor is not None and not isinstance(valor, str):
+        raise NotaInvalida('Nota inválida.')
+
+    valor = (valor or '').strip()
+    if valor == '':
+        return None
+
+    try:
+        numero = float(valor.replace(',', '.'))
+    except ValueError:
+        raise NotaInvalida('Nota inválida.')
+
+    if not NOTA_MINIMA <= numero <= NOTA_MAXIMA:
+        raise NotaInvalida(f'A nota deve estar entre {NOTA_MINIMA} e {NOTA_MAXIMA}.')
+
+    return numero
+
+
+def ler_formulario_notas(dados, alunos):
+    """Lê os campos nota<bimestre>_<aluno_id> do POST.
+
+    Retorna (celulas, erros):
+      celulas → {aluno_id: {bimestre: valor}} só com as células preenchidas
+      erros   → {aluno_id: {bimestre: {'valor', 'mensagem'}}} com as inválidas
+    """
+    celulas = defaultdict(dict)
+    erros = defaultdict(dict)
+
+    for aluno in alunos:
+        for bimestre in BIMESTRES:
+            bruto = dados.get(f'nota{bimestre}_{aluno.pk}', '')
+            try:
+                valor = interpretar_nota(bruto)
+            except NotaInvalida as e:
+                erros[aluno.pk][bimestre] = {'valor': bruto.strip(), 'mensagem': str(e)}
+                continue
+
+            if valor is not None:
+                celulas[aluno.pk][bimestre] = valor
+
+    return dict(celulas), dict(erros)
+
+
+def ler_anteriores(dados, alunos):
+    """Lê os campos ocultos anterior<bimestre>_<aluno_id>: o valor que a tela mostrava.
+
+    Retorna {aluno_id: {bimestre: valor ou None}}; campo ausente ou inválido
+    fica de fora (a célula é gravada sem conferência).
+    """
+    anteriores = defaultdict(dict)
+    for aluno in alunos:
+        for bimestre in BIMESTRES:
+            campo = f'anterior{bimestre}_{aluno.pk}'
+            if campo not in dados:
+                continue
+            try:
+                anteriores[aluno.pk][bimestre] = interpretar_nota(dados[campo])
+            except NotaInvalida:
+                continue
+    return dict(anteriores)
+
+
+def ler_celulas_json(brutas, alunos_ids):
+    """Valida a lista de células vinda do autosave.
+
+    brutas: [{'aluno_id', 'bimestre', 'valor', 'anterior'}, ...] — valor
+    vazio/None limpa a célula. Retorna (celulas, erros).
+    """
+    celulas, erros = [], []
+
+    for bruta in brutas:
+        try:
+            aluno_id = int(bruta['aluno_id'])
+            bimestre = int(bruta['bimestre'])
+            anterior = bruta.get('anterior')
+            anterior = None if anterior in (None, '') else float(anterior)
+        except (KeyError, TypeError, ValueError):
+            erros.append({'celula': bruta, 'mensagem': 'Célula mal formada.'})
+            continue
+
+        if aluno_id not in alunos_ids or bimestre not in BIMESTRES:
+            erros.append({'celula': bruta, 'mensagem': 'Aluno ou bimestre fora desta disciplina.'})
+            continue
+
+        try:
+            valor = interpretar_nota(bruta.get('valor'))
+        except NotaInvalida as e:
+            erros.append({'celula': bruta, 'mensagem': str(e)})
+            continue
+
+        celulas.append({'aluno_id': aluno_id, 'bimestre': bimestre, 'valor': valor, 'anterior': anterior})
+
+    return celulas, erros
+
+
+def salvar_notas(disciplina, celulas, anteriores=None):
+    """Grava as células {aluno_id: {bimestre: valor}} de uma disciplina.
+
+    Só o que difere do banco é escrito. Tudo acontece numa transação; os
+    contadores da disciplina e do ano são acertados com um UPDATE cada.
+
+    anteriores: {aluno_id: {bimestre: valor}} que a tela mostrava (ler_anteriores).
+    Como no autosave, a célula que outra pessoa mudou depois disso não é
+    sobrescrita e volta em conflitos.
+
+    Retorna (número de células alteradas, conflitos).
+    """
+    with transaction.atomic():
+        conflitos = []
+        if anteriores:
+            celulas, conflitos = separar_conflitos(disciplina, celulas, anteriores)
+        return len(salvar_lote({disciplina: celulas})), conflitos
+
+
+def separar_conflitos(disciplina, celulas, anteriores):
+    """(células livres, conflitos) comparando o banco com o que a tela mostrava. Uma consulta.
+
+    O formulário envia todas as células preenchidas: a que ainda tem o valor
+    anterior não foi editada e fica de fora (nem gravada, nem conflito), para
+    não devolver ao banco um valor velho por cima do de outra pessoa.
+    Conflito: célula editada cujo anterior já não está no banco, que também
+    não tem o valor novo (se já tem, não há o que gravar nem o que perder).
+    """
+    atuais = {
+        aluno_id: valores
+        for aluno_id, *valores in Nota.objects.filter(disciplina=disciplina, aluno_id__in=celulas)
+        .values_list('aluno_id', 'nota1', 'nota2', 'nota3', 'nota4')
+    }
+
+    livres, conflitos = defaultdict(dict), []
+    for aluno_id, valores in celulas.items():
+        for bimestre, valor in valores.items():
+            atual = atuais.get(aluno_id, [None] * 4)[bimestre - 1]
+            anterior = anteriores.get(aluno_id, {}).get(bimestre, atual)
+            if valor == anterior:
+                continue
+            if atual != anterior and atual != valor:
+                conflitos.append({
+                    'aluno_id': aluno_id, 'bimestre': bimestre,
+                    'valor': valor, 'anterior': anterior, 'atual': atual,
+                })
+            else:
+                livres[aluno_id][bimestre] = valor
+
+    return dict(livres), conflitos
+
+
+def comparar_lote(lote, pendentes=None):
+    """Aplica o lote {disciplina: {aluno_id: {bimestre: valor}}} em memória.
+
+    Uma consulta lê as notas existentes de todas as disciplinas do lote.
+    pendentes: {(disciplina_id, aluno_id): {bimestre: valor}} ainda não
+    gravados (prévia da importação), aplicados por cima do banco antes de comparar.
+    Retorna (novas, alteradas, deltas, mudancas):
+      novas     → Notas ainda não gravadas, com pelo menos um bimestre
+      alteradas → {(campos alterados): [notas existentes]}
+      deltas    → {disciplina: [variação de lançadas por bimestre]}
+      mudancas  → [{'disciplina_id', 'aluno_id', 'bimestre', 'antes', 'depois'}]
+    """
+    lote = {disciplina: celulas for disciplina, celulas in lote.items() if celulas}
+    novas, alteradas, deltas, mudancas = [], defaultdict(list), {}, []
+    if not lote:
+        return novas, alteradas, deltas, mudancas
+
+    existentes = {
+        (nota.disciplina_id, nota.aluno_id): nota
+        for nota in Nota.objects.filter(
+            disciplina_id__in=[disciplina.id for disciplina in lote],
+            aluno_id__in={aluno_id for celulas in lote.values() for aluno_id in celulas},
+        )
+    }
+
+    for disciplina, celulas in lote.items():
+        delta = [0, 0, 0, 0]
+
+        for aluno_id, valores in celulas.items():
+            nota = existentes.get((disciplina.id, aluno_id))
+            if nota is None:
+                nota = Nota(aluno_id=aluno_id, disciplina_id=disciplina.id)
+            if pendentes:
+                for b, valor in pendentes.get((disciplina.id, aluno_id), {}).items():
+                    setattr(nota, f'nota{b}', valor)
+
+            antes = bimestres_lancados(nota)
+            campos = []
+            for b, valor in sorted(valores.items()):
+                anterior = getattr(nota, f'nota{b}')
+                if anterior != valor:
+                    campos.append(f'nota{b}')
+                    mudancas.append({
+                        'disciplina_id': disciplina.id, 'aluno_id': aluno_id,
+                        'bimestre': b, 'antes': anterior, 'depois': valor,
+                    })
+                    setattr(nota, f'nota{b}', valor)
+            if not campos:
+                continue
+
+            depois = bimestres_lancados(nota)
+            delta = [d + (n - a) for d, a, n in zip(delta, antes, depois)]
+
+            if nota.pk:
+                alteradas[tuple(campos)].append(nota)
+            elif any(depois):
+                novas.append(nota)
+
+        deltas[disciplina] = delta
+
+    return novas, alteradas, deltas, mudancas
+
+
+def salvar_lote(lote):
+    """Grava um lote de várias disciplinas numa transação. Retorna as mudanças."""
+    with transaction.atomic():
+        novas, alteradas, deltas, mudancas = comparar_lote(lote)
+
+        if novas:
+            Nota.objects.bulk_create(novas)
+
+        # Um UPDATE preparado por combinação de bimestres alterados, para não
+        # reescrever células que o professor não tocou. executemany em vez de
+        # bulk_update: o CASE WHEN do bulk_update custa caro em Python e no
+        # SQLite quando o lote tem milhares de linhas.
+        for campos, notas in alteradas.items():
+            atualizar_notas(notas, campos)
+
+        acertar_contadores(deltas, {mudanca['aluno_id'] for mudanca in mudancas})
+
+    return mudancas
+
+
+def atualizar_notas(notas, campos):
+    quote = connection.ops.quote_name
+    atribuicoes = ', '.join(f'{quote(campo)} = %s' for campo in campos)
+    sql = f'UPDATE {quote(Nota._meta.db_table)} SET {atribuicoes} WHERE {quote("id")} = %s'
+
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [[getattr(nota, campo) for campo in campos] + [nota.pk] for nota in notas])
+
+
+def acertar_contadores(deltas, alunos_alterados):
+    """Faz o que os signals de Nota fariam, para as gravações em lote.
+
+    deltas: {disciplina: variação de notas lançadas por bimestre, ex. [3, 0, -1, 0]}
+    """
+    por_ano = defaultdict(int)
+    for disciplina, delta in deltas.items():
+        if any(delta):
+            atualizar_contadores_disciplinas({'pk': disciplina.id}, **deltas_bimestres((0, 0, 0, 0), delta))
+            por_ano[disciplina.turma.ano] += sum(delta)
+
+    for ano, total in por_ano.items():
+        if total:
+            aplicar_delta_resumo(ano, total_notas_lancadas=total)
+
+    def invalidar_boletins():
+        for aluno_id in alunos_alterados:
+            invalidar_boletim_aluno(aluno_id)
+
+    if alunos_alterados:
+        transaction.on_commit(invalidar_boletins)
+
+
+def salvar_celulas(disciplina, celulas):
+    """Grava células avulsas (autosave) com concorrência otimista.
+
+    Cada célula é {'aluno_id', 'bimestre', 'valor', 'anterior'}, onde
+    'anterior' é o valor que o editor via antes de alterar. A gravação é um
+    UPDATE condicionado a esse valor ainda estar no banco; se outro editor
+    mudou a célula nesse meio tempo, nada é escrito e ela volta em conflitos.
+
+    Retorna (salvas, conflitos).
+    """
+    salvas, conflitos = [], []
+    if not celulas:
+        return salvas, conflitos
+
+    with transaction.atomic():
+        existentes = set(
+            Nota.objects.filter(disciplina=disciplina, aluno_id__in={c['aluno_id'] for c in celulas})
+            .values_list('aluno_id', flat=True)
+        )
+
+        delta = [0, 0, 0, 0]
+
+        for celula in celulas:
+            campo = f"nota{celula['bimestre']}"
+            aluno_id, anterior, valor = celula['aluno_id'], celula['anterior'], celula['valor']
+
+            # Sem linha no banco, a célula vazia que continua vazia não grava
+            # nada; com valor, a linha nasce já com ele. Se outro editor criou
+            # a mesma linha nesse meio tempo, segue para o UPDATE condicionado.
+            if aluno_id not in existentes and anterior is None:
+                if valor is None:
+                    salvas.append(celula)
+                    continue
+                try:
+                    with transaction.atomic():
+                        Nota.objects.bulk_create([Nota(aluno_id=aluno_id, disciplina_id=disciplina.id, **{campo: valor})])
+                except IntegrityError:
+                    pass
+                else:
+                    existentes.add(aluno_id)
+                    delta[celula['bimestre'] - 1] += 1
+                    salvas.append(celula)
+                    continue
+                existentes.add(aluno_id)
+
+            condicao = {f'{campo}__isnull': True} if anterior is None else {campo: anterior}
+            atualizadas = Nota.objects.filter(
+                disciplina=disciplina, aluno_id=aluno_id, **condicao
+            ).update(**{campo: valor})
+
+            if not atualizadas:
+                atual = Nota.objects.filter(
+                    disciplina=disciplina, aluno_id=aluno_id
+                ).values_list(campo, flat=True).first()
+                conflitos.append({**celula, 'atual': atual})
+                continue
+
+            delta[celula['bimestre'] - 1] += (valor is not None) - (anterior is not None)
+            salvas.append(celula)
+
+        acertar_contadores({disciplina: delta}, {c['aluno_id'] for c in salvas})
+
+    return salvas, conflitos
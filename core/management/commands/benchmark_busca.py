@@ -0,0 +1,107 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from core.busca import PESSOAS, buscar, filtrar_por_busca, normalizar, reindexar
+from core.management.sinteticos import NOMES_DISCIPLINAS, banco_temporario, gerar_pessoas
+from core.models import Aluno, Disciplina, Gestor, Professor
+from core.perfil import Perfil
+from core.views import busca_global
+
+# Meta da busca global: p99 da view inteira (consulta, URLs e JSON)
+LIMITE_TYPEAHEAD_MS = 30
+
+
+class Command(BaseCommand):
+    help = "Mede a busca (índice FTS5) num cadastro sintético: pessoas, listas, typeahead por papel e o icontains antigo"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pessoas', type=int, default=50000)
+        parser.add_argument('--buscas', type=int, default=300, help="Buscas por tipo de termo")
+        parser.add_argument('--semente', type=int, default=42)
+
+    def handle(self, *args, **options):
+        aleatorio = random.Random(options['semente'])
+
+        with banco_temporario():
+            inicio = time.perf_counter()
+            pessoas = gerar_pessoas(options['pessoas'], semente=options['semente'])
+            self.stdout.write(f"{len(pessoas)} pessoas criadas em {time.perf_counter() - inicio:.1f}s")
+
+            inicio = time.perf_counter()
+            total = reindexar()
+            self.stdout.write(f"Índice reconstruído: {total} linhas em {time.perf_counter() - inicio:.1f}s")
+
+            # Termos como alguém digitaria: sem acento, incompletos, CPF e e-mail
+            termos = {
+                'prefixo de 3 letras': lambda p: normalizar(p[1])[:3],
+                'nome sem acento': lambda p: normalizar(' '.join(p[1].split()[:2])),
+                'prenome + início do sobrenome': lambda p: f"{p[1].split()[0]} {p[1].split()[-1][:3]}",
+                'CPF parcial': lambda p: p[2][:7],
+                'e-mail': lambda p: p[3].split('@')[0],
+            }
+            for descricao, termo in termos.items():
+                amostra = [termo(aleatorio.choice(pessoas)) for _ in range(options['buscas'])]
+                self.relatorio(f"buscar pessoas — {descricao}", [
+                    self.medir(lambda: buscar(t, tipos=PESSOAS, limite=20)) for t in amostra
+                ])
+                self.relatorio(f"lista de alunos — {descricao}", [
+                    self.medir(lambda: list(filtrar_por_busca(Aluno.objects.all(), 'aluno', t)
+                                            .order_by('nome_completo', 'id')[:50]))
+                    for t in amostra
+                ])
+
+            self.typeahead(pessoas, aleatorio, options['buscas'])
+
+            amostra = [normalizar(aleatorio.choice(pessoas)[1])[:3] for _ in range(min(50, options['buscas']))]
+            self.relatorio("icontains antigo — prefixo de 3 letras", [
+                self.medir(lambda: list(Aluno.objects.filter(nome_completo__icontains=t)
+                                        .order_by('nome_completo', 'id')[:50]))
+                for t in amostra
+            ])
+
+    def typeahead(self, pessoas, aleatorio, buscas):
+        """View da busca global, como cada papel a chamaria, com termos de 2 a 3 letras e completos"""
+        fabrica = RequestFactory()
+        papeis = {
+            'superusuário': Perfil(User(username='bench', is_superuser=True)),
+            'gestor': Perfil(User(username='bench'), gestor=Gestor.objects.order_by('?').first()),
+            'professor': Perfil(User(username='bench'), professor=(
+                Professor.objects.filter(disciplina__isnull=False).order_by('?').first()
+            )),
+            'aluno': Perfil(User(username='bench'), aluno=Aluno.objects.order_by('?').first()),
+        }
+        termos = [
+            lambda: normalizar(aleatorio.choice(pessoas)[1])[:aleatorio.choice((2, 3))],
+            lambda: ' '.join(aleatorio.choice(pessoas)[1].split()[:2]),
+            lambda: aleatorio.choice(NOMES_DISCIPLINAS)[:4],
+            lambda: f"turma {aleatorio.randint(1, 99)}",
+        ]
+        self.stdout.write(f"Typeahead sobre {Disciplina.objects.count()} disciplinas e as turmas delas")
+
+        for papel, perfil in papeis.items():
+            tempos = []
+            for _ in range(buscas):
+                request = fabrica.get('/busca/', {'q': aleatorio.choice(termos)()})
+                request.user, request.perfil = perfil.user, perfil
+                tempos.append(self.medir(lambda: busca_global(request)))
+            p99 = self.relatorio(f"busca global — {papel}", tempos)
+            if p99 > LIMITE_TYPEAHEAD_MS:
+                self.stdout.write(self.style.ERROR(f"  p99 acima da meta de {LIMITE_TYPEAHEAD_MS} ms"))
+
+    def medir(self, funcao):
+        inicio = time.perf_counter()
+        funcao()
+        return (time.perf_counter() - inicio) * 1000
+
+    def relatorio(self, descricao, tempos):
+        tempos.sort()
+        p99 = tempos[min(len(tempos) - 1, int(len(tempos) * 0.99))]
+        self.stdout.write(self.style.SUCCESS(
+            f"{descricao}: mediana {statistics.median(tempos):.2f} ms, p99 {p99:.2f} ms, máx {tempos[-1]:.2f} ms"
+        ))
+        return p99
@@ -0,0 +1,83 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.distribuicao import FAIXAS, LIMITE_APROVACAO, LIMITE_REPROVACAO, distribuicao_notas
+from core.management.sinteticos import banco_temporario, gerar_ano
+from core.models import Nota
+
+
+def distribuicao_por_objetos(ano):
+    """Caminho antigo: instancia cada Nota e usa Nota.media em Python"""
+    por_disciplina = {}
+    for nota in Nota.objects.filter(disciplina__turma__ano=ano).select_related('disciplina'):
+        if nota.media is not None:
+            por_disciplina.setdefault(nota.disciplina_id, []).append(nota.media)
+
+    return {
+        disciplina_id: {
+            'alunos': len(medias),
+            'media': round(statistics.fmean(medias), 2),
+            'mediana': round(statistics.median(medias), 2),
+            'desvio_padrao': round(statistics.pstdev(medias), 2),
+            'histograma': [sum(1 for m in medias if min(int(m), FAIXAS - 1) == i) for i in range(FAIXAS)],
+            'abaixo_4': sum(1 for m in medias if m < LIMITE_REPROVACAO),
+            'abaixo_6': sum(1 for m in medias if m < LIMITE_APROVACAO),
+        }
+        for disciplina_id, medias in por_disciplina.items()
+    }
+
+
+class Command(BaseCommand):
+    help = "Compara a distribuição de notas em NumPy com o cálculo objeto a objeto"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ano', type=int, help="Usa as notas reais deste ano em vez de gerar dados")
+        parser.add_argument('--turmas', type=int, default=40)
+        parser.add_argument('--alunos-por-turma', type=int, default=35)
+        parser.add_argument('--repeticoes', type=int, default=3)
+
+    def handle(self, *args, **options):
+        if options['ano'] is not None:
+            # Só leitura: pode rodar no banco configurado
+            self.comparar(options['ano'], options['repeticoes'])
+            return
+
+        # Dados sintéticos vão para um banco temporário
+        with banco_temporario():
+            ano = gerar_ano(turmas=options['turmas'], alunos_por_turma=options['alunos_por_turma'])
+            self.comparar(ano, options['repeticoes'])
+
+    def comparar(self, ano, repeticoes):
+        total = Nota.objects.filter(disciplina__turma__ano=ano).count()
+        self.stdout.write(f"Ano {ano}: {total} notas")
+
+        vetorizado = self.medir(lambda: distribuicao_notas(ano), repeticoes)
+        por_objetos = self.medir(lambda: distribuicao_por_objetos(ano), repeticoes)
+
+        # Os dois caminhos precisam dar o mesmo resultado por disciplina
+        # (médias podem diferir no arredondamento da 2ª casa)
+        esperado = distribuicao_por_objetos(ano)
+        for d in distribuicao_notas(ano)['disciplinas']:
+            outro = esperado.pop(d['id'])
+            iguais = all(
+                abs(d[campo] - outro[campo]) <= 0.011 if isinstance(outro[campo], float) else d[campo] == outro[campo]
+                for campo in outro
+            )
+            if not iguais:
+                raise CommandError(f"Disciplina {d['id']}: {d} != {outro}")
+        if esperado:
+            raise CommandError(f"Disciplinas faltando no cálculo NumPy: {sorted(esperado)}")
+
+        self.stdout.write(f"NumPy:        {vetorizado * 1000:8.1f} ms")
+        self.stdout.write(f"Por objetos:  {por_objetos * 1000:8.1f} ms")
+        self.stdout.write(self.style.SUCCESS(f"{por_objetos / vetorizado:.1f}x mais rápido"))
+
+    def medir(self, funcao, repeticoes):
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            funcao()
+            tempos.append(time.perf_counter() - inicio)
+        return min(tempos)
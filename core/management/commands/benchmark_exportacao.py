@@ -0,0 +1,70 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from core.exportacao import gerar_csv, gerar_xlsx, linhas_exportacao
+from core.management.sinteticos import banco_temporario, gerar_ano
+
+
+def exportar_csv(ano):
+    """Consome o gerador como faria o StreamingHttpResponse. Retorna (pedaços, bytes)."""
+    total = tamanho = 0
+    for pedaco in gerar_csv(linhas_exportacao(ano=ano)):
+        total += 1
+        tamanho += len(pedaco)
+    return total, tamanho
+
+
+def exportar_xlsx(ano):
+    with gerar_xlsx(linhas_exportacao(ano=ano)) as arquivo:
+        return None, arquivo.seek(0, 2)
+
+
+def pico_memoria_mb(funcao):
+    """Pico de memória alocada pelo Python só durante funcao (tracemalloc).
+
+    O ru_maxrss do processo não serve: é o pico da vida toda, e gerar o ano
+    sintético já passa de qualquer exportação. Alocações de C fora do
+    alocador do Python (ex. cache de páginas do SQLite) não entram.
+    """
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        funcao()
+        return tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    finally:
+        tracemalloc.stop()
+
+
+class Command(BaseCommand):
+    help = "Mede a exportação de notas (CSV e XLSX) num ano sintético: linhas/s e pico de memória da exportação"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--linhas', type=int, default=50000,
+                            help="Linhas aproximadas (aluno × disciplina × bimestre)")
+
+    def handle(self, *args, **options):
+        alunos_por_turma, disciplinas_por_turma = 35, 8
+        turmas = max(1, round(options['linhas'] / (alunos_por_turma * disciplinas_por_turma * 4)))
+
+        with banco_temporario():
+            ano = gerar_ano(turmas=turmas, alunos_por_turma=alunos_por_turma,
+                            disciplinas_por_turma=disciplinas_por_turma)
+
+            # Tempo e memória em rodadas separadas: o tracemalloc deixa tudo mais lento
+            inicio = time.perf_counter()
+            total, tamanho = exportar_csv(ano)
+            self.relatorio('CSV', total - 1, time.perf_counter() - inicio, tamanho,
+                           pico_memoria_mb(lambda: exportar_csv(ano)))
+
+            inicio = time.perf_counter()
+            _, tamanho = exportar_xlsx(ano)
+            self.relatorio('XLSX', total - 1, time.perf_counter() - inicio, tamanho,
+                           pico_memoria_mb(lambda: exportar_xlsx(ano)))
+
+    def relatorio(self, formato, linhas, duracao, tamanho, pico):
+        self.stdout.write(self.style.SUCCESS(
+            f"{formato}: {linhas} linhas em {duracao:.2f}s ({linhas / duracao:,.0f} linhas/s), "
+            f"{tamanho / 1024 / 1024:.1f} MB, pico de memória da exportação {pico:.1f} MB"
+        ))
@@ -0,0 +1,67 @@
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.gerador_grade import SemSolucao, conferir, resolver
+from core.grade import HORARIOS
+from core.management.sinteticos import gerar_escola
+
+# (nome, turmas, professores)
+ESCOLAS = (
+    ('pequena', 10, 15),
+    ('média', 20, 30),
+    ('grande', 40, 60),
+    ('apertada', 40, 26),
+    ('muito grande', 80, 120),
+)
+
+
+def ocupacao_maxima(turmas, disciplinas, horarios_por_turno):
+    """Maior fração dos horários do turno ocupada por um mesmo professor"""
+    carga = defaultdict(int)
+    for _, turma, professor, aulas in disciplinas:
+        carga[(professor, turmas[turma])] += aulas
+    return max(aulas / (5 * horarios_por_turno[turno]) for (_, turno), aulas in carga.items())
+
+
+class Command(BaseCommand):
+    help = "Mede o gerador de grades em escolas sintéticas e confere as soluções"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--turmas', type=int, help="Roda só uma escola com este número de turmas")
+        parser.add_argument('--professores', type=int, default=60)
+        parser.add_argument('--sementes', type=int, default=3, help="Escolas diferentes de cada tamanho")
+
+    def handle(self, *args, **options):
+        horarios_por_turno = {turno: len(horarios) for turno, horarios in HORARIOS.items()}
+        escolas = ESCOLAS
+        if options['turmas']:
+            escolas = (('personalizada', options['turmas'], options['professores']),)
+
+        for nome, turmas, professores in escolas:
+            for semente in range(options['sementes']):
+                mapa_turmas, disciplinas = gerar_escola(turmas, professores, horarios_por_turno, semente)
+                aulas = sum(d[3] for d in disciplinas)
+                rotulo = (f"{nome} ({turmas} turmas, {professores} professores, {aulas} aulas, "
+                          f"ocupação máx. de professor {ocupacao_maxima(mapa_turmas, disciplinas, horarios_por_turno):.0%}, "
+                          f"semente {semente})")
+
+                inicio = time.perf_counter()
+                try:
+                    grades, folga = resolver(mapa_turmas, disciplinas, horarios_por_turno, semente=semente)
+                except SemSolucao as erro:
+                    self.stdout.write(self.style.WARNING(
+                        f"{rotulo}: sem solução em {time.perf_counter() - inicio:.2f}s — {erro}"
+                    ))
+                    continue
+                duracao = time.perf_counter() - inicio
+
+                problemas = conferir(mapa_turmas, disciplinas, grades)
+                if problemas:
+                    raise CommandError(f"{rotulo}: solução inválida — {problemas[:3]}")
+
+                distribuicao = 'ideal' if folga == 0 else ('sem limite por dia' if folga is None else f'+{folga} por dia')
+                self.stdout.write(self.style.SUCCESS(
+                    f"{rotulo}: {duracao:.2f}s, distribuição {distribuicao}"
+                ))
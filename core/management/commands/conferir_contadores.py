@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.estatisticas import CONTADORES_DISCIPLINA, anotar_contagens_reais, recontar_disciplinas
+from core.models import Disciplina
+
+
+class Command(BaseCommand):
+    help = "Confere os contadores de notas/alunos das disciplinas com a tabela de notas"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ano', type=int, help="Confere só as disciplinas deste ano letivo")
+        parser.add_argument(
+            '--corrigir',
+            action='store_true',
+            help="Regrava os contadores das disciplinas divergentes",
+        )
+
+    def handle(self, *args, **options):
+        disciplinas = Disciplina.objects.all()
+        if options['ano']:
+            disciplinas = disciplinas.filter(turma__ano=options['ano'])
+
+        divergentes = []
+
+        for disciplina in anotar_contagens_reais(disciplinas).order_by('id'):
+            erros = [
+                f"{campo} = {getattr(disciplina, campo)}, esperado {getattr(disciplina, f'real_{campo}')}"
+                for campo in CONTADORES_DISCIPLINA
+                if getattr(disciplina, campo) != getattr(disciplina, f'real_{campo}')
+            ]
+            if erros:
+                divergentes.append(disciplina.id)
+                self.stdout.write(self.style.WARNING(
+                    f"Disciplina {disciplina.id} ({disciplina.nome}): " + "; ".join(erros)
+                ))
+
+        if not divergentes:
+            self.stdout.write(self.style.SUCCESS("Nenhuma divergência encontrada."))
+            return
+
+        if options['corrigir']:
+            recontar_disciplinas(Disciplina.objects.filter(id__in=divergentes))
+            self.stdout.write(self.style.SUCCESS(f"{len(divergentes)} disciplina(s) corrigida(s)."))
+        else:
+            raise CommandError(f"{len(divergentes)} disciplina(s) com contadores divergentes.")
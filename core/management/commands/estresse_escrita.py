@@ -0,0 +1,139 @@
+import logging
+import random
+import statistics
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+from django.test import Client
+from django.urls import reverse
+
+from core.escrita import pragmas_sqlite
+from core.grade import DIAS, horarios_do_turno
+from core.management.sinteticos import banco_temporario, gerar_ano
+from core.models import Aluno, Disciplina, Turma
+
+ANO_ESTRESSE = 1901
+
+
+class Command(BaseCommand):
+    help = ("Várias threads gravando ao mesmo tempo em lancar_nota e grade_horaria, num banco "
+            "temporário: conta os erros de banco travado e mede as gravações por segundo")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--requisicoes', type=int, default=30, help="POSTs por thread")
+        parser.add_argument('--turmas', type=int, default=8)
+        parser.add_argument('--semente', type=int, default=42)
+
+    def handle(self, *args, **options):
+        # Em arquivo também porque as threads abrem conexões próprias
+        with banco_temporario() as caminho:
+            self.stdout.write(f"Banco temporário: {caminho}")
+            gerar_ano(turmas=options['turmas'], alunos_por_turma=30, disciplinas_por_turma=6,
+                      professores=options['turmas'] * 2, semente=options['semente'], ano=ANO_ESTRESSE)
+            superusuario = User.objects.create(username=f'sintetico{ANO_ESTRESSE}.admin', is_superuser=True)
+
+            self.stdout.write(f"Pragmas: {pragmas_sqlite()}")
+            self.estressar(superusuario, options)
+
+    def estressar(self, superusuario, options):
+        turmas = list(Turma.objects.filter(ano=ANO_ESTRESSE))
+        disciplinas = {turma.id: list(Disciplina.objects.filter(turma=turma)) for turma in turmas}
+        alunos = {turma.id: list(Aluno.objects.filter(turma=turma).values_list('id', flat=True)) for turma in turmas}
+
+        clientes = []
+        for _ in range(options['threads']):
+            cliente = Client(SERVER_NAME='localhost')
+            cliente.force_login(superusuario)
+            clientes.append(cliente)
+        connections.close_all()
+
+        resultados = {'notas': [], 'grade': [], 'travado': 0, 'outros_erros': [], 'recusadas': 0}
+        trava = threading.Lock()
+
+        def postar_notas(cliente, aleatorio):
+            disciplina = aleatorio.choice(disciplinas[aleatorio.choice(turmas).id])
+            dados = {
+                f'nota{bimestre}_{aluno_id}': f'{aleatorio.uniform(0, 10):.1f}'
+                for aluno_id in alunos[disciplina.turma_id]
+                for bimestre in range(1, 5)
+                if aleatorio.random() < 0.3
+            }
+            return 'notas', cliente.post(reverse('lancar_nota', args=[disciplina.id]), dados)
+
+        def postar_grade(cliente, aleatorio):
+            turma = aleatorio.choice(turmas)
+            dados = {
+                f'{dia}_{i}': str(aleatorio.choice(disciplinas[turma.id]).id)
+                for i in range(len(horarios_do_turno(turma.turno)))
+                for dia in DIAS
+                if aleatorio.random() < 0.5
+            }
+            return 'grade', cliente.post(reverse('grade_horaria', args=[turma.id]), dados)
+
+        def trabalhar(indice):
+            aleatorio = random.Random(options['semente'] * 1000 + indice)
+            cliente = clientes[indice]
+            try:
+                for _ in range(options['requisicoes']):
+                    postar = postar_notas if aleatorio.random() < 0.7 else postar_grade
+                    inicio = time.perf_counter()
+                    try:
+                        tela, resposta = postar(cliente, aleatorio)
+                    except OperationalError as erro:
+                        with trava:
+                            if 'locked' in str(erro) or 'busy' in str(erro):
+                                resultados['travado'] += 1
+                            else:
+                                resultados['outros_erros'].append(str(erro))
+                        continue
+                    duracao = time.perf_counter() - inicio
+                    with trava:
+                        resultados[tela].append(duracao)
+                        # 200 no POST = formulário devolvido com erro (ex. choque de professor)
+                        if resposta.status_code != 302:
+                            resultados['recusadas'] += 1
+            finally:
+                connections.close_all()
+
+        # Os erros já são contados; sem isso cada um sai com o traceback inteiro
+        log_requisicoes = logging.getLogger('django.request')
+        nivel = log_requisicoes.level
+        log_requisicoes.setLevel(logging.CRITICAL)
+
+        threads = [threading.Thread(target=trabalhar, args=(i,)) for i in range(options['threads'])]
+        inicio = time.perf_counter()
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            log_requisicoes.setLevel(nivel)
+        total_segundos = time.perf_counter() - inicio
+
+        self.relatorio(resultados, total_segundos, options)
+
+    def relatorio(self, resultados, total_segundos, options):
+        tempos = resultados['notas'] + resultados['grade']
+        self.stdout.write(
+            f"{options['threads']} threads × {options['requisicoes']} POSTs em {total_segundos:.2f}s: "
+            f"{len(resultados['notas'])} lancar_nota, {len(resultados['grade'])} grade_horaria "
+            f"({resultados['recusadas']} recusados pela validação)"
+        )
+        if tempos:
+            percentis = statistics.quantiles(tempos, n=100) if len(tempos) > 1 else tempos * 99
+            self.stdout.write(
+                f"Vazão: {len(tempos) / total_segundos:.1f} gravações/s; latência mediana "
+                f"{statistics.median(tempos) * 1000:.0f} ms, p99 {percentis[98] * 1000:.0f} ms"
+            )
+        for erro in sorted(set(resultados['outros_erros'])):
+            self.stdout.write(self.style.WARNING(f"Erro de banco: {erro}"))
+
+        mensagem = f"Erros de banco travado: {resultados['travado']}"
+        if resultados['travado'] or resultados['outros_erros']:
+            raise CommandError(mensagem)
+        self.stdout.write(self.style.SUCCESS(mensagem))
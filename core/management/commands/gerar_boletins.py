@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.boletins_lote import FORMATOS, gerar_boletins
+from core.models import Aluno
+
+
+class Command(BaseCommand):
+    help = "Gera os boletins em PDF de uma turma ou de um ano (zip ou PDF único), em paralelo"
+
+    def add_arguments(self, parser):
+        escopo = parser.add_mutually_exclusive_group(required=True)
+        escopo.add_argument('--turma', type=int)
+        escopo.add_argument('--ano', type=int)
+        parser.add_argument('--formato', choices=FORMATOS, default='zip')
+        parser.add_argument('--saida', help="Arquivo de saída (padrão: boletins_<escopo>.<formato>)")
+        parser.add_argument('--processos', type=int, help="Processos do pool (padrão: todos os núcleos)")
+
+    def handle(self, *args, **options):
+        if options['turma']:
+            alunos = Aluno.objects.filter(turma_id=options['turma'])
+            escopo = f"turma{options['turma']}"
+        else:
+            alunos = Aluno.objects.filter(turma__ano=options['ano'])
+            escopo = str(options['ano'])
+
+        saida = options['saida'] or f"boletins_{escopo}.{options['formato']}"
+        passo = 1
+
+        def progresso(prontos, total):
+            nonlocal passo
+            # Uma linha a cada ~5% (e no último)
+            if prontos == total or prontos >= passo:
+                self.stdout.write(f"{prontos}/{total} boletins")
+                passo = prontos + max(1, total // 20)
+
+        inicio = time.perf_counter()
+        try:
+            with open(saida, 'wb') as arquivo:
+                total = gerar_boletins(
+                    alunos, arquivo, formato=options['formato'],
+                    processos=options['processos'], progresso=progresso,
+                )
+        except OSError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} boletim(ns) em {time.perf_counter() - inicio:.1f}s → {saida}"
+        ))
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importacao import ImportacaoInvalida, importar_planilha, ler_linhas
+from core.models import Disciplina
+
+
+class Command(BaseCommand):
+    help = "Importa notas de uma planilha .csv/.xlsx (uma disciplina, uma turma ou o ano todo)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo')
+        escopo = parser.add_mutually_exclusive_group(required=True)
+        escopo.add_argument('--disciplina', type=int)
+        escopo.add_argument('--turma', type=int)
+        escopo.add_argument('--ano', type=int)
+        parser.add_argument('--simular', action='store_true', help="Só mostra o que mudaria")
+
+    def handle(self, *args, **options):
+        if options['disciplina']:
+            disciplinas = Disciplina.objects.filter(pk=options['disciplina'])
+        elif options['turma']:
+            disciplinas = Disciplina.objects.filter(turma_id=options['turma'])
+        else:
+            disciplinas = Disciplina.objects.filter(turma__ano=options['ano'])
+
+        inicio = time.perf_counter()
+        try:
+            with open(options['arquivo'], 'rb') as arquivo:
+                resultado = importar_planilha(
+                    ler_linhas(arquivo, options['arquivo']), disciplinas, simular=options['simular']
+                )
+        except (OSError, ImportacaoInvalida) as e:
+            raise CommandError(str(e))
+        duracao = time.perf_counter() - inicio
+
+        for erro in resultado['erros']:
+            self.stdout.write(self.style.WARNING(f"Linha {erro['linha']}: {erro['mensagem']}"))
+
+        acao = "seriam alteradas" if resultado['simulacao'] else "alteradas"
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['linhas']} linha(s) em {duracao:.2f}s: {resultado['alteradas']} nota(s) {acao}, "
+            f"{resultado['total_erros']} erro(s)."
+        ))
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.estatisticas import contar_resumo_ano, recalcular_resumo_ano
+from core.models import ResumoAnoLetivo, Turma
+
+
+class Command(BaseCommand):
+    help = "Reconstrói os resumos dos anos letivos (painel da gestão) e confere com as contagens reais"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ano', type=int, help="Processa só este ano letivo")
+        parser.add_argument(
+            '--verificar',
+            action='store_true',
+            help="Só confere os resumos gravados, sem reconstruir",
+        )
+
+    def handle(self, *args, **options):
+        ano = options['ano']
+        resumos = ResumoAnoLetivo.objects.all()
+
+        if ano:
+            anos = [ano]
+            resumos = resumos.filter(ano=ano)
+        else:
+            anos = set(Turma.objects.values_list('ano', flat=True).distinct())
+            anos.update(resumos.values_list('ano', flat=True))
+            anos = sorted(anos)
+
+        if not options['verificar']:
+            with transaction.atomic():
+                resumos.delete()
+                for a in anos:
+                    recalcular_resumo_ano(a)
+            self.stdout.write(f"{len(anos)} resumo(s) reconstruído(s).")
+
+        divergencias = 0
+        gravados = {r.ano: r for r in ResumoAnoLetivo.objects.filter(ano__in=anos)}
+
+        for a in anos:
+            reais = contar_resumo_ano(a)
+            resumo = gravados.get(a)
+
+            if resumo is None:
+                divergencias += 1
+                self.stdout.write(self.style.WARNING(f"{a}: resumo ausente"))
+                continue
+
+            for campo, valor in reais.items():
+                gravado = getattr(resumo, campo)
+                if gravado != valor:
+                    divergencias += 1
+                    self.stdout.write(self.style.WARNING(f"{a}: {campo} = {gravado}, esperado {valor}"))
+
+        if divergencias:
+            raise CommandError(f"{divergencias} divergência(s) encontrada(s).")
+
+        self.stdout.write(self.style.SUCCESS(f"{len(anos)} resumo(s) conferido(s), nenhuma divergência."))
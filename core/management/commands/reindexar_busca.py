@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.busca import reindexar
+
+
+class Command(BaseCommand):
+    help = "Reconstrói o índice de busca de pessoas (alunos, professores e gestores)"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = reindexar()
+        self.stdout.write(self.style.SUCCESS(f"{total} pessoa(s) indexada(s)."))
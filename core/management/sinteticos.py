@@ -0,0 +1,262 @@
+import os
+import random
+import shutil
+import tempfile
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections
+from django.test import override_settings
+
+from core.busca import normalizar
+from core.cpf import gerar_cpf, registrar_cpfs_em_lote
+from core.models import Aluno, Disciplina, Gestor, Nota, Professor, Turma
+
+
+# ======================== DADOS SINTÉTICOS (BENCHMARKS) ========================
+# Gera um ano letivo inteiro com bulk_create, para os comandos benchmark_* e
+# estresse_escrita. Os comandos rodam num banco temporário (banco_temporario),
+# então nada disso passa pelo banco configurado — nem o lock de escrita, que
+# com transaction_mode IMMEDIATE travaria o lançamento de notas durante a
+# medição. bulk_create não dispara signals: contadores e resumos do ano
+# sintético não são mantidos.
+
+ANO_SINTETICO = 1900
+NOMES_DISCIPLINAS = (
+    'Português', 'Matemática', 'História', 'Geografia', 'Ciências',
+    'Inglês', 'Artes', 'Educação Física', 'Física', 'Química',
+)
+
+
+@contextmanager
+def banco_temporario():
+    """Troca o banco 'default' por um arquivo novo e migrado, apagado no final.
+
+    O arquivo fica numa pasta temporária, com as mesmas OPTIONS (pragmas) do
+    banco de verdade. Todas as conexões, inclusive as de threads, leem o NAME
+    deste mesmo dicionário. O cache também é trocado por um em memória: os
+    ids do banco temporário não podem deixar boletins e grades no cache
+    compartilhado do servidor.
+    """
+    if connection.vendor != 'sqlite' or connection.is_in_memory_db():
+        raise CommandError("Rode com um banco SQLite em arquivo: os dados sintéticos vão para um "
+                           "arquivo temporário com as mesmas configurações.")
+
+    settings_dict = connection.settings_dict
+    original = settings_dict['NAME']
+    pasta = tempfile.mkdtemp(prefix='sintetico_')
+    connections.close_all()
+    settings_dict['NAME'] = os.path.join(pasta, 'sintetico.sqlite3')
+    try:
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            call_command('migrate', verbosity=0, interactive=False)
+            yield settings_dict['NAME']
+    finally:
+        connections.close_all()
+        settings_dict['NAME'] = original
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+def gerar_ano(turmas=20, alunos_por_turma=35, disciplinas_por_turma=8,
+              professores=15, vazias=0.1, semente=42, ano=ANO_SINTETICO):
+    """Cria turmas, professores, alunos, disciplinas e notas de um ano.
+
+    vazias: fração dos bimestres deixada sem nota.
+    """
+    aleatorio = random.Random(semente)
+    prefixo = f'sintetico{ano}'
+
+    users = User.objects.bulk_create([
+        User(username=f'{prefixo}.prof{i}') for i in range(professores)
+    ] + [
+        User(username=f'{prefixo}.aluno{i}') for i in range(turmas * alunos_por_turma)
+    ])
+    users_professores, users_alunos = users[:professores], users[professores:]
+
+    lista_professores = Professor.objects.bulk_create([
+        Professor(user=user, nome_completo=f'Professor Sintético {i}', cpf=gerar_cpf(900_000_000 + ano % 1000 * 10_000 + i))
+        for i, user in enumerate(users_professores)
+    ])
+    lista_turmas = Turma.objects.bulk_create([
+        Turma(nome=f'Turma {i + 1}', turno=('manha', 'tarde', 'noite')[i % 3], ano=ano)
+        for i in range(turmas)
+    ])
+
+    alunos = Aluno.objects.bulk_create([
+        Aluno(
+            user=user,
+            nome_completo=f'Aluno Sintético {i:05d}',
+            cpf=gerar_cpf(800_000_000 + ano % 100 * 1_000_000 + i),
+            data_nascimento=date(2010, 1, 1),
+            filiacao_1='Responsável',
+            turma=lista_turmas[i // alunos_por_turma],
+        )
+        for i, user in enumerate(users_alunos)
+    ])
+    registrar_cpfs_em_lote('professor', lista_professores)
+    registrar_cpfs_em_lote('aluno', alunos)
+    disciplinas = Disciplina.objects.bulk_create([
+        Disciplina(
+            nome=NOMES_DISCIPLINAS[j % len(NOMES_DISCIPLINAS)],
+            professor=aleatorio.choice(lista_professores),
+            turma=turma,
+        )
+        for turma in lista_turmas
+        for j in range(disciplinas_por_turma)
+    ])
+
+    def nota():
+        if aleatorio.random() < vazias:
+            return None
+        return round(min(max(aleatorio.gauss(6.5, 2), 0), 10), 1)
+
+    por_turma = {}
+    for disciplina in disciplinas:
+        por_turma.setdefault(disciplina.turma_id, []).append(disciplina)
+
+    Nota.objects.bulk_create(
+        [
+            Nota(aluno=aluno, disciplina=disciplina, nota1=nota(), nota2=nota(), nota3=nota(), nota4=nota())
+            for aluno in alunos
+            for disciplina in por_turma[aluno.turma_id]
+        ],
+        batch_size=2000,
+    )
+
+    return ano
+
+
+# ======================== ESCOLAS SINTÉTICAS (GERADOR DE GRADES) ========================
+# Só os dados que o gerador de grades recebe, sem banco. Cada professor é de
+# uma matéria (professores divididos pela carga de cada uma) e pega a turma
+# quando é o menos ocupado da matéria naquele turno.
+
+AULAS_POR_MATERIA = (
+    ('Português', 6), ('Matemática', 5), ('História', 3), ('Geografia', 3), ('Ciências', 3),
+    ('Inglês', 2), ('Artes', 2), ('Educação Física', 2), ('Física', 2), ('Química', 2),
+)
+
+
+def gerar_escola(turmas=40, professores=60, horarios_por_turno=None, semente=42):
+    """(turmas, disciplinas) no formato de gerador_grade.resolver.
+
+    Cada turma recebe as matérias em ordem enquanto couberem nos horários
+    do turno; as turmas se dividem entre manhã, tarde e noite.
+    """
+    aleatorio = random.Random(semente)
+    horarios_por_turno = horarios_por_turno or {'manha': 6, 'tarde': 6, 'noite': 4}
+    turnos = list(horarios_por_turno)
+
+    total_aulas = sum(aulas for _, aulas in AULAS_POR_MATERIA)
+    por_materia, proximo = {}, 0
+    for materia, aulas in AULAS_POR_MATERIA:
+        quantidade = max(1, round(professores * aulas / total_aulas))
+        por_materia[materia] = list(range(proximo, proximo + quantidade))
+        proximo += quantidade
+
+    mapa_turmas = {turma: turnos[turma % len(turnos)] for turma in range(turmas)}
+    carga = defaultdict(int)    # (professor, turno) → aulas
+    disciplinas = []
+    for turma, turno in mapa_turmas.items():
+        livres = 5 * horarios_por_turno[turno]
+        for materia, aulas in AULAS_POR_MATERIA:
+            if aulas > livres:
+                continue
+            livres -= aulas
+            # Menos ocupado entre os que ainda têm horário; se ninguém tem, a
+            # escola fica inviável de propósito (o gerador tem que dizer isso)
+            professor = min(por_materia[materia], key=lambda p: (
+                carga[(p, turno)] + aulas > 5 * horarios_por_turno[turno], carga[(p, turno)], aleatorio.random(),
+            ))
+            carga[(professor, turno)] += aulas
+            disciplinas.append((len(disciplinas), turma, professor, aulas))
+
+    return mapa_turmas, disciplinas
+
+
+# ======================== PESSOAS SINTÉTICAS (BUSCA) ========================
+# Muitas pessoas com nomes realistas (acentos, sobrenomes repetidos), para
+# medir a busca. Também por bulk_create: o índice de busca não é mantido e o
+# comando tem que reconstruí-lo (core.busca.reindexar).
+
+PRENOMES = (
+    'João', 'José', 'Antônio', 'Francisco', 'Luís', 'Márcio', 'Sérgio', 'Vítor', 'Cauã', 'Caio',
+    'Maria', 'Ana', 'Luíza', 'Letícia', 'Júlia', 'Beatriz', 'Fábia', 'Mônica', 'Cecília', 'Inês',
+    'Pedro', 'Lucas', 'Gabriel', 'Rafael', 'Mateus', 'Larissa', 'Camila', 'Patrícia', 'Débora', 'Luana',
+)
+SOBRENOMES = (
+    'Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira', 'Lima', 'Gomes',
+    'Conceição', 'Araújo', 'Gonçalves', 'Simões', 'Magalhães', 'Brandão', 'Falcão', 'Assunção', 'Galvão', 'Estêvão',
+)
+
+
+def gerar_pessoas(total=50000, professores=0.08, gestores=0.02, alunos_por_turma=35, disciplinas_por_turma=8,
+                  semente=42, ano=ANO_SINTETICO):
+    """Cria total pessoas (alunos, professores e gestores, nas frações dadas),
+    as turmas dos alunos e as disciplinas delas.
+
+    Retorna a lista de (tipo, nome, cpf, email) criadas, para o comando
+    escolher termos de busca.
+    """
+    aleatorio = random.Random(semente)
+    prefixo = f'sintetico{ano}'
+    total_professores = int(total * professores)
+    total_gestores = int(total * gestores)
+    total_alunos = total - total_professores - total_gestores
+
+    def nome():
+        return ' '.join([aleatorio.choice(PRENOMES), *aleatorio.sample(SOBRENOMES, 2)])
+
+    pessoas = []
+    for i in range(total):
+        tipo = 'aluno' if i < total_alunos else 'professor' if i < total_alunos + total_professores else 'gestor'
+        completo = nome()
+        cpf = gerar_cpf(700_000_000 + ano % 100 * 1_000_000 + i)
+        email = normalizar(f"{'.'.join(completo.split()[::2])}.{i}@{prefixo}.escola.com")
+        pessoas.append((tipo, completo, cpf, email))
+
+    users = User.objects.bulk_create(
+        [User(username=f'{prefixo}.pessoa{i}', email=email) for i, (_, _, _, email) in enumerate(pessoas)],
+        batch_size=5000,
+    )
+    turmas = Turma.objects.bulk_create([
+        Turma(nome=f'Turma {i + 1}', turno=('manha', 'tarde', 'noite')[i % 3], ano=ano)
+        for i in range(max(1, -(-total_alunos // alunos_por_turma)))
+    ])
+
+    alunos, lista_professores, lista_gestores = [], [], []
+    for i, ((tipo, completo, cpf, _), user) in enumerate(zip(pessoas, users)):
+        if tipo == 'aluno':
+            alunos.append(Aluno(
+                user=user, nome_completo=completo, cpf=cpf, data_nascimento=date(2010, 1, 1),
+                filiacao_1='Responsável', turma=turmas[i // alunos_por_turma],
+            ))
+        elif tipo == 'professor':
+            lista_professores.append(Professor(user=user, nome_completo=completo, cpf=cpf))
+        else:
+            lista_gestores.append(Gestor(
+                user=user, nome_completo=completo, cpf=cpf, data_nascimento=date(1980, 1, 1),
+                telefone='(00) 0000-0000', cargo='coordenador', cep='00000-000', uf='SP',
+                cidade='São Paulo', endereco='Rua Sintética',
+            ))
+
+    Aluno.objects.bulk_create(alunos, batch_size=5000)
+    Professor.objects.bulk_create(lista_professores, batch_size=5000)
+    Gestor.objects.bulk_create(lista_gestores, batch_size=5000)
+    for tipo, lista in (('aluno', alunos), ('professor', lista_professores), ('gestor', lista_gestores)):
+        registrar_cpfs_em_lote(tipo, lista)
+    if lista_professores:
+        Disciplina.objects.bulk_create([
+            Disciplina(
+                nome=NOMES_DISCIPLINAS[j % len(NOMES_DISCIPLINAS)],
+                professor=aleatorio.choice(lista_professores),
+                turma=turma,
+            )
+            for turma in turmas
+            for j in range(disciplinas_por_turma)
+        ], batch_size=5000)
+    return pessoas
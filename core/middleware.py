@@ -0,0 +1,18 @@
+from django.utils.functional import SimpleLazyObject
+
+from .perfil import carregar_perfil
+
+
+class PerfilMiddleware:
+    """Disponibiliza request.perfil (papel, objeto de perfil, nome e foto).
+
+    O perfil só é carregado no primeiro acesso, com uma consulta. Precisa vir
+    depois do AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.perfil = SimpleLazyObject(lambda: carregar_perfil(request.user))
+        return self.get_response(request)
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoAnoLetivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ano', models.IntegerField(unique=True)),
+                ('total_turmas', models.IntegerField(default=0)),
+                ('total_alunos', models.IntegerField(default=0)),
+                ('total_professores', models.IntegerField(default=0)),
+                ('total_disciplinas', models.IntegerField(default=0)),
+                ('total_notas_lancadas', models.IntegerField(default=0)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Resumo do ano letivo',
+                'verbose_name_plural': 'Resumos dos anos letivos',
+                'ordering': ['-ano'],
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:44
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def preencher_contadores(apps, schema_editor):
+    Aluno = apps.get_model('core', 'Aluno')
+    Disciplina = apps.get_model('core', 'Disciplina')
+    Nota = apps.get_model('core', 'Nota')
+
+    alunos = (
+        Aluno.objects.filter(turma=OuterRef('turma'))
+        .order_by().values('turma').annotate(total=Count('id')).values('total')
+    )
+    campos = {'alunos_matriculados': alunos}
+
+    for i in range(1, 5):
+        campos[f'lancadas_b{i}'] = (
+            Nota.objects.filter(disciplina=OuterRef('pk'))
+            .order_by().values('disciplina').annotate(total=Count(f'nota{i}')).values('total')
+        )
+
+    Disciplina.objects.update(**{
+        campo: Coalesce(Subquery(sub, output_field=IntegerField()), Value(0))
+        for campo, sub in campos.items()
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_resumoanoletivo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='disciplina',
+            name='alunos_matriculados',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='disciplina',
+            name='lancadas_b1',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='disciplina',
+            name='lancadas_b2',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='disciplina',
+            name='lancadas_b3',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='disciplina',
+            name='lancadas_b4',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(preencher_contadores, migrations.RunPython.noop),
+    ]
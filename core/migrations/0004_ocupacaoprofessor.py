@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_contadores_disciplina'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OcupacaoProfessor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ano', models.IntegerField()),
+                ('turno', models.CharField(max_length=20)),
+                ('dia', models.CharField(max_length=10)),
+                ('horario', models.PositiveSmallIntegerField()),
+                ('disciplina', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ocupacoes', to='core.disciplina')),
+                ('professor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ocupacoes', to='core.professor')),
+                ('turma', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ocupacoes', to='core.turma')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['ano', 'turno', 'professor', 'dia', 'horario'], name='ocupacao_professor_idx')],
+            },
+        ),
+    ]
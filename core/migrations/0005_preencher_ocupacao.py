@@ -0,0 +1,46 @@
+from django.db import migrations
+
+DIAS = ('segunda', 'terca', 'quarta', 'quinta', 'sexta')
+
+
+def preencher_ocupacao(apps, schema_editor):
+    Disciplina = apps.get_model('core', 'Disciplina')
+    GradeHorario = apps.get_model('core', 'GradeHorario')
+    OcupacaoProfessor = apps.get_model('core', 'OcupacaoProfessor')
+
+    # Nome → disciplina por turma (com nomes repetidos, vale a primeira)
+    disciplinas = {}
+    for disciplina_id, turma_id, nome, professor_id in (
+        Disciplina.objects.order_by('-id').values_list('id', 'turma_id', 'nome', 'professor_id')
+    ):
+        disciplinas[(turma_id, nome)] = (disciplina_id, professor_id)
+
+    ocupacoes = []
+    for grade in GradeHorario.objects.select_related('turma'):
+        for dia in DIAS:
+            for horario, nome in enumerate((grade.dados or {}).get(dia) or []):
+                if (grade.turma_id, nome) not in disciplinas:
+                    continue
+                disciplina_id, professor_id = disciplinas[(grade.turma_id, nome)]
+                ocupacoes.append(OcupacaoProfessor(
+                    professor_id=professor_id,
+                    turma_id=grade.turma_id,
+                    disciplina_id=disciplina_id,
+                    ano=grade.turma.ano,
+                    turno=grade.turma.turno,
+                    dia=dia,
+                    horario=horario,
+                ))
+
+    OcupacaoProfessor.objects.bulk_create(ocupacoes, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_ocupacaoprofessor'),
+    ]
+
+    operations = [
+        migrations.RunPython(preencher_ocupacao, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_preencher_ocupacao'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AulaGrade',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ano', models.IntegerField()),
+                ('turno', models.CharField(max_length=20)),
+                ('dia', models.CharField(choices=[('segunda', 'Segunda'), ('terca', 'Terça'), ('quarta', 'Quarta'), ('quinta', 'Quinta'), ('sexta', 'Sexta')], max_length=10)),
+                ('horario', models.PositiveSmallIntegerField()),
+                ('disciplina', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aulas', to='core.disciplina')),
+                ('professor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aulas', to='core.professor')),
+                ('turma', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aulas', to='core.turma')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('turma', 'dia', 'horario'), name='aula_unica_por_horario'), models.UniqueConstraint(fields=('ano', 'turno', 'professor', 'dia', 'horario'), name='professor_sem_choque')],
+            },
+        ),
+    ]
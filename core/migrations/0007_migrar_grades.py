@@ -0,0 +1,93 @@
+import sys
+
+from django.db import migrations
+
+DIAS = ('segunda', 'terca', 'quarta', 'quinta', 'sexta')
+
+
+def grades_para_aulas(apps, schema_editor):
+    """GradeHorario.dados (nomes por dia) → uma AulaGrade por célula preenchida.
+
+    Nomes que não batem com nenhuma disciplina da turma são descartados, assim
+    como os choques de professor que a grade em JSON deixava passar (fica a
+    aula da turma de menor id). Cada célula descartada sai num relatório por
+    turma no fim do migrate, para ser refeita à mão na tela da grade.
+    """
+    Disciplina = apps.get_model('core', 'Disciplina')
+    GradeHorario = apps.get_model('core', 'GradeHorario')
+    AulaGrade = apps.get_model('core', 'AulaGrade')
+
+    # Nome → disciplina por turma (com nomes repetidos, vale a primeira)
+    disciplinas = {}
+    for disciplina_id, turma_id, nome, professor_id in (
+        Disciplina.objects.order_by('-id').values_list('id', 'turma_id', 'nome', 'professor_id')
+    ):
+        disciplinas[(turma_id, nome)] = (disciplina_id, professor_id)
+
+    aulas, ocupados, descartadas = [], {}, {}
+    for grade in GradeHorario.objects.select_related('turma').order_by('turma_id'):
+        turma = grade.turma
+        for dia in DIAS:
+            for horario, nome in enumerate((grade.dados or {}).get(dia) or []):
+                if not nome:
+                    continue
+                celula = f'{dia} {horario + 1}º horário, "{nome}"'
+                if (turma.id, nome) not in disciplinas:
+                    descartadas.setdefault(turma, []).append(f'{celula}: disciplina não existe na turma')
+                    continue
+                disciplina_id, professor_id = disciplinas[(turma.id, nome)]
+                chave = (professor_id, turma.ano, turma.turno, dia, horario)
+                if chave in ocupados:
+                    descartadas.setdefault(turma, []).append(
+                        f'{celula}: professor já dá aula nesse horário na turma {ocupados[chave]}'
+                    )
+                    continue
+                ocupados[chave] = f'{turma.nome} ({turma.ano})'
+                aulas.append(AulaGrade(
+                    turma_id=turma.id, disciplina_id=disciplina_id, professor_id=professor_id,
+                    ano=turma.ano, turno=turma.turno, dia=dia, horario=horario,
+                ))
+
+    AulaGrade.objects.bulk_create(aulas, batch_size=1000)
+
+    if descartadas:
+        total = sum(len(celulas) for celulas in descartadas.values())
+        linhas = [f'\n  {total} célula(s) de grade descartada(s) ao migrar para AulaGrade:']
+        for turma, celulas in descartadas.items():
+            linhas.append(f'    Turma {turma.nome} ({turma.ano}, id {turma.id}):')
+            linhas.extend(f'      - {celula}' for celula in celulas)
+        sys.stdout.write('\n'.join(linhas) + '\n')
+
+
+def aulas_para_grades(apps, schema_editor):
+    """Volta as aulas para o JSON de nomes, com o tamanho do turno da turma"""
+    AulaGrade = apps.get_model('core', 'AulaGrade')
+    GradeHorario = apps.get_model('core', 'GradeHorario')
+    Turma = apps.get_model('core', 'Turma')
+    horarios_por_turno = {'manha': 6, 'tarde': 6, 'noite': 4}
+
+    dados = {}
+    for turma_id, turno, dia, horario, nome in AulaGrade.objects.values_list(
+        'turma_id', 'turma__turno', 'dia', 'horario', 'disciplina__nome'
+    ):
+        if turma_id not in dados:
+            tamanho = horarios_por_turno.get(turno, 6)
+            dados[turma_id] = {d: [''] * tamanho for d in DIAS}
+        lista = dados[turma_id][dia]
+        lista.extend([''] * (horario + 1 - len(lista)))
+        lista[horario] = nome
+
+    GradeHorario.objects.bulk_create([
+        GradeHorario(turma=turma, dados=dados[turma.id]) for turma in Turma.objects.filter(id__in=dados)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_aulagrade'),
+    ]
+
+    operations = [
+        migrations.RunPython(grades_para_aulas, aulas_para_grades),
+    ]
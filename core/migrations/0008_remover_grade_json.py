@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:12
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_migrar_grades'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='OcupacaoProfessor',
+        ),
+        migrations.DeleteModel(
+            name='GradeHorario',
+        ),
+    ]
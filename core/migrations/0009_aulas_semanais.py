@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_remover_grade_json'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='disciplina',
+            name='aulas_semanais',
+            field=models.PositiveSmallIntegerField(default=2),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_aulas_semanais'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='aulagrade',
+            name='professor_sem_choque',
+        ),
+        migrations.AddConstraint(
+            model_name='aulagrade',
+            constraint=models.UniqueConstraint(fields=('professor', 'ano', 'turno', 'dia', 'horario'), name='professor_sem_choque'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_indice_semana_professor'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='aluno',
+            index=models.Index(fields=['nome_completo', 'id'], name='aluno_nome_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='aluno',
+            index=models.Index(fields=['turma', 'nome_completo', 'id'], name='aluno_turma_nome_idx'),
+        ),
+    ]
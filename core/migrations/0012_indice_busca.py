@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:27
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# Espelho FTS5 do campo texto, mantido por triggers (external content)
+CRIAR_FTS = [
+    """CREATE VIRTUAL TABLE core_indicebusca_fts USING fts5(
+        texto, content='core_indicebusca', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='1 2 3'
+    )""",
+    """CREATE TRIGGER core_indicebusca_ai AFTER INSERT ON core_indicebusca BEGIN
+        INSERT INTO core_indicebusca_fts(rowid, texto) VALUES (new.id, new.texto);
+    END""",
+    """CREATE TRIGGER core_indicebusca_ad AFTER DELETE ON core_indicebusca BEGIN
+        INSERT INTO core_indicebusca_fts(core_indicebusca_fts, rowid, texto) VALUES ('delete', old.id, old.texto);
+    END""",
+    """CREATE TRIGGER core_indicebusca_au AFTER UPDATE ON core_indicebusca BEGIN
+        INSERT INTO core_indicebusca_fts(core_indicebusca_fts, rowid, texto) VALUES ('delete', old.id, old.texto);
+        INSERT INTO core_indicebusca_fts(rowid, texto) VALUES (new.id, new.texto);
+    END""",
+]
+REMOVER_FTS = [
+    'DROP TRIGGER IF EXISTS core_indicebusca_au',
+    'DROP TRIGGER IF EXISTS core_indicebusca_ad',
+    'DROP TRIGGER IF EXISTS core_indicebusca_ai',
+    'DROP TABLE IF EXISTS core_indicebusca_fts',
+]
+
+
+def texto_indexado(nome, cpf, email):
+    """Cópia de core.busca.texto_indexado de quando o índice foi criado"""
+    def normalizar(texto):
+        decomposto = unicodedata.normalize('NFKD', texto or '')
+        return ''.join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+    return ' '.join(parte for parte in (normalizar(nome), re.sub(r'\D', '', cpf or ''), normalizar(email)) if parte)
+
+
+def preencher_indice(apps, schema_editor):
+    IndiceBusca = apps.get_model('core', 'IndiceBusca')
+    linhas = []
+    for tipo, modelo in (('aluno', 'Aluno'), ('professor', 'Professor'), ('gestor', 'Gestor')):
+        for pk, nome, cpf, email in apps.get_model('core', modelo).objects.values_list(
+            'pk', 'nome_completo', 'cpf', 'user__email'
+        ):
+            linhas.append(IndiceBusca(tipo=tipo, objeto_id=pk, nome=nome, texto=texto_indexado(nome, cpf, email)))
+    IndiceBusca.objects.bulk_create(linhas, batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_indices_lista_alunos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndiceBusca',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('aluno', 'Aluno'), ('professor', 'Professor'), ('gestor', 'Gestor')], max_length=10)),
+                ('objeto_id', models.IntegerField()),
+                ('nome', models.CharField(max_length=255)),
+                ('texto', models.TextField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('tipo', 'objeto_id'), name='objeto_unico_no_indice')],
+            },
+        ),
+        migrations.RunSQL(CRIAR_FTS, REMOVER_FTS),
+        migrations.RunPython(preencher_indice, migrations.RunPython.noop),
+    ]
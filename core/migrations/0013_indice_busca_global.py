@@ -0,0 +1,129 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:42
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# Mudar a tabela no SQLite pode recriá-la (e perder os triggers): eles são
+# removidos antes, o FTS é reconstruído a partir da tabela no fim e os
+# triggers voltam — o de UPDATE agora só quando o texto muda.
+REMOVER_TRIGGERS = [
+    'DROP TRIGGER IF EXISTS core_indicebusca_au',
+    'DROP TRIGGER IF EXISTS core_indicebusca_ad',
+    'DROP TRIGGER IF EXISTS core_indicebusca_ai',
+]
+RECONSTRUIR_FTS = "INSERT INTO core_indicebusca_fts(core_indicebusca_fts) VALUES ('rebuild')"
+TRIGGERS_INSERCAO_EXCLUSAO = [
+    """CREATE TRIGGER core_indicebusca_ai AFTER INSERT ON core_indicebusca BEGIN
+        INSERT INTO core_indicebusca_fts(rowid, texto) VALUES (new.id, new.texto);
+    END""",
+    """CREATE TRIGGER core_indicebusca_ad AFTER DELETE ON core_indicebusca BEGIN
+        INSERT INTO core_indicebusca_fts(core_indicebusca_fts, rowid, texto) VALUES ('delete', old.id, old.texto);
+    END""",
+]
+TRIGGERS_ANTIGOS = TRIGGERS_INSERCAO_EXCLUSAO + [
+    """CREATE TRIGGER core_indicebusca_au AFTER UPDATE ON core_indicebusca BEGIN
+        INSERT INTO core_indicebusca_fts(core_indicebusca_fts, rowid, texto) VALUES ('delete', old.id, old.texto);
+        INSERT INTO core_indicebusca_fts(rowid, texto) VALUES (new.id, new.texto);
+    END""",
+]
+TRIGGERS_NOVOS = TRIGGERS_INSERCAO_EXCLUSAO + [
+    """CREATE TRIGGER core_indicebusca_au AFTER UPDATE OF texto ON core_indicebusca BEGIN
+        INSERT INTO core_indicebusca_fts(core_indicebusca_fts, rowid, texto) VALUES ('delete', old.id, old.texto);
+        INSERT INTO core_indicebusca_fts(rowid, texto) VALUES (new.id, new.texto);
+    END""",
+]
+
+
+def juntar(*partes):
+    """Cópia da normalização de core.busca de quando o índice passou a ter turmas e disciplinas"""
+    def normalizar(texto):
+        decomposto = unicodedata.normalize('NFKD', texto or '')
+        return ''.join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+    return ' '.join(normalizar(str(parte)) for parte in partes if parte)
+
+
+def preencher_indice(apps, schema_editor):
+    IndiceBusca = apps.get_model('core', 'IndiceBusca')
+    Turma = apps.get_model('core', 'Turma')
+    turnos = {'manha': 'Manhã', 'tarde': 'Tarde', 'noite': 'Noite'}
+    cargos = {'diretor': 'Diretor', 'vice_diretor': 'Vice-Diretor', 'secretario': 'Secretário', 'coordenador': 'Coordenador'}
+
+    linhas = []
+    for pk, nome, cpf, email, turma_id, turma, ano in apps.get_model('core', 'Aluno').objects.values_list(
+        'pk', 'nome_completo', 'cpf', 'user__email', 'turma_id', 'turma__nome', 'turma__ano',
+    ):
+        linhas.append(IndiceBusca(
+            tipo='aluno', objeto_id=pk, nome=nome, detalhe=f'Aluno(a) — {turma} ({ano})',
+            texto=juntar(nome, re.sub(r'\D', '', cpf), email), turma_id=turma_id,
+        ))
+    for pk, nome, cpf, email in apps.get_model('core', 'Professor').objects.values_list(
+        'pk', 'nome_completo', 'cpf', 'user__email',
+    ):
+        linhas.append(IndiceBusca(
+            tipo='professor', objeto_id=pk, nome=nome, detalhe=f'Professor(a) — {email}',
+            texto=juntar(nome, re.sub(r'\D', '', cpf), email),
+        ))
+    for pk, nome, cpf, email, cargo in apps.get_model('core', 'Gestor').objects.values_list(
+        'pk', 'nome_completo', 'cpf', 'user__email', 'cargo',
+    ):
+        linhas.append(IndiceBusca(
+            tipo='gestor', objeto_id=pk, nome=nome, detalhe=f'Gestor(a) — {cargos.get(cargo, cargo)}',
+            texto=juntar(nome, re.sub(r'\D', '', cpf), email),
+        ))
+    for pk, nome, ano, turno in Turma.objects.values_list('pk', 'nome', 'ano', 'turno'):
+        linhas.append(IndiceBusca(
+            tipo='turma', objeto_id=pk, nome=nome, detalhe=f'Turma — {ano}, {turnos.get(turno, turno)}',
+            texto=juntar(nome, ano, turnos.get(turno, turno)), turma_id=pk,
+        ))
+    for pk, nome, turma_id, turma, ano, professor_id, professor in apps.get_model('core', 'Disciplina').objects.values_list(
+        'pk', 'nome', 'turma_id', 'turma__nome', 'turma__ano', 'professor_id', 'professor__nome_completo',
+    ):
+        linhas.append(IndiceBusca(
+            tipo='disciplina', objeto_id=pk, nome=nome, detalhe=f'{turma} ({ano}) — {professor}',
+            texto=juntar(nome, turma, ano), turma_id=turma_id, professor_id=professor_id,
+        ))
+
+    IndiceBusca.objects.all().delete()
+    IndiceBusca.objects.bulk_create(linhas, batch_size=5000)
+
+
+def remover_turmas_disciplinas(apps, schema_editor):
+    apps.get_model('core', 'IndiceBusca').objects.filter(tipo__in=['turma', 'disciplina']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_indice_busca'),
+    ]
+
+    operations = [
+        # Só na volta: a tabela já voltou ao formato de 0012
+        migrations.RunSQL(migrations.RunSQL.noop, TRIGGERS_ANTIGOS + [RECONSTRUIR_FTS]),
+        migrations.RunSQL(REMOVER_TRIGGERS, migrations.RunSQL.noop),
+        migrations.AddField(
+            model_name='indicebusca',
+            name='detalhe',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='indicebusca',
+            name='professor_id',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='indicebusca',
+            name='turma_id',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='indicebusca',
+            name='tipo',
+            field=models.CharField(choices=[('aluno', 'Aluno'), ('professor', 'Professor'), ('gestor', 'Gestor'), ('turma', 'Turma'), ('disciplina', 'Disciplina')], max_length=10),
+        ),
+        migrations.RunPython(preencher_indice, remover_turmas_disciplinas),
+        migrations.RunSQL([RECONSTRUIR_FTS] + TRIGGERS_NOVOS, REMOVER_TRIGGERS),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:49
+
+import re
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+PAPEIS = (('aluno', 'Aluno'), ('professor', 'Professor'), ('gestor', 'Gestor'))
+
+
+def preencher_cpfs(apps, schema_editor):
+    """CPF canônico dos cadastros existentes.
+
+    O mesmo CPF em dois cadastros (ex. um professor que também é gestor, ou
+    o mesmo número formatado de outro jeito) não cabe no índice único: a
+    migração para e lista os repetidos, para corrigir antes de rodar de novo.
+    """
+    CadastroCPF = apps.get_model('core', 'CadastroCPF')
+    por_cpf = defaultdict(list)
+    for tipo, modelo in PAPEIS:
+        for pk, nome, cpf in apps.get_model('core', modelo).objects.order_by('pk').values_list('pk', 'nome_completo', 'cpf'):
+            por_cpf[re.sub(r'\D', '', cpf)].append((tipo, pk, nome, cpf))
+
+    repetidos = {cpf: cadastros for cpf, cadastros in por_cpf.items() if len(cadastros) > 1}
+    if repetidos:
+        linhas = [
+            f'  {cpf}: ' + '; '.join(f'{tipo} #{pk} {nome} ({original})' for tipo, pk, nome, original in cadastros)
+            for cpf, cadastros in sorted(repetidos.items())
+        ]
+        raise RuntimeError(
+            f'{len(repetidos)} CPF(s) em mais de um cadastro. Corrija o CPF ou exclua o cadastro '
+            'duplicado direto no banco e rode o migrate de novo:\n' + '\n'.join(linhas)
+        )
+
+    CadastroCPF.objects.bulk_create(
+        [
+            CadastroCPF(tipo=tipo, objeto_id=pk, cpf=cpf)
+            for cpf, cadastros in por_cpf.items()
+            for tipo, pk, _, _ in cadastros
+        ],
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_indice_busca_global'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CadastroCPF',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cpf', models.CharField(max_length=11, unique=True)),
+                ('tipo', models.CharField(choices=[('aluno', 'Aluno'), ('professor', 'Professor'), ('gestor', 'Gestor')], max_length=10)),
+                ('objeto_id', models.IntegerField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('tipo', 'objeto_id'), name='um_cpf_por_cadastro')],
+            },
+        ),
+        migrations.RunPython(preencher_cpfs, migrations.RunPython.noop),
+    ]
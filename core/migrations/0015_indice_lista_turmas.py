@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_cadastro_cpf'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='turma',
+            index=models.Index(fields=['ano', 'nome', 'id'], name='turma_ano_nome_idx'),
+        ),
+    ]
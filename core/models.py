@@ -1,4 +1,9 @@
+import operator
+from functools import reduce
+
 from django.db import models
+from django.db.models.functions import Coalesce, NullIf
+from django.db.models.lookups import IsNull, LessThan
 from django.contrib.auth.models import User
 
 
@@ -14,6 +19,12 @@ class Turma(models.Model):
     turno = models.CharField(max_length=20, choices=TURNO_CHOICES, default='manha')
     ano = models.IntegerField()
 
+    class Meta:
+        indexes = [
+            # Paginação por chave de listar_turmas (nome, id) dentro do ano
+            models.Index(fields=['ano', 'nome', 'id'], name='turma_ano_nome_idx'),
+        ]
+
     def __str__(self):
         return f"{self.nome} - {self.get_turno_display()} ({self.ano})"
 
@@ -80,6 +91,13 @@ class Professor(models.Model):
 
     def __str__(self):
         return self.nome_completo
+
+    def clean(self):
+        # CPF livre também entre os outros papéis (import local: cpf.py importa os modelos)
+        from .cpf import validar_cpf_pessoa
+        validar_cpf_pessoa(self)
+
+
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import RegexValidator
@@ -165,20 +183,91 @@ class Aluno(models.Model):
         verbose_name = "Aluno"
         verbose_name_plural = "Alunos"
         ordering = ['nome_completo']
+        indexes = [
+            # Paginação por chave de listar_alunos (nome, id), geral e por turma
+            models.Index(fields=['nome_completo', 'id'], name='aluno_nome_idx'),
+            models.Index(fields=['turma', 'nome_completo', 'id'], name='aluno_turma_nome_idx'),
+        ]
 
     def __str__(self):
         return f"{self.nome_completo} - {self.turma}"
 
+    def clean(self):
+        from .cpf import validar_cpf_pessoa
+        validar_cpf_pessoa(self)
+
 # ------------------ DISCIPLINA ------------------
 class Disciplina(models.Model):
     nome = models.CharField(max_length=100)
     professor = models.ForeignKey(Professor, on_delete=models.CASCADE)
     turma = models.ForeignKey(Turma, on_delete=models.CASCADE)
+    aulas_semanais = models.PositiveSmallIntegerField(default=2)   # usado pelo gerador de grades
+
+    # ------------------ CONTADORES (mantidos por core/signals.py) ------------------
+    alunos_matriculados = models.IntegerField(default=0)
+    lancadas_b1 = models.IntegerField(default=0)
+    lancadas_b2 = models.IntegerField(default=0)
+    lancadas_b3 = models.IntegerField(default=0)
+    lancadas_b4 = models.IntegerField(default=0)
+
+    @property
+    def notas_lancadas(self):
+        return self.lancadas_b1 + self.lancadas_b2 + self.lancadas_b3 + self.lancadas_b4
+
+    @property
+    def notas_possiveis(self):
+        return self.alunos_matriculados * 4
+
+    @property
+    def percentual_lancado(self):
+        if not self.notas_possiveis:
+            return 0
+        return int(self.notas_lancadas / self.notas_possiveis * 100)
 
     def __str__(self):
         return f"{self.nome} ({self.turma})"
 
 
+# Média e situação calculadas no banco, com o mesmo resultado de Nota.media:
+# média só dos bimestres lançados, NULL se nenhum foi lançado.
+LIMITE_REPROVACAO = 4
+LIMITE_APROVACAO = 6
+SITUACOES = {'aprovado': 'Aprovado', 'recuperacao': 'Recuperação', 'reprovado': 'Reprovado'}
+
+
+def expressao_media(prefixo=''):
+    """Expressão SQL da média; prefixo permite usar por relação (ex. 'nota__')"""
+    campos = [models.F(f'{prefixo}nota{b}') for b in range(1, 5)]
+
+    quantidade = reduce(operator.add, [
+        models.Case(models.When(IsNull(campo, False), then=1), default=0) for campo in campos
+    ])
+    soma = reduce(operator.add, [Coalesce(campo, models.Value(0.0)) for campo in campos])
+
+    # Nenhum bimestre lançado → divide por NULL → NULL
+    return models.ExpressionWrapper(soma / NullIf(quantidade, 0), output_field=models.FloatField())
+
+
+def expressao_situacao(media):
+    """'reprovado' / 'recuperacao' / 'aprovado' a partir de uma expressão de média"""
+    return models.Case(
+        models.When(IsNull(media, True), then=None),
+        models.When(LessThan(media, LIMITE_REPROVACAO), then=models.Value('reprovado')),
+        models.When(LessThan(media, LIMITE_APROVACAO), then=models.Value('recuperacao')),
+        default=models.Value('aprovado'),
+        output_field=models.CharField(),
+    )
+
+
+class NotaQuerySet(models.QuerySet):
+
+    def com_media(self):
+        """Anota media_anual e situacao (dá para filtrar/ordenar/agregar)"""
+        return self.annotate(media_anual=expressao_media()).annotate(
+            situacao=expressao_situacao(models.F('media_anual'))
+        )
+
+
 class Nota(models.Model):
     aluno = models.ForeignKey(Aluno, on_delete=models.CASCADE)
     disciplina = models.ForeignKey(Disciplina, on_delete=models.CASCADE)
@@ -188,6 +277,8 @@ class Nota(models.Model):
     nota3 = models.FloatField(null=True, blank=True)
     nota4 = models.FloatField(null=True, blank=True)
 
+    objects = NotaQuerySet.as_manager()
+
     class Meta:
         unique_together = ('aluno', 'disciplina')
 
@@ -267,13 +358,128 @@ class Gestor(models.Model):
     def __str__(self):
         return f"{self.nome_completo} ({self.get_cargo_display()})"
 
+    def clean(self):
+        from .cpf import validar_cpf_pessoa
+        validar_cpf_pessoa(self)
+
 
 # ------------------ GRADE HORÁRIA ------------------
-class GradeHorario(models.Model):
-    turma = models.OneToOneField("Turma", on_delete=models.CASCADE)
-    dados = models.JSONField(default=dict)  # tabela completa da grade
+class AulaGrade(models.Model):
+    """Uma célula da grade: a disciplina que a turma tem num dia e horário.
+
+    Professor, ano e turno são copiados da disciplina/turma (core/signals.py)
+    para o banco garantir que um professor não dê duas aulas no mesmo
+    horário. Horários só colidem dentro do mesmo ano e turno — o índice do
+    horário é relativo ao turno.
+    """
+    DIA_CHOICES = [
+        ('segunda', 'Segunda'),
+        ('terca', 'Terça'),
+        ('quarta', 'Quarta'),
+        ('quinta', 'Quinta'),
+        ('sexta', 'Sexta'),
+    ]
+
+    turma = models.ForeignKey(Turma, on_delete=models.CASCADE, related_name='aulas')
+    disciplina = models.ForeignKey(Disciplina, on_delete=models.CASCADE, related_name='aulas')
+    professor = models.ForeignKey(Professor, on_delete=models.CASCADE, related_name='aulas')
+
+    ano = models.IntegerField()
+    turno = models.CharField(max_length=20)
+    dia = models.CharField(max_length=10, choices=DIA_CHOICES)
+    horario = models.PositiveSmallIntegerField()   # posição na lista HORARIOS do turno
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['turma', 'dia', 'horario'], name='aula_unica_por_horario'),
+            # Também é o índice das buscas por professor (horários ocupados, semana do professor)
+            models.UniqueConstraint(fields=['professor', 'ano', 'turno', 'dia', 'horario'], name='professor_sem_choque'),
+        ]
+
+    def __str__(self):
+        return f"{self.turma} - {self.get_dia_display()} {self.horario}: {self.disciplina.nome}"
+
+
+# ------------------ RESUMO DO ANO LETIVO ------------------
+class ResumoAnoLetivo(models.Model):
+    """Contadores do painel da gestão, mantidos pelos signals de core/signals.py"""
+    ano = models.IntegerField(unique=True)
+
+    total_turmas = models.IntegerField(default=0)
+    total_alunos = models.IntegerField(default=0)
+    total_professores = models.IntegerField(default=0)
+    total_disciplinas = models.IntegerField(default=0)
+    total_notas_lancadas = models.IntegerField(default=0)
+
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Resumo do ano letivo"
+        verbose_name_plural = "Resumos dos anos letivos"
+        ordering = ['-ano']
 
     def __str__(self):
-        return f"Grade Horária - {self.turma}"
+        return f"Resumo {self.ano}"
+
+
+# ------------------ ÍNDICE DE BUSCA ------------------
+class IndiceBusca(models.Model):
+    """Uma linha por pessoa, turma ou disciplina, com o texto de busca já
+    normalizado (core/busca.py).
+
+    Mantido pelos signals de core/signals.py. A tabela FTS5
+    core_indicebusca_fts (criada na migração) espelha o campo texto por
+    triggers e é onde a busca acontece. turma_id e professor_id são cópias
+    para filtrar o que cada papel pode ver sem sair do índice.
+    """
+    TIPO_CHOICES = [
+        ('aluno', 'Aluno'),
+        ('professor', 'Professor'),
+        ('gestor', 'Gestor'),
+        ('turma', 'Turma'),
+        ('disciplina', 'Disciplina'),
+    ]
 
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES)
+    objeto_id = models.IntegerField()
+    nome = models.CharField(max_length=255)
+    detalhe = models.CharField(max_length=255, blank=True)   # segunda linha da sugestão
+    texto = models.TextField()    # sem acentos, em minúsculas; CPF só com dígitos
 
+    turma_id = models.IntegerField(null=True)       # aluno, turma e disciplina
+    professor_id = models.IntegerField(null=True)   # disciplina
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tipo', 'objeto_id'], name='objeto_unico_no_indice'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()}: {self.nome}"
+
+
+# ------------------ CPF DAS PESSOAS ------------------
+class CadastroCPF(models.Model):
+    """O CPF de cada pessoa, só com dígitos, qualquer que seja o papel (core/cpf.py).
+
+    Mantido pelos signals de core/signals.py. O índice único em cpf é o que
+    impede o mesmo CPF em dois cadastros, inclusive um aluno e um professor;
+    o unique de cada modelo só vale dentro dele e compara o texto formatado.
+    """
+    TIPO_CHOICES = [
+        ('aluno', 'Aluno'),
+        ('professor', 'Professor'),
+        ('gestor', 'Gestor'),
+    ]
+
+    cpf = models.CharField(max_length=11, unique=True)
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES)
+    objeto_id = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tipo', 'objeto_id'], name='um_cpf_por_cadastro'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()}: {self.cpf}"
@@ -0,0 +1,85 @@
+import base64
+import json
+
+from django.db.models import Q
+
+
+# ======================== PAGINAÇÃO POR CHAVE ========================
+# Em vez de OFFSET (que relê todas as linhas das páginas anteriores), a página
+# seguinte começa depois da última linha mostrada: WHERE (nome, id) > (...)
+# pelo mesmo índice da ordenação. O custo é o mesmo na primeira ou na
+# centésima página. O cursor leva os valores da linha de fronteira e a
+# direção, codificados para ir na URL.
+
+TAMANHO_PADRAO = 50
+TAMANHO_MAXIMO = 200
+
+
+def ler_tamanho(valor, padrao=TAMANHO_PADRAO):
+    """Tamanho da página vindo do GET, entre 1 e TAMANHO_MAXIMO"""
+    try:
+        tamanho = int(valor)
+    except (TypeError, ValueError):
+        return padrao
+    return max(1, min(tamanho, TAMANHO_MAXIMO))
+
+
+def codificar_cursor(direcao, valores):
+    texto = json.dumps([direcao, valores], separators=(',', ':'))
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor, campos):
+    """(direcao, valores) do cursor, ou None se estiver vazio ou inválido"""
+    if not cursor:
+        return None
+    try:
+        direcao, valores = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        return None
+    if direcao not in ('depois', 'antes') or not isinstance(valores, list) or len(valores) != len(campos):
+        return None
+    return direcao, valores
+
+
+def depois_de(campos, valores, comparacao='gt'):
+    """(c1, c2, ...) > (v1, v2, ...) em Q, campo a campo (ordem crescente)"""
+    condicao = Q()
+    for i, campo in enumerate(campos):
+        iguais = {anterior: valores[j] for j, anterior in enumerate(campos[:i])}
+        condicao |= Q(**iguais, **{f'{campo}__{comparacao}': valores[i]})
+    return condicao
+
+
+def paginar_por_chave(queryset, campos, cursor=None, tamanho=TAMANHO_PADRAO):
+    """Uma página do queryset ordenado por campos (crescente; o último deve ser único).
+
+    Retorna {'itens', 'proxima', 'anterior'}, com os cursores das páginas
+    vizinhas (None quando não há). Uma consulta, com LIMIT tamanho + 1 para
+    saber se há mais páginas.
+    """
+    def fronteira(obj):
+        return [getattr(obj, campo) for campo in campos]
+
+    lido = decodificar_cursor(cursor, campos)
+    direcao, valores = lido or ('depois', None)
+
+    if direcao == 'depois':
+        if valores is not None:
+            queryset = queryset.filter(depois_de(campos, valores, 'gt'))
+        itens = list(queryset.order_by(*campos)[:tamanho + 1])
+        mais = len(itens) > tamanho
+        itens = itens[:tamanho]
+        tem_seguinte, tem_anterior = mais, valores is not None
+    else:
+        queryset = queryset.filter(depois_de(campos, valores, 'lt'))
+        itens = list(queryset.order_by(*[f'-{campo}' for campo in campos])[:tamanho + 1])
+        mais = len(itens) > tamanho
+        itens = itens[:tamanho][::-1]
+        tem_seguinte, tem_anterior = True, mais
+
+    return {
+        'itens': itens,
+        'proxima': codificar_cursor('depois', fronteira(itens[-1])) if itens and tem_seguinte else None,
+        'anterior': codificar_cursor('antes', fronteira(itens[0])) if itens and tem_anterior else None,
+    }
@@ -0,0 +1,120 @@
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.views import redirect_to_login
+from django.core.exceptions import ObjectDoesNotExist
+
+
+# ======================== PERFIL DO USUÁRIO ========================
+# Resolve de uma vez (uma consulta) qual é o papel do usuário logado e qual
+# objeto de perfil ele tem. O PerfilMiddleware deixa o resultado em
+# request.perfil para views, decorators e templates.
+
+PERFIS = ('gestor', 'professor', 'aluno')
+
+PAINEIS = {
+    'superusuario': 'painel_super',
+    'gestor': 'painel_super',
+    'professor': 'painel_professor',
+    'aluno': 'painel_aluno',
+}
+
+
+class Perfil:
+
+    def __init__(self, user, gestor=None, professor=None, aluno=None):
+        self.user = user
+        self.gestor = gestor
+        self.professor = professor
+        self.aluno = aluno
+
+        self.is_superuser = bool(user.is_authenticated and user.is_superuser)
+        self.is_gestor = gestor is not None
+        self.is_professor = professor is not None
+        self.is_aluno = aluno is not None
+
+        # Mesma prioridade das telas: superusuário, gestor, professor, aluno
+        if self.is_superuser:
+            self.papel = 'superusuario'
+        else:
+            self.papel = next((nome for nome in PERFIS if getattr(self, nome) is not None), None)
+
+    @property
+    def objeto(self):
+        """Objeto de perfil (Professor, Aluno ou Gestor) — superusuário pode não ter"""
+        return self.professor or self.aluno or self.gestor
+
+    @property
+    def painel(self):
+        """Nome da URL da tela inicial do papel (None se não tiver papel)"""
+        return PAINEIS.get(self.papel)
+
+    @property
+    def cargo(self):
+        return self.gestor.cargo if self.gestor else None
+
+    @property
+    def foto_url(self):
+        objeto = self.objeto
+        if objeto and objeto.foto:
+            return objeto.foto.url
+        return None
+
+    @property
+    def nome_exibicao(self):
+        for nome in PERFIS:
+            objeto = getattr(self, nome)
+            if objeto is not None:
+                return objeto.nome_completo
+
+        # Superusuário
+        nome = f"{self.user.first_name} {self.user.last_name}".strip()
+        if nome:
+            return nome
+
+        # Último fallback (nunca deveria acontecer)
+        return self.user.email
+
+
+def carregar_perfil(user):
+    """Busca o usuário com os três perfis num único SELECT com LEFT JOINs.
+
+    Os perfis encontrados (ou a ausência deles) também ficam no cache do
+    próprio request.user, então hasattr(user, 'professor') e afins deixam de
+    ir ao banco pelo resto da requisição.
+    """
+    if not user.is_authenticated:
+        return Perfil(user)
+
+    User = get_user_model()
+    completo = User.objects.select_related('gestor', 'professor', 'aluno__turma').get(pk=user.pk)
+
+    encontrados = {}
+    for nome in PERFIS:
+        try:
+            encontrados[nome] = getattr(completo, nome)
+        except ObjectDoesNotExist:
+            encontrados[nome] = None
+
+        getattr(User, nome).related.set_cached_value(user, encontrados[nome])
+
+    return Perfil(user, **encontrados)
+
+
+def pode_lancar_notas(perfil, disciplina):
+    """Gestão lança em qualquer disciplina; professor só nas suas"""
+    if perfil.is_superuser or perfil.is_gestor:
+        return True
+    return perfil.is_professor and disciplina.professor_id == perfil.professor.id
+
+
+def perfil_passes_test(teste):
+    """Igual ao user_passes_test, mas o teste recebe request.perfil"""
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            if teste(request.perfil):
+                return view_func(request, *args, **kwargs)
+            return redirect_to_login(request.get_full_path())
+        return _wrapped_view
+    return decorator
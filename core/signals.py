@@ -0,0 +1,349 @@
+from functools import partial
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from .anos import invalidar_anos
+from .boletim import invalidar_boletim_aluno, invalidar_boletins_turma
+from .busca import indexar, indexar_usuario, remover
+from .cpf import liberar_cpf, registrar_cpf, validar_cpf_pessoa
+from .estatisticas import (
+    aplicar_delta_resumo, atualizar_contadores_disciplinas, atualizar_professores_resumo,
+    bimestres_lancados, deltas_bimestres, recalcular_resumo_ano, recontar_disciplinas,
+)
+from .grade import aulas_fora_do_turno, invalidar_grades, invalidar_grades_turmas, invalidar_semanas
+from .models import Aluno, AulaGrade, Disciplina, Gestor, Nota, Professor, Turma
+
+
+# ======================== HELPERS ========================
+# Os valores "originais" são guardados no post_init para saber o que mudou no
+# save sem precisar reler a linha. Lemos do __dict__ para não disparar
+# consultas em campos adiados (.only() / .defer()).
+
+def ano_da_turma(turma_id):
+    return Turma.objects.filter(pk=turma_id).values_list('ano', flat=True).first()
+
+
+def ano_do_aluno(aluno):
+    if Aluno.turma.is_cached(aluno):
+        return aluno.turma.ano
+    return ano_da_turma(aluno.turma_id)
+
+
+def ano_da_disciplina(disciplina_id):
+    return Turma.objects.filter(disciplina__id=disciplina_id).values_list('ano', flat=True).first()
+
+
+def depois_do_commit(invalidar, *args):
+    """Invalida o cache só quando a transação confirmar.
+
+    Antes do commit as outras conexões ainda leem os dados antigos e
+    poderiam guardá-los de novo no cache já invalidado.
+    """
+    transaction.on_commit(partial(invalidar, *args))
+
+
+# ======================== TURMA ========================
+@receiver(post_init, sender=Turma)
+def turma_guardar_original(sender, instance, **kwargs):
+    instance._nome_original = instance.__dict__.get('nome')
+    instance._ano_original = instance.__dict__.get('ano')
+    instance._turno_original = instance.__dict__.get('turno')
+
+
+@receiver(post_save, sender=Turma)
+def turma_salva(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    depois_do_commit(invalidar_anos)
+
+    ano = int(instance.ano)
+
+    if created:
+        aplicar_delta_resumo(ano, total_turmas=1)
+    elif instance._ano_original is not None and int(instance._ano_original) != ano:
+        # Mudar o ano leva junto alunos, disciplinas e notas → recalcula os dois anos
+        recalcular_resumo_ano(int(instance._ano_original))
+        recalcular_resumo_ano(ano)
+
+    if not created and (
+        instance._ano_original is not None and int(instance._ano_original) != ano
+        or instance._turno_original != instance.turno
+    ):
+        # Turno com menos horários: as aulas que sobram não aparecem na grade e
+        # ainda prenderiam o professor no horário (editar_turma avisa quantas)
+        if instance._turno_original != instance.turno:
+            aulas_fora_do_turno(instance.id, instance.turno).delete()
+        # Cópias usadas na restrição de choque de horário (conferida antes, em editar_turma)
+        AulaGrade.objects.filter(turma=instance).update(ano=ano, turno=instance.turno)
+
+    if not created and (
+        instance._nome_original != instance.nome
+        or instance._ano_original is not None and int(instance._ano_original) != ano
+        or instance._turno_original != instance.turno
+    ):
+        invalidar_grades_turmas([instance])
+        # Nome, ano e turno da turma aparecem nas linhas dos alunos e disciplinas
+        indexar('aluno', Aluno.objects.filter(turma=instance))
+        indexar('disciplina', Disciplina.objects.filter(turma=instance))
+
+    instance._nome_original = instance.nome
+    instance._ano_original = ano
+    instance._turno_original = instance.turno
+
+
+@receiver(post_delete, sender=Turma)
+def turma_excluida(sender, instance, **kwargs):
+    depois_do_commit(invalidar_anos)
+
+    # Alunos, disciplinas e notas da turma já descontaram via cascata
+    aplicar_delta_resumo(int(instance.ano), total_turmas=-1)
+
+
+# ======================== ALUNO ========================
+@receiver(post_init, sender=Aluno)
+def aluno_guardar_original(sender, instance, **kwargs):
+    instance._turma_id_original = instance.__dict__.get('turma_id')
+
+
+@receiver(post_save, sender=Aluno)
+def aluno_salvo(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    if created:
+        aplicar_delta_resumo(ano_do_aluno(instance), total_alunos=1)
+        atualizar_contadores_disciplinas({'turma_id': instance.turma_id}, alunos_matriculados=1)
+    elif instance._turma_id_original and instance._turma_id_original != instance.turma_id:
+        atualizar_contadores_disciplinas({'turma_id': instance._turma_id_original}, alunos_matriculados=-1)
+        atualizar_contadores_disciplinas({'turma_id': instance.turma_id}, alunos_matriculados=1)
+
+        ano_antigo = ano_da_turma(instance._turma_id_original)
+        ano_novo = ano_do_aluno(instance)
+        if ano_antigo != ano_novo:
+            if ano_antigo is not None:
+                aplicar_delta_resumo(ano_antigo, total_alunos=-1)
+            aplicar_delta_resumo(ano_novo, total_alunos=1)
+
+    instance._turma_id_original = instance.turma_id
+
+
+@receiver(post_delete, sender=Aluno)
+def aluno_excluido(sender, instance, **kwargs):
+    atualizar_contadores_disciplinas({'turma_id': instance.turma_id}, alunos_matriculados=-1)
+
+    ano = ano_da_turma(instance.turma_id)
+    if ano is not None:
+        aplicar_delta_resumo(ano, total_alunos=-1)
+
+
+# ======================== PROFESSOR ========================
+@receiver(post_init, sender=Professor)
+def professor_guardar_original(sender, instance, **kwargs):
+    instance._nome_original = instance.__dict__.get('nome_completo')
+
+
+@receiver(post_save, sender=Professor)
+def professor_salvo(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    # O nome do professor aparece no boletim das turmas onde ele leciona
+    if not created and instance._nome_original != instance.nome_completo:
+        turmas = Disciplina.objects.filter(professor=instance).values_list('turma_id', flat=True).distinct()
+        for turma_id in turmas:
+            depois_do_commit(invalidar_boletins_turma, turma_id)
+
+    instance._nome_original = instance.nome_completo
+
+
+# ======================== DISCIPLINA ========================
+@receiver(post_init, sender=Disciplina)
+def disciplina_guardar_original(sender, instance, **kwargs):
+    instance._nome_original = instance.__dict__.get('nome')
+    instance._turma_id_original = instance.__dict__.get('turma_id')
+    instance._professor_id_original = instance.__dict__.get('professor_id')
+
+
+@receiver(post_save, sender=Disciplina)
+def disciplina_salva(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    # Muda os anos em que o professor leciona
+    depois_do_commit(invalidar_anos)
+
+    ano = ano_da_turma(instance.turma_id)
+
+    if created:
+        recontar_disciplinas(Disciplina.objects.filter(pk=instance.pk))
+        aplicar_delta_resumo(ano, total_disciplinas=1)
+        atualizar_professores_resumo(ano)
+    elif instance._turma_id_original and instance._turma_id_original != instance.turma_id:
+        recontar_disciplinas(Disciplina.objects.filter(pk=instance.pk))
+
+        # As notas vão junto com a disciplina → recalcula os dois anos
+        ano_antigo = ano_da_turma(instance._turma_id_original)
+        if ano_antigo is not None:
+            recalcular_resumo_ano(ano_antigo)
+        recalcular_resumo_ano(ano)
+    elif instance._professor_id_original != instance.professor_id:
+        atualizar_professores_resumo(ano)
+
+    depois_do_commit(invalidar_boletins_turma, instance.turma_id)
+    if instance._turma_id_original and instance._turma_id_original != instance.turma_id:
+        depois_do_commit(invalidar_boletins_turma, instance._turma_id_original)
+
+    # Grade horária: a disciplina que sai da turma sai da grade dela; trocar o
+    # professor muda a cópia usada na restrição de choque (conferida antes,
+    # em editar_disciplina)
+    if instance._turma_id_original and instance._turma_id_original != instance.turma_id:
+        AulaGrade.objects.filter(disciplina=instance).delete()
+    elif instance._professor_id_original and instance._professor_id_original != instance.professor_id:
+        AulaGrade.objects.filter(disciplina=instance).update(professor_id=instance.professor_id)
+
+    # Grades das turmas e semana do professor (antigo e novo) mostram a disciplina
+    if not created and (
+        instance._nome_original != instance.nome
+        or instance._turma_id_original != instance.turma_id
+        or instance._professor_id_original != instance.professor_id
+    ):
+        depois_do_commit(invalidar_grades, [instance._turma_id_original, instance.turma_id])
+        depois_do_commit(invalidar_semanas, [instance._professor_id_original, instance.professor_id])
+
+    instance._nome_original = instance.nome
+    instance._turma_id_original = instance.turma_id
+    instance._professor_id_original = instance.professor_id
+
+
+@receiver(post_delete, sender=Disciplina)
+def disciplina_excluida(sender, instance, **kwargs):
+    depois_do_commit(invalidar_anos)
+    depois_do_commit(invalidar_boletins_turma, instance.turma_id)
+    depois_do_commit(invalidar_grades, [instance.turma_id])
+    depois_do_commit(invalidar_semanas, [instance.professor_id])
+
+    ano = ano_da_turma(instance.turma_id)
+    if ano is not None:
+        aplicar_delta_resumo(ano, total_disciplinas=-1)
+        atualizar_professores_resumo(ano)
+
+
+# ======================== NOTA ========================
+@receiver(post_init, sender=Nota)
+def nota_guardar_original(sender, instance, **kwargs):
+    instance._bimestres_original = bimestres_lancados(instance)
+
+
+@receiver(post_save, sender=Nota)
+def nota_salva(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    antes = (0, 0, 0, 0) if created else instance._bimestres_original
+    depois = bimestres_lancados(instance)
+
+    if antes != depois:
+        atualizar_contadores_disciplinas({'pk': instance.disciplina_id}, **deltas_bimestres(antes, depois))
+        aplicar_delta_resumo(
+            ano_da_disciplina(instance.disciplina_id),
+            total_notas_lancadas=sum(depois) - sum(antes),
+        )
+
+    instance._bimestres_original = depois
+    depois_do_commit(invalidar_boletim_aluno, instance.aluno_id)
+
+
+@receiver(post_delete, sender=Nota)
+def nota_excluida(sender, instance, **kwargs):
+    depois_do_commit(invalidar_boletim_aluno, instance.aluno_id)
+
+    antes = instance._bimestres_original
+    if any(antes):
+        atualizar_contadores_disciplinas({'pk': instance.disciplina_id}, **deltas_bimestres(antes, (0, 0, 0, 0)))
+
+        ano = ano_da_disciplina(instance.disciplina_id)
+        if ano is not None:
+            aplicar_delta_resumo(ano, total_notas_lancadas=-sum(antes))
+
+
+# ======================== ÍNDICE DE BUSCA ========================
+# O tipo no índice é o nome do modelo ('aluno', 'professor', 'gestor',
+# 'turma', 'disciplina'). Turma renomeada já reindexa alunos e disciplinas
+# em turma_salva.
+
+@receiver(post_save, sender=Aluno)
+@receiver(post_save, sender=Professor)
+@receiver(post_save, sender=Gestor)
+@receiver(post_save, sender=Turma)
+@receiver(post_save, sender=Disciplina)
+def indexavel_salvo(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    indexar(sender._meta.model_name, sender.objects.filter(pk=instance.pk))
+    if sender is Professor:
+        # O nome do professor aparece nas linhas das disciplinas dele
+        indexar('disciplina', Disciplina.objects.filter(professor=instance))
+
+
+@receiver(post_delete, sender=Aluno)
+@receiver(post_delete, sender=Professor)
+@receiver(post_delete, sender=Gestor)
+@receiver(post_delete, sender=Turma)
+@receiver(post_delete, sender=Disciplina)
+def indexavel_excluido(sender, instance, **kwargs):
+    remover(sender._meta.model_name, instance.pk)
+
+
+@receiver(post_init, sender=User)
+def usuario_guardar_original(sender, instance, **kwargs):
+    instance._email_original = instance.__dict__.get('email')
+
+
+@receiver(post_save, sender=User)
+def usuario_salvo(sender, instance, created, raw=False, **kwargs):
+    # O e-mail faz parte do texto indexado das pessoas do usuário
+    if not raw and not created and instance._email_original != instance.email:
+        indexar_usuario(instance)
+    instance._email_original = instance.email
+
+
+# ======================== CPF ========================
+# Forma canônica em CadastroCPF; o índice único de lá barra o mesmo CPF em
+# dois cadastros. Os formulários conferem antes, com mensagem; fora deles
+# (admin, shell) o pre_save confere e levanta ValidationError no campo cpf
+# antes de gravar. Só um CPF novo ou alterado é conferido e registrado: um
+# save que não mexe no CPF (foto, perfil) nunca falha por causa dele.
+
+@receiver(post_init, sender=Aluno)
+@receiver(post_init, sender=Professor)
+@receiver(post_init, sender=Gestor)
+def pessoa_guardar_original(sender, instance, **kwargs):
+    instance._cpf_original = instance.__dict__.get('cpf')
+
+
+@receiver(pre_save, sender=Aluno)
+@receiver(pre_save, sender=Professor)
+@receiver(pre_save, sender=Gestor)
+def pessoa_conferir_cpf(sender, instance, raw=False, **kwargs):
+    if not raw:
+        validar_cpf_pessoa(instance)
+
+
+@receiver(post_save, sender=Aluno)
+@receiver(post_save, sender=Professor)
+@receiver(post_save, sender=Gestor)
+def pessoa_salva(sender, instance, created, raw=False, **kwargs):
+    if not raw and (created or instance.cpf != instance._cpf_original):
+        registrar_cpf(sender._meta.model_name, instance.pk, instance.cpf)
+    instance._cpf_original = instance.cpf
+
+
+@receiver(post_delete, sender=Aluno)
+@receiver(post_delete, sender=Professor)
+@receiver(post_delete, sender=Gestor)
+def pessoa_excluida(sender, instance, **kwargs):
+    liberar_cpf(sender._meta.model_name, instance.pk)
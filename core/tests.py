@@ -1,3 +1,1472 @@
-from django.test import TestCase
+import importlib
+import statistics
+import zipfile
+from datetime import date
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection, transaction
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from openpyxl import load_workbook
+from pypdf import PdfReader
+
+from .anos import anos_com_turmas
+from .boletim import BIMESTRES, montar_boletim, montar_boletins, obter_boletim
+from .boletins_lote import boletim_para_pdf, gerar_boletins
+from .busca import buscar, consulta_fts
+from .cpf import cpf_valido, dono_do_cpf, gerar_cpf, validar_cpf_cadastro
+from .distribuicao import distribuicao_notas
+from .escrita import escrita_imediata
+from .exportacao import linhas_exportacao
+from .gerador_grade import NIVEIS, Busca, SemSolucao, conferir, resolver
+from .grade import SESSAO_PREVIA_GRADES, celulas_da_grade, formatar_grade, obter_grade_turma, obter_semana, salvar_grade
+from .importacao import importar_planilha
+from .management.sinteticos import gerar_escola
+from .estatisticas import contar_resumo_ano, estatisticas_professor
+from .paginacao import TAMANHO_MAXIMO, ler_tamanho
+from .perfil import carregar_perfil
+from .models import Aluno, AulaGrade, CadastroCPF, Disciplina, Gestor, IndiceBusca, Nota, Professor, ResumoAnoLetivo, Turma
+
+
+# O cache em arquivo das settings é compartilhado com o servidor de
+# desenvolvimento; os testes usam um em memória, só deles.
+cache_dos_testes = override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+
+
+def setUpModule():
+    cache_dos_testes.enable()
+
+
+def tearDownModule():
+    cache_dos_testes.disable()
+
+
+# ======================== HELPERS ========================
+def criar_professor(n):
+    user = User.objects.create(username=f'prof{n}@escola.com', email=f'prof{n}@escola.com')
+    return Professor.objects.create(
+        user=user,
+        nome_completo=f'Professor {n}',
+        cpf=gerar_cpf(100_000_000 + n),
+    )
+
+
+def criar_aluno(n, turma):
+    user = User.objects.create(username=f'aluno{n}@escola.com', email=f'aluno{n}@escola.com')
+    return Aluno.objects.create(
+        user=user,
+        nome_completo=f'Aluno {n:04d}',
+        cpf=gerar_cpf(200_000_000 + n),
+        data_nascimento=date(2010, 1, 1),
+        filiacao_1='Responsável',
+        turma=turma,
+    )
+
+
+# ======================== ESTATÍSTICAS DO PROFESSOR ========================
+class EstatisticasProfessorTests(TestCase):
+
+    def setUp(self):
+        self.professor = criar_professor(1)
+        self.contador_alunos = 0
+
+    def criar_disciplinas(self, quantidade, alunos_por_turma=3):
+        for i in range(quantidade):
+            turma = Turma.objects.create(nome=f'Turma {i}', turno='manha', ano=2025)
+            alunos = []
+            for _ in range(alunos_por_turma):
+                self.contador_alunos += 1
+                alunos.append(criar_aluno(self.contador_alunos, turma))
+
+            disciplina = Disciplina.objects.create(nome=f'Disciplina {i}', professor=self.professor, turma=turma)
+            Nota.objects.create(aluno=alunos[0], disciplina=disciplina, nota1=7, nota2=8)
+
+    def contar_consultas(self):
+        with CaptureQueriesContext(connection) as ctx:
+            estatisticas_professor(self.professor, 2025)
+        return len(ctx.captured_queries)
+
+    def test_totais(self):
+        self.criar_disciplinas(2)
+        turma = Turma.objects.get(nome='Turma 0')
+        Disciplina.objects.create(nome='Extra', professor=self.professor, turma=turma)
+
+        estatisticas = estatisticas_professor(self.professor, 2025)
+
+        self.assertEqual(estatisticas['total_disciplinas'], 3)
+        self.assertEqual(estatisticas['total_turmas'], 2)
+        self.assertEqual(estatisticas['total_alunos'], 6)
+        self.assertEqual(estatisticas['total_notas_lancadas'], 4)
+        self.assertEqual(estatisticas['total_notas_possiveis'], 3 * 3 * 4)
+
+        item = next(d for d in estatisticas['disciplinas_detalhadas'] if d['disciplina'].nome == 'Disciplina 0')
+        self.assertEqual(item['alunos_count'], 3)
+        self.assertEqual(item['notas_lancadas'], 2)
+        self.assertEqual(item['percentual'], int(2 / 12 * 100))
+
+    def test_consultas_constantes(self):
+        self.criar_disciplinas(2)
+        poucas = self.contar_consultas()
+
+        self.criar_disciplinas(15)
+        muitas = self.contar_consultas()
+
+        self.assertEqual(poucas, muitas)
+
+
+# ======================== RESUMO DO ANO LETIVO ========================
+class ResumoAnoLetivoTests(TestCase):
+
+    def assertResumoConfere(self, ano):
+        resumo = ResumoAnoLetivo.objects.get(ano=ano)
+        for campo, valor in contar_resumo_ano(ano).items():
+            self.assertEqual(getattr(resumo, campo), valor, campo)
+
+    def test_signals_mantem_contadores(self):
+        prof1, prof2 = criar_professor(1), criar_professor(2)
+        turma = Turma.objects.create(nome='1º A', ano=2025)
+        outra = Turma.objects.create(nome='1º B', ano=2025)
+        aluno = criar_aluno(1, turma)
+        criar_aluno(2, outra)
+
+        mat = Disciplina.objects.create(nome='Matemática', professor=prof1, turma=turma)
+        Disciplina.objects.create(nome='História', professor=prof2, turma=outra)
+
+        nota = Nota.objects.create(aluno=aluno, disciplina=mat, nota1=5)
+        nota.nota2 = 6
+        nota.nota3 = 7
+        nota.save()
+        self.assertResumoConfere(2025)
+        self.assertEqual(ResumoAnoLetivo.objects.get(ano=2025).total_notas_lancadas, 3)
+
+        mat.professor = prof2
+        mat.save()
+        self.assertEqual(ResumoAnoLetivo.objects.get(ano=2025).total_professores, 1)
+
+        aluno.turma = outra
+        aluno.save()
+        outra.ano = 2026
+        outra.save()
+        self.assertResumoConfere(2025)
+        self.assertResumoConfere(2026)
+
+        turma.delete()
+        self.assertResumoConfere(2025)
+        self.assertEqual(ResumoAnoLetivo.objects.get(ano=2025).total_turmas, 0)
+
+    def test_comando_reconstroi(self):
+        turma = Turma.objects.create(nome='1º A', ano=2025)
+        criar_aluno(1, turma)
+        ResumoAnoLetivo.objects.filter(ano=2025).update(total_alunos=99)
+
+        with self.assertRaises(CommandError):
+            call_command('recalcular_resumos', verificar=True, stdout=StringIO())
+
+        call_command('recalcular_resumos', stdout=StringIO())
+        self.assertResumoConfere(2025)
+
+    def test_painel_nao_grava_resumo(self):
+        turma = Turma.objects.create(nome='1º A', ano=2025)
+        criar_aluno(1, turma)
+        ResumoAnoLetivo.objects.all().delete()
+        self.client.force_login(User.objects.create(username='su', is_superuser=True))
+
+        for ano, alunos in ((2025, 1), (1234, 0)):
+            resposta = self.client.get('/painel/super/', {'ano': ano})
+            self.assertEqual(resposta.context['total_alunos'], alunos)
+        self.assertFalse(ResumoAnoLetivo.objects.exists())
+
+
+# ======================== BOLETIM ========================
+class BoletimTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.professor = criar_professor(1)
+        self.turma = Turma.objects.create(nome='1º A', ano=2025)
+        self.aluno = criar_aluno(1, self.turma)
+        self.mat = Disciplina.objects.create(nome='Matemática', professor=self.professor, turma=self.turma)
+        self.port = Disciplina.objects.create(nome='Português', professor=self.professor, turma=self.turma)
+
+    def test_situacao_geral(self):
+        Nota.objects.create(aluno=self.aluno, disciplina=self.mat, nota1=8, nota2=8, nota3=8, nota4=8)
+        nota = Nota.objects.create(aluno=self.aluno, disciplina=self.port, nota1=5, nota2=5, nota3=5, nota4=5)
+
+        boletim = obter_boletim(self.aluno)
+        self.assertEqual(boletim['situacao_geral'], 'Recuperação')
+        self.assertEqual(boletim['total_notas_lancadas'], 8)
+        self.assertAlmostEqual(boletim['media_geral'], 6.5)
+        self.assertEqual(boletim['disciplinas_com_notas'][0]['disciplina']['professor']['nome_completo'], 'Professor 1')
+
+        # A invalidação espera o commit: antes dele o cache continua valendo
+        with self.captureOnCommitCallbacks(execute=True):
+            nota.nota4 = 9
+            nota.save()
+            self.assertEqual(obter_boletim(self.aluno)['situacao_geral'], 'Recuperação')
+        self.assertEqual(obter_boletim(self.aluno)['situacao_geral'], 'Aprovado')
+
+    def test_professor_renomeado_invalida_boletins(self):
+        obter_boletim(self.aluno)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.professor.nome_completo = 'Professora Ana'
+            self.professor.save()
+        disciplinas = obter_boletim(self.aluno)['disciplinas_com_notas']
+        self.assertEqual(disciplinas[0]['disciplina']['professor']['nome_completo'], 'Professora Ana')
+
+    def test_cache_e_invalidacao(self):
+        Nota.objects.create(aluno=self.aluno, disciplina=self.mat, nota1=7)
+
+        with self.assertNumQueries(1):
+            obter_boletim(self.aluno)
+        with self.assertNumQueries(0):
+            obter_boletim(self.aluno)
+
+        # Nota de outro aluno não invalida
+        with self.captureOnCommitCallbacks(execute=True):
+            outro = criar_aluno(2, self.turma)
+            Nota.objects.create(aluno=outro, disciplina=self.mat, nota1=3)
+        with self.assertNumQueries(0):
+            obter_boletim(self.aluno)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Disciplina.objects.create(nome='História', professor=self.professor, turma=self.turma)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(obter_boletim(self.aluno)['disciplinas_com_notas']), 3)
+
+
+# ======================== LISTA DE ALUNOS ========================
+class ListarAlunosTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.turma_a = Turma.objects.create(nome='1º A', ano=2025)
+        self.turma_b = Turma.objects.create(nome='1º B', ano=2025)
+        self.passada = Turma.objects.create(nome='1º A', ano=2024)
+        for n in range(1, 26):
+            criar_aluno(n, (self.turma_a, self.turma_b, self.passada)[n % 3])
+        self.client.force_login(User.objects.create(username='su', is_superuser=True))
+
+    def nomes(self, resposta):
+        return [aluno.nome_completo for aluno in resposta.context['alunos']]
+
+    def test_percorre_todas_as_paginas_nas_duas_direcoes(self):
+        resposta = self.client.get('/alunos/?tamanho=10')
+        paginas = [self.nomes(resposta)]
+        self.assertIsNone(resposta.context['anterior'])
+        while resposta.context['proxima']:
+            resposta = self.client.get(f"/alunos/?{resposta.context['filtros']}&cursor={resposta.context['proxima']}")
+            paginas.append(self.nomes(resposta))
+
+        self.assertEqual([len(p) for p in paginas], [10, 10, 5])
+        self.assertEqual(sum(paginas, []), [f'Aluno {n:04d}' for n in range(1, 26)])
+
+        resposta = self.client.get(f"/alunos/?tamanho=10&cursor={resposta.context['anterior']}")
+        self.assertEqual(self.nomes(resposta), paginas[1])
+
+        self.assertEqual(ler_tamanho('100000'), TAMANHO_MAXIMO)
+        self.assertEqual(len(self.nomes(self.client.get('/alunos/?tamanho=lixo'))), 25)
+
+    def test_filtros_e_consultas_constantes(self):
+        resposta = self.client.get(f'/alunos/?ano=2025&turma={self.turma_b.id}')
+        self.assertEqual(len(self.nomes(resposta)), 9)
+        self.assertEqual([t['nome'] for t in resposta.context['turmas']], ['1º A', '1º B'])
+        self.assertEqual(len(self.nomes(self.client.get('/alunos/?ano=2024'))), 8)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/alunos/?ano=2025')
+        consultas = len(ctx.captured_queries)
+
+        for n in range(100, 160):
+            criar_aluno(n, self.turma_a)
+        with CaptureQueriesContext(connection) as ctx:
+            resposta = self.client.get('/alunos/?ano=2025')
+        self.assertEqual(len(ctx.captured_queries), consultas)
+        self.assertContains(resposta, 'aluno100@escola.com')
+
+
+# ======================== LISTA DE TURMAS ========================
+class ListarTurmasTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.turma = Turma.objects.create(nome='1º A', ano=2025, turno='noite')
+        self.vazia = Turma.objects.create(nome='1º B', ano=2025)
+        self.alunos = [criar_aluno(n, self.turma) for n in range(1, 4)]
+        professor = criar_professor(1)
+        self.mat = Disciplina.objects.create(nome='Matemática', professor=professor, turma=self.turma)
+        Disciplina.objects.create(nome='Português', professor=professor, turma=self.turma)
+        salvar_grade(self.turma, {('seg', 0): self.mat, ('ter', 1): self.mat})
+        Nota.objects.create(aluno=self.alunos[0], disciplina=self.mat, nota1=5, nota2=6, nota3=7)
+        self.client.force_login(User.objects.create(username='su', is_superuser=True))
+
+    def test_indicadores_por_turma(self):
+        resposta = self.client.get('/turmas/?ano=2025')
+        turma, vazia = resposta.context['turmas']
+
+        self.assertEqual((turma.total_alunos, turma.total_disciplinas), (3, 2))
+        # Noite: 5 dias × 4 horários; 3 de 24 notas possíveis
+        self.assertEqual((turma.aulas_na_grade, turma.capacidade_grade, turma.percentual_grade), (2, 20, 10))
+        self.assertEqual((turma.notas_lancadas, turma.notas_possiveis, turma.percentual_notas), (3, 24, 12))
+        self.assertEqual(
+            (vazia.total_alunos, vazia.total_disciplinas, vazia.percentual_grade, vazia.percentual_notas), (0, 0, 0, 0),
+        )
+        self.assertContains(resposta, '3 de 24 notas')
+
+    def test_paginas_com_consultas_constantes(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/turmas/?ano=2025')
+        consultas = len(ctx.captured_queries)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for n in range(60):
+                Turma.objects.create(nome=f'2º {n:02d}', ano=2025)
+        with CaptureQueriesContext(connection) as ctx:
+            resposta = self.client.get('/turmas/?ano=2025&tamanho=25')
+        self.assertEqual(len(ctx.captured_queries), consultas)
+
+        nomes = []
+        while True:
+            nomes += [t.nome for t in resposta.context['turmas']]
+            if not resposta.context['proxima']:
+                break
+            resposta = self.client.get(f"/turmas/?{resposta.context['filtros']}&cursor={resposta.context['proxima']}")
+        self.assertEqual(len(nomes), 62)
+        self.assertEqual(nomes[:2], ['1º A', '1º B'])
+
+    def test_disciplinas_da_turma_sem_consulta_por_professor(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(f'/turmas/{self.turma.id}/disciplinas/')
+        consultas = len(ctx.captured_queries)
+
+        for n in range(2, 7):
+            Disciplina.objects.create(nome=f'Optativa {n}', professor=criar_professor(n), turma=self.turma)
+        with CaptureQueriesContext(connection) as ctx:
+            resposta = self.client.get(f'/turmas/{self.turma.id}/disciplinas/')
+        self.assertEqual(len(ctx.captured_queries), consultas)
+        self.assertContains(resposta, 'Professor 6')
+
+
+# ======================== CARGA DOS PROFESSORES ========================
+class CargaProfessoresTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.leve, self.pesado = criar_professor(1), criar_professor(2)
+        turma_a = Turma.objects.create(nome='1º A', ano=2025)
+        turma_b = Turma.objects.create(nome='1º B', ano=2025, turno='tarde')
+        passada = Turma.objects.create(nome='1º A', ano=2024)
+        for n in range(1, 6):
+            criar_aluno(n, turma_a if n <= 3 else turma_b)
+        criar_aluno(6, passada)
+
+        # Duas disciplinas na mesma turma: os alunos dela contam uma vez
+        mat = Disciplina.objects.create(nome='Matemática', professor=self.pesado, turma=turma_a, aulas_semanais=3)
+        fis = Disciplina.objects.create(nome='Física', professor=self.pesado, turma=turma_a)
+        Disciplina.objects.create(nome='Química', professor=self.pesado, turma=turma_b)
+        Disciplina.objects.create(nome='Artes', professor=self.leve, turma=turma_b, aulas_semanais=1)
+        Disciplina.objects.create(nome='Artes', professor=self.leve, turma=passada)
+        salvar_grade(turma_a, {('seg', 0): mat, ('seg', 1): mat, ('ter', 0): fis})
+
+        self.client.force_login(User.objects.create(username='su', is_superuser=True))
+
+    def test_carga_no_ano_e_ordenacao(self):
+        resposta = self.client.get('/professores/?ano=2025&ordem=aulas')
+        pesado, leve = resposta.context['professores']
+
+        self.assertEqual(pesado, self.pesado)
+        self.assertEqual(
+            (pesado.total_disciplinas, pesado.total_turmas, pesado.aulas_na_grade,
+             pesado.aulas_previstas, pesado.alunos_atendidos),
+            (3, 2, 3, 7, 5),
+        )
+        self.assertEqual(
+            (leve.total_disciplinas, leve.total_turmas, leve.aulas_na_grade, leve.aulas_previstas, leve.alunos_atendidos),
+            (1, 1, 0, 1, 2),
+        )
+
+        nomes = lambda url: [p.nome_completo for p in self.client.get(url).context['professores']]
+        self.assertEqual(nomes('/professores/?ano=2025&ordem=lixo'), ['Professor 1', 'Professor 2'])
+        self.assertEqual(nomes('/professores/?ano=2024&ordem=disciplinas'), ['Professor 1', 'Professor 2'])
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/professores/?ano=2025&ordem=alunos')
+        consultas = len(ctx.captured_queries)
+        for n in range(3, 13):
+            Disciplina.objects.create(nome='Extra', professor=criar_professor(n), turma=Turma.objects.get(nome='1º B'))
+        self.client.get('/professores/?ano=2025')   # refaz o cache dos anos letivos
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(len(self.client.get('/professores/?ano=2025&ordem=alunos').context['professores']), 12)
+        self.assertEqual(len(ctx.captured_queries), consultas)
+
+
+# ======================== BUSCA DE PESSOAS ========================
+class BuscaPessoasTests(TestCase):
+
+    def setUp(self):
+        self.turma = Turma.objects.create(nome='1º A', ano=2025)
+        self.joao = criar_aluno(1, self.turma)
+        self.joao.nome_completo = 'João da Conceição'
+        self.joao.save()
+        self.professor = criar_professor(1)
+        self.professor.nome_completo = 'Mônica Araújo'
+        self.professor.save()
+
+    def nomes(self, termo, **kwargs):
+        return [i.nome for i in buscar(termo, **kwargs)]
+
+    def test_sem_acento_por_prefixo_cpf_e_email(self):
+        self.assertEqual(consulta_fts('João  Sil'), '"joao"* "sil"*')
+        self.assertEqual(self.nomes('joao conc'), ['João da Conceição'])
+        self.assertEqual(self.nomes('CONCEICAO'), ['João da Conceição'])
+        self.assertEqual(self.nomes('mon ara'), ['Mônica Araújo'])
+        self.assertEqual(self.nomes('200.000.0'), ['João da Conceição'])
+        self.assertEqual(self.nomes('prof1@escola'), ['Mônica Araújo'])
+        self.assertEqual(self.nomes('a', tipos=['professor']), ['Mônica Araújo'])
+        self.assertEqual(self.nomes('joana'), [])
+        self.assertEqual(self.nomes('  '), [])
+
+    def test_acompanha_edicao_e_exclusao(self):
+        self.joao.user.email = 'jc@casa.com'
+        self.joao.user.save()
+        self.assertEqual(self.nomes('jc casa'), ['João da Conceição'])
+        self.assertEqual(self.nomes('aluno1'), [])
+
+        self.professor.user.delete()
+        self.assertEqual(self.nomes('monica'), [])
+        self.assertEqual(
+            sorted(IndiceBusca.objects.values_list('tipo', flat=True)), ['aluno', 'turma'],
+        )
+
+    def test_listas_usam_o_indice(self):
+        self.client.force_login(User.objects.create(username='su', is_superuser=True))
+        self.assertContains(self.client.get('/professores/?q=Monica'), 'Mônica Araújo')
+        resposta = self.client.get('/alunos/?q=joao+da')
+        self.assertEqual([a.nome_completo for a in resposta.context['alunos']], ['João da Conceição'])
+
+
+# ======================== BUSCA GLOBAL ========================
+class BuscaGlobalTests(TestCase):
+
+    def setUp(self):
+        self.turma = Turma.objects.create(nome='2º Ano Verde', ano=2025)
+        self.outra = Turma.objects.create(nome='3º Ano Azul', ano=2025)
+        self.professor = criar_professor(1)
+        self.aluno = criar_aluno(1, self.turma)
+        self.aluno.nome_completo = 'Vera Lúcia'
+        self.aluno.save()
+        criar_aluno(2, self.outra)
+        self.minha = Disciplina.objects.create(nome='Física', professor=self.professor, turma=self.turma)
+        Disciplina.objects.create(nome='Física', professor=criar_professor(2), turma=self.outra)
+        self.gestor = Gestor.objects.create(
+            user=User.objects.create(username='g@escola.com', email='g@escola.com'),
+            nome_completo='Vera Gestora', cpf=gerar_cpf(300_000_000), data_nascimento=date(1980, 1, 1),
+            telefone='0', cargo='diretor', cep='0', uf='SP', cidade='X', endereco='Y',
+        )
+
+    def buscar_como(self, user, termo):
+        self.client.force_login(user)
+        return self.client.get('/busca/', {'q': termo}).json()['resultados']
+
+    def test_permissoes_por_papel(self):
+        su = User.objects.create(username='su', is_superuser=True)
+        self.assertEqual(
+            {r['nome'] for r in self.buscar_como(su, 'ver')}, {'Vera Lúcia', 'Vera Gestora', '2º Ano Verde', 'Física'},
+        )
+        self.assertEqual(
+            {r['nome'] for r in self.buscar_como(self.gestor.user, 'ver')}, {'Vera Lúcia', '2º Ano Verde', 'Física'},
+        )
+
+        # Professor: só a turma onde leciona, os alunos dela e as próprias disciplinas
+        resultados = self.buscar_como(self.professor.user, 'aluno')
+        self.assertEqual([r['nome'] for r in resultados], ['Vera Lúcia'])
+        self.assertEqual(resultados[0]['url'], f'/turma/{self.turma.id}/disciplinas/')
+        self.assertEqual([r['id'] for r in self.buscar_como(self.professor.user, 'fisica')], [self.minha.id])
+        self.assertEqual(
+            {(r['tipo'], r['id']) for r in self.buscar_como(self.professor.user, 'ano')},
+            {('turma', self.turma.id), ('disciplina', self.minha.id)},
+        )
+
+        # Aluno: só as disciplinas da turma
+        self.assertEqual(
+            [(r['tipo'], r['id']) for r in self.buscar_como(self.aluno.user, 'fis')], [('disciplina', self.minha.id)],
+        )
+        self.assertEqual(self.buscar_como(self.aluno.user, 'vera'), [])
+
+    def test_formato_e_acompanha_edicoes(self):
+        su = User.objects.create(username='su', is_superuser=True)
+        self.client.force_login(su)
+        dados = self.client.get('/busca/', {'q': 'fisica verde'}).json()
+        self.assertEqual(dados, {'q': 'fisica verde', 'resultados': [{
+            'tipo': 'disciplina', 'id': self.minha.id, 'nome': 'Física',
+            'detalhe': '2º Ano Verde (2025) — Professor 1', 'url': f'/disciplina/{self.minha.id}/',
+        }]})
+
+        # Renomear turma e professor refaz as linhas que mostram esses nomes
+        self.turma.nome = '2º Ano Roxo'
+        self.turma.save()
+        self.professor.nome_completo = 'Paulo Sá'
+        self.professor.save()
+        self.assertEqual(self.buscar_como(su, 'verde'), [])
+        self.assertEqual(
+            {r['detalhe'] for r in self.buscar_como(su, 'roxo')},
+            {'Turma — 2025, Manhã', '2º Ano Roxo (2025) — Paulo Sá'},
+        )
+        self.assertEqual(self.buscar_como(su, 'vera lucia')[0]['detalhe'], 'Aluno(a) — 2º Ano Roxo (2025)')
+
+        self.turma.delete()
+        self.assertEqual(self.buscar_como(su, 'roxo'), [])
+        self.assertFalse(IndiceBusca.objects.filter(tipo='disciplina', objeto_id=self.minha.id).exists())
+
+
+# ======================== CPF ========================
+class CpfTests(TestCase):
+
+    def setUp(self):
+        self.turma = Turma.objects.create(nome='1º A', ano=2025)
+        self.aluno = criar_aluno(1, self.turma)
+        self.professor = criar_professor(1)
+
+    def test_digitos_verificadores(self):
+        self.assertTrue(cpf_valido('529.982.247-25'))
+        self.assertTrue(cpf_valido('52998224725'))
+        self.assertFalse(cpf_valido('529.982.247-24'))
+        self.assertFalse(cpf_valido('111.111.111-11'))
+        self.assertFalse(cpf_valido('5299822472'))
+        self.assertEqual(gerar_cpf(529982247), '529.982.247-25')
+
+    def test_unico_entre_papeis(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(dono_do_cpf(self.professor.cpf.replace('.', '')), ('professor', self.professor.id))
+
+        self.assertEqual(validar_cpf_cadastro('52998224725', 'aluno', self.aluno.id), '529.982.247-25')
+        self.assertEqual(validar_cpf_cadastro(self.aluno.cpf, 'aluno', self.aluno.id), self.aluno.cpf)
+        with self.assertRaisesMessage(ValidationError, 'cadastrado como professor'):
+            validar_cpf_cadastro(self.professor.cpf, 'aluno', self.aluno.id)
+        with self.assertRaisesMessage(ValidationError, 'CPF inválido'):
+            validar_cpf_cadastro('529.982.247-24', 'aluno')
+
+        # Fora dos formulários (admin, shell) o erro vem no campo cpf, antes de gravar
+        cpf_do_aluno = self.aluno.cpf
+        self.aluno.cpf = self.professor.cpf
+        with self.assertRaisesMessage(ValidationError, 'cadastrado como professor'):
+            self.aluno.full_clean()
+        with self.assertRaises(ValidationError) as erro:
+            self.aluno.save()
+        self.assertIn('cpf', erro.exception.message_dict)
+        self.assertEqual(Aluno.objects.get(pk=self.aluno.pk).cpf, cpf_do_aluno)
+
+        # Excluir libera o CPF
+        cpf = self.professor.cpf
+        self.professor.user.delete()
+        self.assertIsNone(dono_do_cpf(cpf))
+
+    def test_migracao_lista_cpfs_repetidos(self):
+        migracao = importlib.import_module('core.migrations.0014_cadastro_cpf')
+        # update() não passa pelos signals, como os dados anteriores ao registro
+        Aluno.objects.filter(pk=self.aluno.pk).update(cpf=self.professor.cpf)
+        CadastroCPF.objects.all().delete()
+
+        with self.assertRaises(RuntimeError) as erro:
+            migracao.preencher_cpfs(apps, None)
+        self.assertIn(f'aluno #{self.aluno.pk}', str(erro.exception))
+        self.assertIn(f'professor #{self.professor.pk}', str(erro.exception))
+        self.assertFalse(CadastroCPF.objects.exists())
+
+        # Enquanto não é corrigido, salvar o cadastro sem mexer no CPF não falha
+        aluno = Aluno.objects.get(pk=self.aluno.pk)
+        aluno.telefone = '(11) 99999-0000'
+        aluno.save()
+
+    def test_importacao_explica_cpf_fora_do_escopo(self):
+        Disciplina.objects.create(nome='Matemática', professor=self.professor, turma=self.turma)
+        outra = criar_aluno(2, Turma.objects.create(nome='1º B', ano=2025))
+        csv = '\n'.join([
+            'CPF;Nota1',
+            f'{self.aluno.cpf};7',
+            '529.982.247-24;7',
+            f'{self.professor.cpf};7',
+            f'{outra.cpf};7',
+            '529.982.247-25;7',
+        ]).encode()
+        self.client.force_login(User.objects.create(username='admin', is_superuser=True))
+        resposta = self.client.post('/notas/importar/', {
+            'arquivo': SimpleUploadedFile('notas.csv', csv, content_type='text/csv'), 'turma': self.turma.id,
+        })
+        self.assertEqual([e['mensagem'] for e in resposta.context['resultado']['erros']], [
+            'CPF inválido: 529.982.247-24.',
+            'O CPF é de um(a) professor, não de um aluno.',
+            'O CPF é de um aluno de outra turma, fora do escopo da importação.',
+            'Aluno não encontrado no escopo da importação.',
+        ])
+
+
+# ======================== CONTADORES DAS DISCIPLINAS ========================
+class ContadoresDisciplinaTests(TestCase):
+
+    def test_contadores_acompanham_notas_e_matriculas(self):
+        professor = criar_professor(1)
+        turma = Turma.objects.create(nome='1º A', ano=2025)
+        outra = Turma.objects.create(nome='1º B', ano=2025)
+        aluno = criar_aluno(1, turma)
+        criar_aluno(2, turma)
+
+        disciplina = Disciplina.objects.create(nome='Matemática', professor=professor, turma=turma)
+        disciplina.refresh_from_db()
+        self.assertEqual(disciplina.alunos_matriculados, 2)
+
+        nota = Nota.objects.create(aluno=aluno, disciplina=disciplina, nota1=5, nota2=6)
+        nota.nota2 = None
+        nota.nota4 = 9
+        nota.save()
+        disciplina.refresh_from_db()
+        self.assertEqual(
+            (disciplina.lancadas_b1, disciplina.lancadas_b2, disciplina.lancadas_b3, disciplina.lancadas_b4),
+            (1, 0, 0, 1),
+        )
+        self.assertEqual(disciplina.percentual_lancado, 25)
+
+        aluno.turma = outra
+        aluno.save()
+        disciplina.refresh_from_db()
+        self.assertEqual(disciplina.alunos_matriculados, 1)
+
+        nota.delete()
+        disciplina.refresh_from_db()
+        self.assertEqual(disciplina.notas_lancadas, 0)
+
+        call_command('conferir_contadores', stdout=StringIO())
+
+    def test_conferencia_corrige(self):
+        professor = criar_professor(1)
+        turma = Turma.objects.create(nome='1º A', ano=2025)
+        disciplina = Disciplina.objects.create(nome='Matemática', professor=professor, turma=turma)
+        Disciplina.objects.filter(pk=disciplina.pk).update(lancadas_b3=7)
+
+        with self.assertRaises(CommandError):
+            call_command('conferir_contadores', stdout=StringIO())
+
+        call_command('conferir_contadores', corrigir=True, stdout=StringIO())
+        call_command('conferir_contadores', stdout=StringIO())
+
+
+# ======================== PERFIL DO USUÁRIO ========================
+class PerfilTests(TestCase):
+
+    def test_resolve_papel_com_uma_consulta(self):
+        professor = criar_professor(1)
+        user = User.objects.get(pk=professor.user_id)
+
+        with self.assertNumQueries(1):
+            perfil = carregar_perfil(user)
+            self.assertEqual(perfil.papel, 'professor')
+            self.assertEqual(perfil.painel, 'painel_professor')
+            self.assertEqual(perfil.nome_exibicao, 'Professor 1')
+            self.assertIsNone(perfil.foto_url)
+            # o cache do próprio user também foi preenchido
+            self.assertTrue(hasattr(user, 'professor'))
+            self.assertFalse(hasattr(user, 'aluno'))
+            self.assertFalse(hasattr(user, 'gestor'))
+
+    def test_middleware_e_permissoes(self):
+        turma = Turma.objects.create(nome='1º A', ano=2025)
+        aluno = criar_aluno(1, turma)
+        self.client.force_login(aluno.user)
+
+        resposta = self.client.get('/')
+        self.assertRedirects(resposta, '/painel/aluno/')
+
+        # aluno não passa no teste de gestão → vai para o login
+        resposta = self.client.get('/turmas/')
+        self.assertEqual(resposta.status_code, 302)
+        self.assertIn('?next=/turmas/', resposta['Location'])
+
+
+# ======================== ANOS LETIVOS ========================
+class AnosLetivosTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cache_e_invalidacao(self):
+        professor = criar_professor(1)
+        turma = Turma.objects.create(nome='1º A', ano=2024)
+        Turma.objects.create(nome='1º B', ano=2025)
+
+        self.assertEqual(anos_com_turmas(), [2025, 2024])
+        with self.assertNumQueries(0):
+            anos_com_turmas()
+
+        self.assertEqual(anos_com_turmas(professor), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            Disciplina.objects.create(nome='Matemática', professor=professor, turma=turma)
+        self.assertEqual(anos_com_turmas(professor), [2024])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            turma.ano = 2026
+            turma.save()
+        self.assertEqual(anos_com_turmas(), [2026, 2025])
+        self.assertEqual(anos_com_turmas(professor), [2026])
+
+    def test_ano_do_professor_fica_na_sessao(self):
+        professor = criar_professor(1)
+        turma = Turma.objects.create(nome='1º A', ano=2024)
+        Disciplina.objects.create(nome='Matemática', professor=professor, turma=turma)
+        self.client.force_login(professor.user)
+
+        resposta = self.client.get('/painel/professor/', {'ano': 2024})
+        self.assertEqual(resposta.context['anos_disponiveis'], [2024])
+
+        resposta = self.client.get('/disciplinas/professor/')
+        self.assertEqual(resposta.context['ano_filtro'], 2024)
+        self.assertEqual(len(resposta.context['turmas_detalhadas']), 1)
+
+
+# ======================== LANÇAMENTO DE NOTAS ========================
+class LancarNotaTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.professor = criar_professor(1)
+        self.turma = Turma.objects.create(nome='1º A', ano=2025)
+        self.alunos = [criar_aluno(n, self.turma) for n in range(1, 21)]
+        self.disciplina = Disciplina.objects.create(nome='Matemática', professor=self.professor, turma=self.turma)
+        self.client.force_login(self.professor.user)
+        self.url = f'/lancar-nota/{self.disciplina.id}/'
+
+    def postar(self, dados):
+        return self.client.post(self.url, dados)
+
+    def test_grava_so_o_que_mudou_com_consultas_constantes(self):
+        dados = {f'nota1_{a.id}': '7,5' for a in self.alunos}
+        self.assertEqual(self.postar(dados).status_code, 302)
+        self.assertEqual(Nota.objects.filter(disciplina=self.disciplina, nota1=7.5).count(), 20)
+
+        # Reenviar o mesmo formulário não escreve nada
+        with CaptureQueriesContext(connection) as ctx:
+            self.postar(dados)
+        escritas = [q for q in ctx.captured_queries if q['sql'].startswith(('INSERT', 'UPDATE'))]
+        self.assertEqual([q for q in escritas if 'core_nota' in q['sql']], [])
+
+        dados[f'nota2_{self.alunos[0].id}'] = '9'
+        with CaptureQueriesContext(connection) as ctx:
+            self.postar(dados)
+        self.assertLess(len(ctx.captured_queries), 20)
+
+        self.disciplina.refresh_from_db()
+        self.assertEqual((self.disciplina.lancadas_b1, self.disciplina.lancadas_b2), (20, 1))
+        self.assertEqual(ResumoAnoLetivo.objects.get(ano=2025).total_notas_lancadas, 21)
+        call_command('conferir_contadores', stdout=StringIO())
+
+    def test_relatorio_de_erros_por_celula(self):
+        primeiro, segundo = self.alunos[:2]
+        resposta = self.postar({
+            f'nota1_{primeiro.id}': 'abc',
+            f'nota2_{primeiro.id}': '11',
+            f'nota1_{segundo.id}': '8',
+        })
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(set(resposta.context['erros'][primeiro.id]), {1, 2})
+        self.assertContains(resposta, 'class="celula-erro"', count=2)
+        self.assertEqual(Nota.objects.get(aluno=segundo, disciplina=self.disciplina).nota1, 8)
+        self.assertFalse(Nota.objects.filter(aluno=primeiro).exists())
+
+    def test_salvar_nao_sobrescreve_nota_alterada_por_outra_pessoa(self):
+        aluno, outro = self.alunos[:2]
+        Nota.objects.create(aluno=aluno, disciplina=self.disciplina, nota1=5)
+
+        # A tela abriu mostrando 5; outra pessoa muda para 6 antes do Salvar
+        dados = {f'nota1_{aluno.id}': '8', f'anterior1_{aluno.id}': '5', f'nota1_{outro.id}': '7', f'anterior1_{outro.id}': ''}
+        Nota.objects.filter(aluno=aluno).update(nota1=6)
+        resposta = self.postar(dados)
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn('valor atual: 6', resposta.context['erros'][aluno.id][1]['mensagem'])
+        self.assertEqual(Nota.objects.get(aluno=aluno).nota1, 6)
+        self.assertEqual(Nota.objects.get(aluno=outro).nota1, 7)
+        self.assertContains(resposta, '2 de 80 notas lançadas')
+
+        # Enviar de novo, já vendo o 6, sobrescreve de propósito
+        dados[f'anterior1_{aluno.id}'] = '6'
+        self.assertEqual(self.postar(dados).status_code, 302)
+        self.assertEqual(Nota.objects.get(aluno=aluno).nota1, 8)
+
+    def test_salvar_nao_devolve_celula_que_nao_foi_editada(self):
+        aluno, outro = self.alunos[:2]
+        Nota.objects.create(aluno=aluno, disciplina=self.disciplina, nota1=5)
+
+        # Duas telas abertas mostrando 5; a segunda muda para 9 e salva
+        primeira = {f'nota1_{aluno.id}': '5', f'anterior1_{aluno.id}': '5'}
+        segunda = dict(primeira, **{f'nota1_{aluno.id}': '9'})
+        self.assertEqual(self.postar(segunda).status_code, 302)
+
+        # A primeira só editou outro aluno e salva o formulário inteiro, duas vezes
+        primeira.update({f'nota1_{outro.id}': '7', f'anterior1_{outro.id}': ''})
+        self.assertEqual(self.postar(primeira).status_code, 302)
+        self.assertEqual(self.postar(primeira).status_code, 302)
+        self.assertEqual(Nota.objects.get(aluno=aluno).nota1, 9)
+        self.assertEqual(Nota.objects.get(aluno=outro).nota1, 7)
+
+
+class EscritaImediataTests(TestCase):
+
+    def test_post_roda_numa_transacao_e_get_nao(self):
+        blocos = []
+
+        @escrita_imediata
+        def view(request):
+            blocos.append(len(connection.atomic_blocks))
+
+        fora = len(connection.atomic_blocks)
+        view(RequestFactory().get('/'))
+        view(RequestFactory().post('/'))
+        self.assertEqual(blocos, [fora, fora + 1])
+
+    def test_estresse_exige_banco_em_arquivo(self):
+        # O banco de teste é em memória: as threads não enxergariam os dados
+        with self.assertRaises(CommandError):
+            call_command('estresse_escrita', stdout=StringIO())
+
+
+class AutosaveNotasTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.professor = criar_professor(1)
+        self.turma = Turma.objects.create(nome='1º A', ano=2025)
+        self.alunos = [criar_aluno(n, self.turma) for n in range(1, 4)]
+        self.disciplina = Disciplina.objects.create(nome='Matemática', professor=self.professor, turma=self.turma)
+        self.client.force_login(self.professor.user)
+        self.url = f'/lancar-nota/{self.disciplina.id}/autosave/'
+
+    def enviar(self, *celulas):
+        return self.client.post(self.url, {'celulas': list(celulas)}, content_type='application/json')
+
+    def test_salva_celula_e_devolve_progresso(self):
+        aluno = self.alunos[0]
+        resposta = self.enviar({'aluno_id': aluno.id, 'bimestre': 1, 'valor': '7,5', 'anterior': None}).json()
+
+        self.assertEqual(len(resposta['salvas']), 1)
+        self.assertEqual(resposta['progresso']['lancadas_b1'], 1)
+        self.assertEqual(resposta['progresso']['notas_possiveis'], 12)
+        self.assertEqual(resposta['medias'], {str(aluno.id): 7.5})
+        self.assertEqual(Nota.objects.get(aluno=aluno, disciplina=self.disciplina).nota1, 7.5)
+
+        # Limpar a célula desconta dos contadores
+        resposta = self.enviar({'aluno_id': aluno.id, 'bimestre': 1, 'valor': None, 'anterior': 7.5}).json()
+        self.assertEqual(resposta['progresso']['lancadas_b1'], 0)
+        self.assertEqual(ResumoAnoLetivo.objects.get(ano=2025).total_notas_lancadas, 0)
+        call_command('conferir_contadores', stdout=StringIO())
+
+    def test_conflito_e_celulas_invalidas(self):
+        aluno = self.alunos[0]
+        Nota.objects.create(aluno=aluno, disciplina=self.disciplina, nota1=5)
+
+        outra_turma = Turma.objects.create(nome='2º A', ano=2025)
+        de_fora = criar_aluno(99, outra_turma)
+
+        resposta = self.enviar(
+            {'aluno_id': aluno.id, 'bimestre': 1, 'valor': '8', 'anterior': None},
+            {'aluno_id': aluno.id, 'bimestre': 5, 'valor': '8', 'anterior': None},
+            {'aluno_id': de_fora.id, 'bimestre': 1, 'valor': '8', 'anterior': None},
+            {'aluno_id': aluno.id, 'bimestre': 2, 'valor': '12', 'anterior': None},
+        ).json()
+
+        self.assertEqual(resposta['salvas'], [])
+        self.assertEqual(resposta['conflitos'][0]['atual'], 5)
+        self.assertEqual(len(resposta['erros']), 3)
+        self.assertEqual(Nota.objects.get(aluno=aluno, disciplina=self.disciplina).nota1, 5)
+        self.assertFalse(Nota.objects.filter(aluno=de_fora).exists())
+
+    def test_conflito_sem_linha_nao_deixa_nota_vazia(self):
+        aluno, outro = self.alunos[:2]
+        # A tela via 6, mas a linha foi apagada por outra pessoa
+        resposta = self.enviar(
+            {'aluno_id': aluno.id, 'bimestre': 1, 'valor': '8', 'anterior': 6},
+            {'aluno_id': outro.id, 'bimestre': 2, 'valor': None, 'anterior': None},
+        ).json()
+
+        self.assertEqual(resposta['conflitos'][0]['atual'], None)
+        self.assertEqual(len(resposta['salvas']), 1)
+        self.assertFalse(Nota.objects.exists())
+
+    def test_professor_de_outra_disciplina_nao_lanca(self):
+        self.client.force_login(criar_professor(2).user)
+        resposta = self.enviar({'aluno_id': self.alunos[0].id, 'bimestre': 1, 'valor': '8', 'anterior': None})
+
+        self.assertEqual(resposta.status_code, 403)
+        self.assertFalse(Nota.objects.exists())
+        self.assertEqual(self.client.get(f'/lancar-nota/{self.disciplina.id}/').status_code, 302)
+
+
+# ======================== DISTRIBUIÇÃO DE NOTAS ========================
+class DistribuicaoNotasTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.turma = Turma.objects.create(nome='1º A', ano=2025)
+        self.alunos = [criar_aluno(n, self.turma) for n in range(1, 5)]
+        professor = criar_professor(1)
+        self.mat = Disciplina.objects.create(nome='Matemática', professor=professor, turma=self.turma)
+        self.port = Disciplina.objects.create(nome='Português', professor=professor, turma=self.turma)
+
+        # Bimestres vazios ficam fora da média (como em Nota.media)
+        for aluno, notas in zip(self.alunos, [(2, None, 4, None), (5, 5, 5, 5), (8, 9, None, 10), (None,) * 4]):
+            Nota.objects.create(aluno=aluno, disciplina=self.mat, **dict(zip(BIMESTRES, notas)))
+        Nota.objects.create(aluno=self.alunos[0], disciplina=self.port, nota1=7)
+
+    def test_estatisticas_batem_com_nota_media(self):
+        with self.assertNumQueries(3):
+            resultado = distribuicao_notas(2025)
+
+        medias = [n.media for n in Nota.objects.filter(disciplina=self.mat) if n.media is not None]
+        mat = next(d for d in resultado['disciplinas'] if d['id'] == self.mat.id)
+
+        self.assertEqual(mat['alunos'], 3)
+        self.assertAlmostEqual(mat['media'], round(statistics.fmean(medias), 2))
+        self.assertAlmostEqual(mat['mediana'], statistics.median(medias))
+        self.assertAlmostEqual(mat['desvio_padrao'], round(statistics.pstdev(medias), 2))
+        self.assertEqual((mat['abaixo_4'], mat['abaixo_6']), (1, 2))
+        self.assertEqual(mat['histograma'][3] + mat['histograma'][5] + mat['histograma'][9], 3)
+
+        # Turma: média geral por aluno → aluno 1 fica com (3 + 7) / 2
+        turma = resultado['turmas'][0]
+        self.assertEqual(turma['alunos'], 3)
+        self.assertEqual(turma['abaixo_4'], 0)
+        self.assertAlmostEqual(turma['mediana'], 5)
+
+    def test_aluno_que_trocou_de_turma_conta_em_cada_uma(self):
+        nova = Turma.objects.create(nome='1º B', ano=2025)
+        fisica = Disciplina.objects.create(nome='Física', professor=criar_professor(2), turma=nova)
+        aluno = self.alunos[0]
+        Aluno.objects.filter(pk=aluno.pk).update(turma=nova)
+        Nota.objects.create(aluno=aluno, disciplina=fisica, nota1=1)
+
+        resultado = distribuicao_notas(2025)
+        turmas = {t['nome']: t for t in resultado['turmas']}
+
+        # 1º A continua com as notas que o aluno teve lá; 1º B só com a de Física
+        self.assertEqual(turmas['1º A']['alunos'], 3)
+        self.assertEqual(turmas['1º A']['abaixo_4'], 0)
+        self.assertEqual((turmas['1º B']['alunos'], turmas['1º B']['media']), (1, 1))
+        self.assertEqual(resultado['geral']['alunos'], 3)
+
+    def test_endpoint_json_so_para_gestao(self):
+        self.client.force_login(self.alunos[0].user)
+        self.assertEqual(self.client.get('/analise/notas.json?ano=2025').status_code, 302)
+
+        self.client.force_login(User.objects.create(username='admin', is_superuser=True))
+        dados = self.client.get('/analise/notas.json?ano=2025').json()
+        self.assertEqual([d['nome'] for d in dados['disciplinas']], ['Matemática', 'Português'])
+        self.assertEqual(self.client.get('/analise/notas/?ano=2025').status_code, 200)
+
+
+# ======================== MÉDIA NO BANCO ========================
+class MediaNoBancoTests(TestCase):
+
+    def test_anotacao_igual_a_propriedade(self):
+        turma = Turma.objects.create(nome='1º A', ano=2025)
+        disciplina = Disciplina.objects.create(nome='Matemática', professor=criar_professor(1), turma=turma)
+        combinacoes = [
+            (None, None, None, None), (0, None, None, None), (3.9, 4, None, 4.1), (5.9, 6, 6.1, None),
+            (7.3, 8.1, 6.7, 9.9), (None, 10, None, 0), (6, 6, 6, 5.9), (3.3, 3.3, 3.4, None),
+        ]
+        for n, notas in enumerate(combinacoes, start=1):
+            Nota.objects.create(aluno=criar_aluno(n, turma), disciplina=disciplina, **dict(zip(BIMESTRES, notas)))
+
+        for nota in Nota.objects.com_media():
+            self.assertEqual(nota.media_anual, nota.media)
+            if nota.media is None:
+                self.assertIsNone(nota.situacao)
+            elif nota.media < 4:
+                self.assertEqual(nota.situacao, 'reprovado')
+            elif nota.media < 6:
+                self.assertEqual(nota.situacao, 'recuperacao')
+            else:
+                self.assertEqual(nota.situacao, 'aprovado')
+
+        # Dá para filtrar e ordenar pela média no SQL
+        abaixo_de_6 = Nota.objects.com_media().filter(media_anual__lt=6).order_by('media_anual')
+        self.assertEqual(
+            list(abaixo_de_6.values_list('media_anual', flat=True)),
+            sorted(n.media for n in Nota.objects.all() if n.media is not None and n.media < 6),
+        )
+
+
+# ======================== IMPORTAÇÃO DE NOTAS ========================
+class ImportacaoNotasTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.turma = Turma.objects.create(nome='1º A', ano=2025)
+        self.alunos = [criar_aluno(n, self.turma) for n in range(1, 4)]
+        professor = criar_professor(1)
+        self.mat = Disciplina.objects.create(nome='Matemática', professor=professor, turma=self.turma)
+        self.port = Disciplina.objects.create(nome='Português', professor=professor, turma=self.turma)
+        Nota.objects.create(aluno=self.alunos[0], disciplina=self.mat, nota1=5)
+
+        self.client.force_login(User.objects.create(username='admin', is_superuser=True))
+
+    def planilha(self, simular):
+        a1, a2, a3 = self.alunos
+        csv = '\n'.join([
+            'CPF;Aluno;Disciplina;1º Bimestre;Nota2',
+            f'{a1.cpf};;Matemática;7,5;',
+            f';{a2.nome_completo.upper()};portugues;8;9',          # nome/disciplina sem acento nem caixa
+            f'{a3.cpf.replace(".", "").replace("-", "")};;Matemática;11;6',
+            ';Fulano;Matemática;5;5',
+        ]).encode()
+        arquivo = SimpleUploadedFile('notas.csv', csv, content_type='text/csv')
+        return self.client.post('/notas/importar/', {'arquivo': arquivo, 'turma': self.turma.id, 'simular': simular})
+
+    def test_simulacao_nao_grava(self):
+        resultado = self.planilha(simular='on').context['resultado']
+
+        self.assertEqual(resultado['linhas'], 4)
+        self.assertEqual(resultado['alteradas'], 4)
+        self.assertEqual(resultado['total_erros'], 2)
+        self.assertIn({'disciplina_id': self.mat.id, 'aluno_id': self.alunos[0].id, 'bimestre': 1,
+                       'antes': 5, 'depois': 7.5, 'aluno': 'Aluno 0001', 'disciplina': 'Matemática (1º A)'},
+                      resultado['previa'])
+        self.assertEqual(Nota.objects.get(aluno=self.alunos[0], disciplina=self.mat).nota1, 5)
+        self.assertEqual(Nota.objects.count(), 1)
+
+    def test_importa_celulas_validas_e_acerta_contadores(self):
+        resultado = self.planilha(simular='').context['resultado']
+
+        self.assertEqual(resultado['alteradas'], 4)
+        self.assertEqual([e['linha'] for e in resultado['erros']], [4, 5])
+        self.assertEqual(Nota.objects.get(aluno=self.alunos[0], disciplina=self.mat).nota1, 7.5)
+        self.assertEqual(Nota.objects.get(aluno=self.alunos[1], disciplina=self.port).nota2, 9)
+        # Na linha com erro, o bimestre válido é gravado (como no lancar_nota)
+        self.assertEqual(Nota.objects.get(aluno=self.alunos[2], disciplina=self.mat).nota2, 6)
+
+        self.assertEqual(ResumoAnoLetivo.objects.get(ano=2025).total_notas_lancadas, 4)
+        call_command('conferir_contadores', stdout=StringIO())
+        call_command('recalcular_resumos', '--verificar', stdout=StringIO())
+
+    def test_simulacao_em_varios_lotes_igual_a_importacao(self):
+        a1 = self.alunos[0]
+        linhas = [
+            ('CPF', 'Disciplina', 'Nota1', 'Nota2'),
+            (a1.cpf, 'Matemática', '7', '6'),
+            (a1.cpf, 'Matemática', '7', '8'),    # 2º lote: nota1 já seria 7
+            (a1.cpf, 'Matemática', '5', ''),     # 3º lote: volta ao valor do banco
+        ]
+        disciplinas = Disciplina.objects.filter(turma=self.turma)
+        with mock.patch('core.importacao.TAMANHO_LOTE', 1):
+            previa = importar_planilha(linhas, disciplinas, simular=True)
+            self.assertEqual(Nota.objects.get(aluno=a1, disciplina=self.mat).nota1, 5)
+            importada = importar_planilha(linhas, disciplinas)
+
+        self.assertEqual(previa['alteradas'], 4)
+        self.assertEqual(previa['previa'], importada['previa'])
+        self.assertEqual([(m['antes'], m['depois']) for m in previa['previa']], [(5, 7), (None, 6), (6, 8), (7, 5)])
+
+
+# ======================== EXPORTAÇÃO DE NOTAS ========================
+class ExportacaoNotasTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.turma = Turma.objects.create(nome='1º A', ano=2025)
+        self.alunos = [criar_aluno(n, self.turma) for n in range(1, 3)]
+        professor = criar_professor(1)
+        self.mat = Disciplina.objects.create(nome='Matemática', professor=professor, turma=self.turma)
+        Disciplina.objects.create(nome='Português', professor=professor, turma=self.turma)
+        Nota.objects.create(aluno=self.alunos[0], disciplina=self.mat, nota1=7.5, nota3=4)
+
+        outra = Turma.objects.create(nome='1º B', ano=2024)
+        Disciplina.objects.create(nome='Matemática', professor=professor, turma=outra)
+        criar_aluno(3, outra)
+
+        self.client.force_login(User.objects.create(username='admin', is_superuser=True))
+
+    def test_csv_tem_todas_as_celulas_do_ano(self):
+        resposta = self.client.get('/notas/exportar/?ano=2025')
+        linhas = b''.join(resposta.streaming_content).decode().splitlines()
+
+        # 2 alunos × 2 disciplinas × 4 bimestres, inclusive sem nota lançada
+        self.assertEqual(linhas[0], 'Ano;Turma;Turno;Disciplina;Professor;Aluno;CPF;Bimestre;Nota')
+        self.assertEqual(len(linhas), 1 + 16)
+        self.assertIn(f'2025;1º A;Manhã;Matemática;Professor 1;Aluno 0001;{self.alunos[0].cpf};1;7,5', linhas)
+        self.assertIn(f'2025;1º A;Manhã;Matemática;Professor 1;Aluno 0001;{self.alunos[0].cpf};2;', linhas)
+        self.assertIn(f'2025;1º A;Manhã;Português;Professor 1;Aluno 0002;{self.alunos[1].cpf};4;', linhas)
+
+    def test_escopo_e_xlsx(self):
+        with self.assertNumQueries(1):
+            linhas = list(linhas_exportacao(disciplina=self.mat.id))
+        self.assertEqual(len(linhas), 1 + 2 * 4)
+
+        resposta = self.client.get(f'/notas/exportar/?turma={self.turma.id}&formato=xlsx')
+        planilha = load_workbook(BytesIO(b''.join(resposta.streaming_content)), read_only=True)
+        self.assertEqual(len(list(planilha.active.iter_rows())), 1 + 16)
+
+
+# ======================== BOLETINS EM PDF ========================
+class BoletinsLoteTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.turma = Turma.objects.create(nome='1º A', ano=2025)
+        self.alunos = [criar_aluno(n, self.turma) for n in range(1, 4)]
+        disciplina = Disciplina.objects.create(nome='Matemática', professor=criar_professor(1), turma=self.turma)
+        Nota.objects.create(aluno=self.alunos[0], disciplina=disciplina, nota1=7.5, nota2=3)
+
+    def test_zip_e_pdf_unico(self):
+        progresso = []
+        saida = BytesIO()
+        total = gerar_boletins(Aluno.objects.filter(turma=self.turma), saida, processos=2,
+                               progresso=lambda prontos, total: progresso.append(prontos))
+
+        self.assertEqual(total, 3)
+        self.assertEqual(progresso, [1, 2, 3])
+        with zipfile.ZipFile(saida) as arquivo:
+            nomes = arquivo.namelist()
+            self.assertEqual(len(nomes), 3)
+            self.assertTrue(all(arquivo.read(nome).startswith(b'%PDF') for nome in nomes))
+
+        boletim = obter_boletim(self.alunos[0])
+        self.assertEqual(boletim_para_pdf(self.alunos[0], boletim)['tabela'][1][2:],
+                         ['7,5', '3,0', '--', '--', '5,2', 'Recuperação'])
+
+        saida = BytesIO()
+        gerar_boletins(Aluno.objects.filter(turma=self.turma), saida, formato='pdf', processos=2)
+        self.assertEqual(len(PdfReader(BytesIO(saida.getvalue())).pages), 3)
+
+    def test_boletins_do_lote_iguais_aos_individuais(self):
+        outra = Turma.objects.create(nome='1º B', ano=2025)
+        aluno = criar_aluno(9, outra)
+        historia = Disciplina.objects.create(nome='História', professor=criar_professor(2), turma=outra)
+        Disciplina.objects.create(nome='Artes', professor=criar_professor(3), turma=outra)
+        Nota.objects.create(aluno=aluno, disciplina=historia, nota1=9, nota2=8, nota3=7, nota4=10)
+        alunos = list(Aluno.objects.order_by('id'))
+
+        with self.assertNumQueries(2):
+            boletins = montar_boletins(alunos)
+        self.assertEqual(boletins, {a.id: montar_boletim(a) for a in alunos})
+
+
+# ======================== GRADE HORÁRIA ========================
+class GradeHorariaTests(TestCase):
+
+    def setUp(self):
+        self.professor, self.outro = criar_professor(1), criar_professor(2)
+        self.turma = Turma.objects.create(nome='1º A', turno='manha', ano=2025)
+        self.vizinha = Turma.objects.create(nome='1º B', turno='manha', ano=2025)
+        self.disciplina = Disciplina.objects.create(nome='Matemática', professor=self.professor, turma=self.turma)
+        self.matematica = Disciplina.objects.create(nome='Matemática', professor=self.professor, turma=self.vizinha)
+        self.historia = Disciplina.objects.create(nome='História', professor=self.outro, turma=self.vizinha)
+        self.client.force_login(User.objects.create(username='su', is_superuser=True))
+
+    def url(self, turma):
+        return f'/turmas/{turma.id}/grade/'
+
+    def opcoes(self, horario, dia='segunda'):
+        resposta = self.client.get(self.url(self.vizinha))
+        coluna = next(c for c in resposta.context['rows'][horario]['cols'] if c['dia'] == dia)
+        return [d.nome for d in coluna['disciplinas']]
+
+    def test_grava_por_id_e_sobrevive_a_renomear(self):
+        resposta = self.client.post(self.url(self.turma), {'segunda_0': self.disciplina.id, 'terca_1': 'x'})
+        self.assertEqual(resposta.status_code, 302)
+        self.assertEqual(
+            list(AulaGrade.objects.values_list('professor_id', 'ano', 'turno', 'dia', 'horario')),
+            [(self.professor.id, 2025, 'manha', 'segunda', 0)],
+        )
+
+        self.disciplina.nome = 'Álgebra'
+        self.disciplina.save()
+        self.assertEqual(formatar_grade(['07:00'], celulas_da_grade(self.turma.id))['07:00']['segunda'], 'Álgebra')
+
+        self.client.post(self.url(self.turma), {})
+        self.assertFalse(AulaGrade.objects.exists())
+
+    def test_choque_de_professor(self):
+        salvar_grade(self.turma, {('segunda', 0): self.disciplina})
+        self.assertEqual(self.opcoes(0), ['História'])
+        self.assertEqual(self.opcoes(1), ['Matemática', 'História'])
+
+        resposta = self.client.post(self.url(self.vizinha), {'segunda_0': self.matematica.id, 'segunda_1': self.historia.id})
+        self.assertContains(resposta, 'Professor já ocupado')
+        self.assertFalse(AulaGrade.objects.filter(turma=self.vizinha).exists())
+
+        # O banco também barra, mesmo sem passar pela conferência
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            AulaGrade.objects.create(turma=self.vizinha, disciplina=self.matematica, professor=self.professor,
+                                     ano=2025, turno='manha', dia='segunda', horario=0)
+
+        # Mesmo índice de horário em outro turno não é choque
+        self.turma.turno = 'tarde'
+        self.turma.save()
+        self.assertEqual(self.opcoes(0), ['Matemática', 'História'])
+        salvar_grade(self.vizinha, {('segunda', 0): self.matematica})
+
+        # ... e a edição da turma não deixa voltar para o turno em que haveria choque
+        resposta = self.client.post(f'/turmas/editar/{self.turma.id}/', {'nome': '1º A', 'turno': 'manha', 'ano': '2025'})
+        self.assertContains(resposta, 'duas aulas no mesmo horário')
+        self.turma.refresh_from_db()
+        self.assertEqual(self.turma.turno, 'tarde')
+
+    def test_turno_com_menos_horarios_remove_aulas_que_sobram(self):
+        salvar_grade(self.turma, {('segunda', 3): self.disciplina, ('segunda', 5): self.disciplina})
+
+        resposta = self.client.post(f'/turmas/editar/{self.turma.id}/', {'nome': '1º A', 'turno': 'noite', 'ano': '2025'})
+        self.assertIn('1 aula(s) da grade ficaram fora dos horários do turno novo',
+                      ' '.join(str(m) for m in get_messages(resposta.wsgi_request)))
+        # A noite tem 4 horários: a aula do 6º horário não fica prendendo o professor
+        self.assertEqual(list(AulaGrade.objects.filter(turma=self.turma).values_list('horario', 'turno')), [(3, 'noite')])
+
+        resposta = self.client.post(f'/turmas/editar/{self.turma.id}/', {'nome': '1º A', 'turno': 'integral', 'ano': '2025'})
+        self.assertContains(resposta, 'Turno inválido.')
+
+    def test_trocar_professor_da_disciplina(self):
+        salvar_grade(self.turma, {('segunda', 0): self.disciplina})
+        salvar_grade(self.vizinha, {('segunda', 0): self.historia})
+
+        url = f'/disciplinas/editar/{self.disciplina.id}/'
+        self.client.post(url, {'nome': 'Matemática', 'professor': self.outro.id})
+        self.disciplina.refresh_from_db()
+        self.assertEqual(self.disciplina.professor_id, self.professor.id)
+
+        self.historia.delete()
+        self.client.post(url, {'nome': 'Matemática', 'professor': self.outro.id})
+        self.assertEqual(AulaGrade.objects.get().professor_id, self.outro.id)
+
+    def test_consultas_nao_crescem_com_as_outras_grades(self):
+        salvar_grade(self.turma, {('segunda', 0): self.disciplina})
+        self.client.get(self.url(self.vizinha))
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.url(self.vizinha))
+        consultas = len(ctx.captured_queries)
+
+        for i in range(10):
+            turma = Turma.objects.create(nome=f'2º {i}', turno='manha', ano=2025)
+            disciplina = Disciplina.objects.create(nome='Física', professor=criar_professor(10 + i), turma=turma)
+            salvar_grade(turma, {(dia, h): disciplina for dia in ('segunda', 'terca') for h in range(6)})
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.url(self.vizinha))
+        self.assertEqual(len(ctx.captured_queries), consultas)
+
+
+class GradeTurmaCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.turma = Turma.objects.create(nome='1º A', turno='noite', ano=2025)
+        self.disciplina = Disciplina.objects.create(nome='Matemática', professor=criar_professor(1), turma=self.turma)
+        salvar_grade(self.turma, {('segunda', 0): self.disciplina})
+
+    def test_formatada_uma_vez_por_versao(self):
+        with self.assertNumQueries(1):
+            grade = obter_grade_turma(self.turma)
+        self.assertEqual(list(grade['grade']), ['19:00 às 19:45', '19:45 às 20:30', '20:40 às 21:25', '21:25 às 22:00'])
+        self.assertEqual(grade['grade']['19:00 às 19:45']['segunda'], 'Matemática')
+        self.assertIn('<td>Matemática</td>', grade['html'])
+
+        # Os alunos da turma usam a mesma tabela
+        for n in range(1, 4):
+            self.client.force_login(criar_aluno(n, self.turma).user)
+            with self.assertNumQueries(0):
+                obter_grade_turma(self.turma)
+            self.assertContains(self.client.get('/painel/aluno/'), '<td>Matemática</td>', html=True)
+
+        self.disciplina.nome = 'Álgebra'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.disciplina.save()
+        self.assertEqual(obter_grade_turma(self.turma)['grade']['19:00 às 19:45']['segunda'], 'Álgebra')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            salvar_grade(self.turma, {('terca', 1): self.disciplina})
+        grade = obter_grade_turma(self.turma)['grade']
+        self.assertEqual((grade['19:00 às 19:45']['segunda'], grade['19:45 às 20:30']['terca']), ('', 'Álgebra'))
+
+        self.turma.turno = 'manha'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.turma.save()
+        self.assertEqual(len(obter_grade_turma(self.turma)['grade']), 6)
+
+
+class SemanaProfessorTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.professor, self.outro = criar_professor(1), criar_professor(2)
+        self.manha = Turma.objects.create(nome='1º A', turno='manha', ano=2025)
+        self.noite = Turma.objects.create(nome='3º N', turno='noite', ano=2025)
+        self.passada = Turma.objects.create(nome='1º A', turno='manha', ano=2024)
+        self.matematica = Disciplina.objects.create(nome='Matemática', professor=self.professor, turma=self.manha)
+        self.historia = Disciplina.objects.create(nome='História', professor=self.outro, turma=self.manha)
+        self.fisica = Disciplina.objects.create(nome='Física', professor=self.professor, turma=self.noite)
+        antiga = Disciplina.objects.create(nome='Antiga', professor=self.professor, turma=self.passada)
+        salvar_grade(self.manha, {('segunda', 1): self.matematica, ('terca', 0): self.historia})
+        salvar_grade(self.noite, {('sexta', 0): self.fisica})
+        salvar_grade(self.passada, {('segunda', 0): antiga})
+
+    def semana(self):
+        return obter_semana(self.professor.id, 2025)
+
+    def test_todas_as_turmas_numa_consulta_e_cache(self):
+        with self.assertNumQueries(1):
+            semana = self.semana()
+        self.assertEqual(semana['total_aulas'], 2)
+        self.assertEqual([t['turno'] for t in semana['semana']], ['Manhã', 'Noite'])
+        manha = semana['semana'][0]['linhas']
+        self.assertIsNone(manha[0]['aulas'][0])
+        self.assertEqual(manha[1]['aulas'][0], {'turma_id': self.manha.id, 'turma': '1º A', 'disciplina': 'Matemática'})
+        self.assertEqual(semana['semana'][1]['linhas'][0]['aulas'][4]['disciplina'], 'Física')
+
+        with self.assertNumQueries(0):
+            self.semana()
+
+        # Grade sem disciplina do professor não invalida
+        outra = Turma.objects.create(nome='2º B', turno='tarde', ano=2025)
+        geografia = Disciplina.objects.create(nome='Geografia', professor=self.outro, turma=outra)
+        with self.captureOnCommitCallbacks(execute=True):
+            salvar_grade(outra, {('segunda', 0): geografia})
+        with self.assertNumQueries(0):
+            self.semana()
+
+        # Grade com disciplina dele, renomear a disciplina ou a turma, sim
+        with self.captureOnCommitCallbacks(execute=True):
+            salvar_grade(self.manha, {('segunda', 1): self.matematica, ('quarta', 1): self.matematica})
+        self.assertEqual(self.semana()['total_aulas'], 3)
+
+        self.fisica.nome = 'Química'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fisica.save()
+        self.assertEqual(self.semana()['semana'][1]['linhas'][0]['aulas'][4]['disciplina'], 'Química')
+
+        self.noite.nome = '3º M'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.noite.save()
+        self.assertEqual(self.semana()['semana'][1]['linhas'][0]['aulas'][4]['turma'], '3º M')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fisica.delete()
+        self.assertEqual(self.semana()['total_aulas'], 2)
+
+    def test_view(self):
+        self.client.force_login(self.professor.user)
+        resposta = self.client.get('/professor/semana/?ano=2025')
+        self.assertContains(resposta, 'Matemática')
+        self.assertContains(resposta, 'Física')
+        self.assertNotContains(resposta, 'História')
+        self.assertNotContains(resposta, 'Antiga')
+
+        resposta = self.client.get(f'/professor/turma/{self.manha.id}/grade/')
+        self.assertContains(resposta, 'minha-disciplina', count=1)
+        self.assertContains(resposta, 'História')
+
+
+class GeradorGradesTests(TestCase):
+    horarios = {'manha': 6, 'tarde': 6, 'noite': 4}
+
+    def test_escola_sintetica_sem_choques(self):
+        turmas, disciplinas = gerar_escola(12, 18, self.horarios, semente=1)
+        grades, folga = resolver(turmas, disciplinas, self.horarios)
+        self.assertEqual(conferir(turmas, disciplinas, grades), [])
+        self.assertEqual(folga, 0)
+
+        # Cada disciplina espalhada: no máximo ceil(aulas / 5) por dia
+        por_dia = {}
+        for celulas in grades.values():
+            for (dia, _), disciplina_id in celulas.items():
+                por_dia[(disciplina_id, dia)] = por_dia.get((disciplina_id, dia), 0) + 1
+        aulas = {d[0]: d[3] for d in disciplinas}
+        self.assertTrue(all(n <= -(-aulas[d] // 5) for (d, _), n in por_dia.items()))
+
+    def test_ultimo_nivel_sempre_resolve_e_carga_demais_falha(self):
+        # Turno cheio: 4 turmas × 20 horários com 4 professores a 100%
+        turmas = {t: 'noite' for t in range(4)}
+        disciplinas = [(t * 4 + p, t, (t + p) % 4, 5) for t in range(4) for p in range(4)]
+        busca = Busca(disciplinas, 4, semente=0)
+        self.assertEqual(conferir(turmas, disciplinas, busca.resolver(NIVEIS[-1], 1, 1)), [])
+
+        disciplinas.append((99, 0, 0, 1))
+        with self.assertRaisesMessage(SemSolucao, 'Turma 0: 21 aulas semanais para 20 horários.'):
+            resolver(turmas, disciplinas, self.horarios, rotulos={('turma', 0): 'Turma 0'})
+
+    def test_visualizar_e_aplicar(self):
+        professores = [criar_professor(n) for n in range(1, 4)]
+        turmas = [Turma.objects.create(nome=f'1º {letra}', turno='noite', ano=2025) for letra in 'AB']
+        for turma in turmas:
+            for i, professor in enumerate(professores):
+                Disciplina.objects.create(nome=f'Disciplina {i}', professor=professor, turma=turma, aulas_semanais=5)
+        outra = Turma.objects.create(nome='1º A', turno='noite', ano=2024)
+        antiga = Disciplina.objects.create(nome='Antiga', professor=professores[0], turma=outra)
+        salvar_grade(outra, {('segunda', 0): antiga})
+        salvar_grade(turmas[0], {('sexta', 3): Disciplina.objects.filter(turma=turmas[0]).first()})
+
+        self.client.force_login(User.objects.create(username='su', is_superuser=True))
+        url = '/turmas/gerar-grades/?ano=2025'
+
+        resposta = self.client.post(url, {'acao': 'aplicar'})
+        self.assertContains(resposta, 'Visualize as grades antes de aplicar.')
+
+        resposta = self.client.post(url, {'acao': 'visualizar'})
+        self.assertEqual(len(resposta.context['previa']), 2)
+        self.assertEqual(AulaGrade.objects.filter(ano=2025).count(), 1)
+        previa = self.client.session[SESSAO_PREVIA_GRADES]
+        mostrada = {int(t): {(dia, h): d for dia, h, d in celulas} for t, celulas in previa['grades'].items()}
+
+        self.assertEqual(self.client.post(url, {'acao': 'aplicar'}).status_code, 302)
+        gravada = {turma.id: {} for turma in turmas}
+        for aula in AulaGrade.objects.filter(ano=2025):
+            gravada[aula.turma_id][(aula.dia, aula.horario)] = aula.disciplina_id
+        self.assertEqual(gravada, mostrada)
+        self.assertEqual(AulaGrade.objects.filter(ano=2025).count(), 30)
+        self.assertEqual(AulaGrade.objects.filter(ano=2024).count(), 1)
+        for turma in turmas:
+            self.assertEqual(
+                sum(1 for dia, _ in celulas_da_grade(turma.id) if dia == 'segunda'), 3
+            )
+
+    def test_turno_fora_do_padrao(self):
+        professor = criar_professor(1)
+        for nome, turno in (('1º A', 'Manhã'), ('1º B', 'manha')):
+            turma = Turma.objects.create(nome=nome, turno=turno, ano=2025)
+            Disciplina.objects.create(nome='Matemática', professor=professor, turma=turma, aulas_semanais=15)
+        self.client.force_login(User.objects.create(username='su', is_superuser=True))
+        url = '/turmas/gerar-grades/?ano=2025'
+
+        # Mesmo turno escrito de dois jeitos: o professor não pode ter choque entre as duas turmas
+        resposta = self.client.post(url, {'acao': 'visualizar'})
+        self.assertEqual(len(resposta.context['previa']), 2)
+        self.client.post(url, {'acao': 'aplicar'})
+        ocupados = list(AulaGrade.objects.values_list('dia', 'horario'))
+        self.assertEqual(len(ocupados), 30)
+        self.assertEqual(len(set(ocupados)), 30)
+
+        Turma.objects.create(nome='1º C', turno='integral', ano=2025)
+        resposta = self.client.post(url, {'acao': 'visualizar'})
+        self.assertIsNone(resposta.context['previa'])
+        self.assertContains(resposta, 'Turno desconhecido nas turmas 1º C (&quot;integral&quot;)')
+
+    def test_aplicar_recusa_previa_desatualizada(self):
+        professores = [criar_professor(n) for n in range(1, 3)]
+        turma = Turma.objects.create(nome='1º A', turno='noite', ano=2025)
+        disciplinas = [
+            Disciplina.objects.create(nome=f'Disciplina {i}', professor=p, turma=turma, aulas_semanais=4)
+            for i, p in enumerate(professores)
+        ]
+        self.client.force_login(User.objects.create(username='su', is_superuser=True))
+        url = '/turmas/gerar-grades/?ano=2025'
+
+        self.client.post(url, {'acao': 'visualizar'})
+        disciplinas[0].aulas_semanais = 6
+        disciplinas[0].save()
+
+        resposta = self.client.post(url, {'acao': 'aplicar'})
+        self.assertContains(resposta, 'mudaram depois da prévia')
+        self.assertFalse(AulaGrade.objects.filter(ano=2025).exists())
+        self.assertNotIn(SESSAO_PREVIA_GRADES, self.client.session)
@@ -20,7 +20,9 @@ urlpatterns = [
     path('turma/<int:turma_id>/disciplinas/', views.disciplinas_turma, name='disciplinas_turma'),
     # NOVA: Visualizar grade horária da turma
     path('professor/turma/<int:turma_id>/grade/', views.visualizar_grade_professor, name='visualizar_grade_professor'),
+    path('professor/semana/', views.minha_semana, name='minha_semana'),
     path('lancar-nota/<int:disciplina_id>/', views.lancar_nota, name='lancar_nota'),
+    path('lancar-nota/<int:disciplina_id>/autosave/', views.lancar_nota_autosave, name='lancar_nota_autosave'),
 
 
     #Discentes
@@ -53,6 +55,12 @@ urlpatterns = [
     path('turmas/editar/<int:turma_id>/', views.editar_turma, name='editar_turma'),
     path('turmas/excluir/<int:turma_id>/', views.excluir_turma, name='excluir_turma'),
 
+    # Importação e análise de notas (gestão)
+    path('notas/importar/', views.importar_notas, name='importar_notas'),
+    path('notas/exportar/', views.exportar_notas, name='exportar_notas'),
+    path('analise/notas/', views.analise_notas, name='analise_notas'),
+    path('analise/notas.json', views.analise_notas_json, name='analise_notas_json'),
+
     # Gestores
     path('painel/gestor/', views.painel_super, name='painel_gestor'),
     path('gestores/', views.listar_gestores, name='listar_gestores'),
@@ -88,8 +96,10 @@ urlpatterns = [
     path("editar/perfil/remover-foto/", views.remover_foto_perfil, name="remover_foto_perfil"),
 
     path("turmas/<int:turma_id>/grade/", views.grade_horaria, name="grade_horaria"),
+    path("turmas/gerar-grades/", views.gerar_grades, name="gerar_grades"),
 
     path("usuarios/", views.usuarios, name="usuarios"),
+    path("busca/", views.busca_global, name="busca_global"),
 ]
 
 
@@ -3,41 +3,57 @@ from django.contrib.auth import authenticate, login, logout, update_session_auth
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.models import User
 from django.contrib import messages
-from .models import Professor, Aluno, Disciplina, Turma, Nota, Gestor
+from .models import SITUACOES, Professor, Aluno, Disciplina, Turma, Nota, Gestor
 from .forms import (
     LoginForm, ProfessorForm, AlunoForm, DisciplinaForm, TurmaForm,
-    NotaForm, EditarPerfilForm, GestorForm
+    NotaForm, EditarPerfilForm, GestorForm, ImportarNotasForm
+)
+from .anos import anos_com_turmas, escolher_ano
+from .boletim import obter_boletim
+from .busca import filtrar_por_busca, resultados_typeahead
+from .distribuicao import distribuicao_notas
+from .escrita import escrita_imediata
+from .exportacao import gerar_csv, gerar_xlsx, linhas_exportacao
+from .gerador_grade import SemSolucao
+from .grade import (
+    DIAS, HORARIOS, NOMES_DIAS, SESSAO_PREVIA_GRADES, GradeInvalida, aplicar_previa, aulas_fora_do_turno,
+    celulas_da_grade, choques, formatar_grade, gerar_grades_ano, guardar_previa, horarios_do_turno,
+    horarios_ocupados, impressao_do_ano, obter_grade_turma, obter_semana, salvar_grade,
+)
+from .importacao import ImportacaoInvalida, importar_planilha, ler_linhas
+from .lancamento import ler_anteriores, ler_celulas_json, ler_formulario_notas, salvar_celulas, salvar_notas
+from .paginacao import ler_tamanho, paginar_por_chave
+from .perfil import carregar_perfil, pode_lancar_notas, perfil_passes_test
+from .estatisticas import (
+    CONTADORES_DISCIPLINA, ORDENACOES_CARGA, com_carga, com_indicadores, progresso_disciplina,
+    estatisticas_professor, obter_resumo_ano,
 )
 from datetime import datetime
 import calendar
+import json
 from django.contrib.auth.decorators import user_passes_test
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
+from django.utils.http import urlencode
+from django.views.decorators.http import require_POST
 
 
 # ======================== LOGIN / LOGOUT ========================
 def login_view(request):
-    if request.user.is_authenticated:
-        if request.user.is_superuser:
-            return redirect('painel_super')
-        elif hasattr(request.user, 'professor'):
-            return redirect('painel_professor')
-        elif hasattr(request.user, 'aluno'):
-            return redirect('painel_aluno')
-        elif hasattr(request.user, 'gestor'):
-            return redirect('painel_super')
+    if request.user.is_authenticated and request.perfil.painel:
+        return redirect(request.perfil.painel)
 
     if request.method == 'POST':
         form = LoginForm(request.POST)
         if form.is_valid():
             user = form.get_user()
             login(request, user)
-            if user.is_superuser:
-                return redirect('painel_super')
-            elif hasattr(user, 'professor'):
-                return redirect('painel_professor')
-            elif hasattr(user, 'aluno'):
-                return redirect('painel_aluno')
-            elif hasattr(user, 'gestor'):
-                return redirect('painel_super') 
+
+            # O perfil lazy foi montado para o usuário anônimo → recarrega
+            request.perfil = carregar_perfil(user)
+            if request.perfil.painel:
+                return redirect(request.perfil.painel)
     else:
         form = LoginForm()
 
@@ -75,56 +91,31 @@ def gerar_calendario():
 
 
 # ========================== SUPERUSUÁRIO ========================
-def is_superuser(user):
-    return user.is_superuser
+def is_superuser(perfil):
+    return perfil.is_superuser
 
-def is_super_ou_gestor(user):
-    return user.is_superuser or hasattr(user, 'gestor')
+def is_super_ou_gestor(perfil):
+    return perfil.is_superuser or perfil.is_gestor
 
 
 @login_required
-@user_passes_test(is_super_ou_gestor)
+@perfil_passes_test(is_super_ou_gestor)
 def painel_super(request):
-    foto_perfil_url = get_foto_perfil(request.user)
-    ano_atual = datetime.now().year
-
-    #  FILTRO DE ANO
-    # Busca todos os anos disponíveis das turmas
-    anos_disponiveis_qs = Turma.objects.values_list('ano', flat=True).distinct().order_by('-ano')
-
-    anos_disponiveis = list(anos_disponiveis_qs)
-    
-    # Se não houver turmas, adiciona o ano atual
-    if not anos_disponiveis:
-        anos_disponiveis = [ano_atual]
-    
-    # Pega o ano do filtro (GET) ou usa o ano atual
-    ano_filtro = request.GET.get('ano')
-    try:
-        ano_filtro = int(ano_filtro) if ano_filtro else ano_atual
-    except ValueError:
-        ano_filtro = ano_atual
-    
-    # Garante que o ano_filtro existe na lista
-    if ano_filtro not in anos_disponiveis:
-        anos_disponiveis.append(ano_filtro)
-        anos_disponiveis.sort(reverse=True)
+    foto_perfil_url = request.perfil.foto_url
+    #  FILTRO DE ANO (anos com turmas vêm do cache)
+    ano_filtro, anos_disponiveis = escolher_ano(request)
 
-    # Contagem para turmas do ano filtrado (em vez de ano_atual)
-    turmas_ano_filtrado = Turma.objects.filter(ano=ano_filtro)
-
-    total_turmas = turmas_ano_filtrado.count()
-    total_alunos = Aluno.objects.filter(turma__in=turmas_ano_filtrado).distinct().count()
-    total_professores = Professor.objects.filter(disciplina__turma__in=turmas_ano_filtrado).distinct().count()
-    total_disciplinas = Disciplina.objects.filter(turma__in=turmas_ano_filtrado).distinct().count()
+    # Contadores do ano filtrado (uma linha, mantida pelos signals)
+    resumo = obter_resumo_ano(ano_filtro)
 
     return render(request, "superusuario/painel_super.html", {
         "usuario": request.user,
-        "nome_exibicao": get_nome_exibicao(request.user),
-        "total_professores": total_professores,
-        "total_alunos": total_alunos,
-        "total_turmas": total_turmas,
-        "total_disciplinas": total_disciplinas,
+        "nome_exibicao": request.perfil.nome_exibicao,
+        "total_professores": resumo.total_professores,
+        "total_alunos": resumo.total_alunos,
+        "total_turmas": resumo.total_turmas,
+        "total_disciplinas": resumo.total_disciplinas,
+        "total_notas_lancadas": resumo.total_notas_lancadas,
         "foto_perfil_url": foto_perfil_url,
         "agora": datetime.now(),
         "calendario": gerar_calendario(),
@@ -136,11 +127,10 @@ def painel_super(request):
 def usuarios(request):
     pode_ver_gestores = False
 
-    if request.user.is_superuser:
+    if request.perfil.is_superuser:
+        pode_ver_gestores = True
+    elif request.perfil.cargo in ('diretor', 'vice_diretor'):
         pode_ver_gestores = True
-    elif hasattr(request.user, 'gestor'):
-        if request.user.gestor.cargo in ('diretor', 'vice_diretor'):
-            pode_ver_gestores = True
 
     return render(request, "core/usuarios.html", {
         "pode_ver_gestores": pode_ver_gestores
@@ -156,15 +146,8 @@ from django.shortcuts import render, redirect
 def editar_perfil(request):
     user = request.user
 
-    # Detecta perfil associado
-    perfil = None
-    if hasattr(user, "professor"):
-        perfil = user.professor
-    elif hasattr(user, "aluno"):
-        perfil = user.aluno
-    elif hasattr(user, "gestor"):
-        perfil = user.gestor
-    # superusuário pode não ter perfil e está ok
+    # Perfil associado (superusuário pode não ter perfil e está ok)
+    perfil = request.perfil.objeto
 
     if request.method == "POST":
         form = EditarPerfilForm(request.POST, instance=user)
@@ -199,16 +182,7 @@ def editar_perfil(request):
             # ====================================
             # 🔁 Redirecionamento
             # ====================================
-            if user.is_superuser:
-                return redirect("painel_super")
-            if hasattr(user, "professor"):
-                return redirect("painel_professor")
-            if hasattr(user, "aluno"):
-                return redirect("painel_aluno")
-            if hasattr(user, "gestor"):
-                return redirect("painel_super")
-
-            return redirect("login")
+            return redirect(request.perfil.painel or "login")
 
         else:
             # Erros do form (senha, email, etc.)
@@ -224,56 +198,18 @@ def editar_perfil(request):
         "form": form,
         "perfil": perfil,
         "foto_atual": foto_atual,
-        "foto_perfil_url": get_foto_perfil(user),
+        "foto_perfil_url": request.perfil.foto_url,
     })
 
 
 
 
-def get_foto_perfil(user):
-    # Professor
-    try:
-        if hasattr(user, "professor") and user.professor.foto:
-            return user.professor.foto.url
-    except:
-        pass
-
-    # Aluno
-    try:
-        if hasattr(user, "aluno") and user.aluno.foto:
-            return user.aluno.foto.url
-    except:
-        pass
-
-    # Gestor
-    try:
-        if hasattr(user, "gestor") and user.gestor.foto:
-            return user.gestor.foto.url
-    except:
-        pass
-
-    # SUPERSUÁRIO
-    try:
-        if hasattr(user, "superperfil") and user.superperfil.foto:
-            return user.superperfil.foto.url
-    except:
-        pass
-
-    return None
-
-
 @login_required
 def remover_foto_perfil(request):
     user = request.user
 
-    # detecta perfil (professor, aluno ou gestor)
-    perfil = None
-    if hasattr(user, "professor"):
-        perfil = user.professor
-    elif hasattr(user, "aluno"):
-        perfil = user.aluno
-    elif hasattr(user, "gestor"):
-        perfil = user.gestor
+    # perfil (professor, aluno ou gestor)
+    perfil = request.perfil.objeto
 
     if not perfil:
         messages.error(request, "Nenhum perfil associado ao usuário.")
@@ -288,33 +224,29 @@ def remover_foto_perfil(request):
     messages.success(request, "Foto removida com sucesso!")
     return redirect("editar_perfil")
 
-def get_nome_exibicao(user):
-    if hasattr(user, 'gestor'):
-        return user.gestor.nome_completo
-
-    if hasattr(user, 'professor'):
-        return user.professor.nome_completo
-
-    if hasattr(user, 'aluno'):
-        return user.aluno.nome_completo
-
-    # Superusuário
-    nome = f"{user.first_name} {user.last_name}".strip()
-    if nome:
-        return nome
-
-    # Último fallback (nunca deveria acontecer)
-    return user.email
-
-
-
 # ========================== PROFESSORES ==========================
 @login_required
-@user_passes_test(lambda u: u.is_superuser or hasattr(u, 'gestor'))
+@perfil_passes_test(lambda p: p.is_superuser or p.is_gestor)
 def listar_professores(request):
+    """Professores com a carga no ano (disciplinas, turmas, aulas, alunos), ordenáveis por carga"""
     query = request.GET.get('q', '')
-    professores = Professor.objects.filter(nome_completo__icontains=query) if query else Professor.objects.all()
-    return render(request, 'core/listar_professores.html', {'professores': professores, 'query': query})
+    ordem = request.GET.get('ordem', 'nome')
+    if ordem not in ORDENACOES_CARGA:
+        ordem = 'nome'
+    ano_filtro, anos_disponiveis = escolher_ano(request)
+
+    professores = Professor.objects.select_related('user')
+    if query:
+        professores = filtrar_por_busca(professores, 'professor', query)
+    professores = com_carga(professores, ano_filtro).order_by(*ORDENACOES_CARGA[ordem])
+
+    return render(request, 'core/listar_professores.html', {
+        'professores': professores,
+        'query': query,
+        'ordem': ordem,
+        'ano_filtro': ano_filtro,
+        'anos_disponiveis': anos_disponiveis,
+    })
 
 
 from django.contrib.auth.decorators import login_required, user_passes_test
@@ -325,7 +257,7 @@ from .models import Professor
 
 
 @login_required
-@user_passes_test(lambda u: u.is_superuser or hasattr(u, 'gestor'))
+@perfil_passes_test(lambda p: p.is_superuser or p.is_gestor)
 def cadastrar_professor(request):
     if request.method == 'POST':
         form = ProfessorForm(request.POST, request.FILES, request=request)
@@ -350,7 +282,7 @@ def cadastrar_professor(request):
 
 
 @login_required
-@user_passes_test(lambda u: u.is_superuser or hasattr(u, 'gestor'))
+@perfil_passes_test(lambda p: p.is_superuser or p.is_gestor)
 def editar_professor(request, professor_id):
     professor = get_object_or_404(Professor, id=professor_id)
     
@@ -372,7 +304,7 @@ def editar_professor(request, professor_id):
 
 
 @login_required
-@user_passes_test(lambda u: u.is_superuser or hasattr(u, 'gestor'))
+@perfil_passes_test(lambda p: p.is_superuser or p.is_gestor)
 def excluir_professor(request, professor_id):
     professor = get_object_or_404(Professor, id=professor_id)
     professor.user.delete()
@@ -385,7 +317,7 @@ def excluir_professor(request, professor_id):
 
 
 @login_required
-@user_passes_test(lambda u: u.is_superuser)
+@perfil_passes_test(is_superuser)
 def cadastrar_gestor(request):
     if request.method == 'POST':
         form = GestorForm(request.POST, request.FILES, request=request)
@@ -413,14 +345,17 @@ def cadastrar_gestor(request):
 
 
 @login_required
-@user_passes_test(lambda u: u.is_superuser)
+@perfil_passes_test(is_superuser)
 def listar_gestores(request):
+    query = request.GET.get('q', '')
     gestores = Gestor.objects.select_related('user').all()
-    return render(request, 'core/listar_gestores.html', {'gestores': gestores})
+    if query:
+        gestores = filtrar_por_busca(gestores, 'gestor', query)
+    return render(request, 'core/listar_gestores.html', {'gestores': gestores, 'query': query})
 
 
 @login_required
-@user_passes_test(lambda u: u.is_superuser)
+@perfil_passes_test(is_superuser)
 def excluir_gestor(request, gestor_id):
     gestor = get_object_or_404(Gestor, id=gestor_id)
     gestor.user.delete()
@@ -436,7 +371,7 @@ from .forms import GestorForm
 from .models import Gestor
 
 @login_required
-@user_passes_test(lambda u: u.is_superuser)
+@perfil_passes_test(is_superuser)
 def editar_gestor(request, gestor_id):
     gestor = get_object_or_404(Gestor, id=gestor_id)
     user = gestor.user
@@ -467,15 +402,58 @@ def editar_gestor(request, gestor_id):
 
 # ========================== ALUNO =========================
 @login_required
-@user_passes_test(lambda u: u.is_superuser or hasattr(u, 'gestor'))
+@perfil_passes_test(lambda p: p.is_superuser or p.is_gestor)
 def listar_alunos(request):
+    """Alunos em páginas por chave (nome, id), com filtro de ano e turma.
+
+    Sempre as mesmas consultas (a página, com usuário e turma juntos, e as
+    turmas do filtro), qualquer que seja o total de alunos ou a página.
+    """
     query = request.GET.get('q', '')
-    alunos = Aluno.objects.filter(nome_completo__icontains=query) if query else Aluno.objects.all()
-    return render(request, 'core/listar_alunos.html', {'alunos': alunos, 'query': query})
+    ano = request.GET.get('ano', '')
+    turma_id = request.GET.get('turma', '')
+    tamanho = ler_tamanho(request.GET.get('tamanho'))
+
+    alunos = Aluno.objects.select_related('user', 'turma').only(
+        'nome_completo', 'user__email', 'turma__nome', 'turma__ano',
+    )
+    if query:
+        # Índice de busca: sem acento, por prefixo, também por CPF e e-mail
+        alunos = filtrar_por_busca(alunos, 'aluno', query)
+
+    ano = int(ano) if ano.isdigit() else None
+    turma_id = int(turma_id) if turma_id.isdigit() else None
+    turmas = []
+    if ano:
+        alunos = alunos.filter(turma__ano=ano)
+        turmas = list(Turma.objects.filter(ano=ano).order_by('nome', 'id').values('id', 'nome'))
+    if turma_id:
+        alunos = alunos.filter(turma_id=turma_id)
+
+    pagina = paginar_por_chave(alunos, ['nome_completo', 'id'], request.GET.get('cursor'), tamanho)
+
+    # Filtros repetidos nos links de página
+    filtros = urlencode({
+        chave: valor for chave, valor in
+        {'q': query, 'ano': ano, 'turma': turma_id, 'tamanho': request.GET.get('tamanho') and tamanho}.items()
+        if valor
+    })
+
+    return render(request, 'core/listar_alunos.html', {
+        'alunos': pagina['itens'],
+        'proxima': pagina['proxima'],
+        'anterior': pagina['anterior'],
+        'filtros': filtros,
+        'query': query,
+        'ano_filtro': ano,
+        'anos_disponiveis': anos_com_turmas(),
+        'turma_filtro': turma_id,
+        'turmas': turmas,
+    })
 
 
 @login_required
-@user_passes_test(lambda u: u.is_superuser or hasattr(u, 'gestor'))
+@perfil_passes_test(lambda p: p.is_superuser or p.is_gestor)
 def cadastrar_aluno(request):
     if request.method == 'POST':
         form = AlunoForm(request.POST, request.FILES, request=request)
@@ -498,7 +476,7 @@ def cadastrar_aluno(request):
     return render(request, 'core/cadastrar_aluno.html', {'form': form})
 
 @login_required
-@user_passes_test(lambda u: u.is_superuser or hasattr(u, 'gestor'))
+@perfil_passes_test(lambda p: p.is_superuser or p.is_gestor)
 def editar_aluno(request, aluno_id):
     aluno = get_object_or_404(Aluno, id=aluno_id)
 
@@ -531,7 +509,7 @@ def editar_aluno(request, aluno_id):
 
 
 @login_required
-@user_passes_test(lambda u: u.is_superuser or hasattr(u, 'gestor'))
+@perfil_passes_test(lambda p: p.is_superuser or p.is_gestor)
 def excluir_aluno(request, aluno_id):
     aluno = get_object_or_404(Aluno, id=aluno_id)
     aluno.user.delete()
@@ -561,27 +539,26 @@ def visualizar_disciplinas(request, disciplina_id):
     # - gestor
     # - professor da disciplina
     if not (
-        request.user.is_superuser or
-        hasattr(request.user, 'gestor') or
-        (hasattr(request.user, 'professor') and disciplina.professor == request.user.professor)
+        request.perfil.is_superuser or
+        request.perfil.is_gestor or
+        (request.perfil.is_professor and disciplina.professor_id == request.perfil.professor.id)
     ):
         messages.error(request, 'Você não tem permissão para visualizar esta disciplina.')
         return redirect('login')
     
     turma = disciplina.turma
     alunos = Aluno.objects.filter(turma=turma).order_by('nome_completo')
-    notas = Nota.objects.filter(disciplina=disciplina)
-    notas_dict = { 
-        nota.aluno.id: nota
-        for nota in Nota.objects.filter(disciplina=disciplina) 
-    }
+    # Média e situação já vêm calculadas do banco
+    notas = Nota.objects.filter(disciplina=disciplina).com_media()
+    notas_dict = {nota.aluno_id: nota for nota in notas}
 
     context = {
         "disciplina": disciplina,
         "turma": turma,
         "alunos": alunos,
         "notas": notas,
-        "notas_dict": notas_dict
+        "notas_dict": notas_dict,
+        "situacoes": SITUACOES,
     }
 
     return render(request, 'core/visualizar_disciplinas.html', context)
@@ -589,8 +566,18 @@ def visualizar_disciplinas(request, disciplina_id):
 
 
 
+def ler_aulas_semanais(dados, padrao=2):
+    """Campo "aulas por semana" dos formulários de disciplina; None se inválido"""
+    valor = (dados.get('aulas_semanais') or '').strip()
+    if not valor:
+        return padrao
+    if not valor.isdigit() or int(valor) > 30:
+        return None
+    return int(valor)
+
+
 @login_required
-@user_passes_test(lambda u: u.is_superuser or hasattr(u, 'gestor') )
+@perfil_passes_test(lambda p: p.is_superuser or p.is_gestor)
 
 def editar_disciplina(request, disciplina_id):
    
@@ -598,17 +585,28 @@ def editar_disciplina(request, disciplina_id):
     disciplina = get_object_or_404(Disciplina, id=disciplina_id)
 
     if request.method == 'POST':
-        disciplina.nome = request.POST['nome']
-        disciplina.professor = get_object_or_404(
+        professor = get_object_or_404(
             Professor,
             id=request.POST['professor']
         )
-        disciplina.save()
 
-        return redirect(
-            'listar_disciplinas_turma',
-            turma_id=disciplina.turma.id
-        )
+        aulas_semanais = ler_aulas_semanais(request.POST, padrao=disciplina.aulas_semanais)
+
+        # O novo professor não pode já estar em outra turma nos horários desta disciplina
+        if professor.id != disciplina.professor_id and choques(disciplina.aulas.all(), professor_id=professor.id):
+            messages.error(request, f'{professor.nome_completo} já dá aula em outra turma em algum horário desta disciplina. Ajuste a grade horária antes.')
+        elif aulas_semanais is None:
+            messages.error(request, 'Aulas por semana deve ser um número de 0 a 30.')
+        else:
+            disciplina.nome = request.POST['nome']
+            disciplina.professor = professor
+            disciplina.aulas_semanais = aulas_semanais
+            disciplina.save()
+
+            return redirect(
+                'listar_disciplinas_turma',
+                turma_id=disciplina.turma.id
+            )
 
     professores = Professor.objects.filter(user__is_superuser=False)
 
@@ -624,7 +622,7 @@ def editar_disciplina(request, disciplina_id):
 
 
 @login_required
-@user_passes_test(lambda u: u.is_superuser or hasattr(u, 'gestor'))
+@perfil_passes_test(lambda p: p.is_superuser or p.is_gestor)
 
 def excluir_disciplina(request, disciplina_id):
     disciplina = get_object_or_404(Disciplina, id=disciplina_id)
@@ -643,44 +641,128 @@ from django.contrib.auth.decorators import login_required
 from .models import Turma
 
 @login_required
-@user_passes_test(lambda u: u.is_superuser or hasattr(u, 'gestor'))
+@perfil_passes_test(lambda p: p.is_superuser or p.is_gestor)
 def listar_turmas(request):
-    ano_atual = timezone.localtime(timezone.now()).year
-    query = request.GET.get('q', '').strip()
-
-    # TODOS os anos disponíveis no banco, descendente
-    anos_disponiveis_qs = Turma.objects.values_list('ano', flat=True).distinct().order_by('-ano')
-    anos_disponiveis = list(anos_disponiveis_qs)
+    """Turmas do ano com alunos, disciplinas, grade e notas, em páginas por chave (nome, id).
 
-    # Se não houver turmas no banco, adiciona o ano atual
-    if not anos_disponiveis:
-        anos_disponiveis = [ano_atual]
+    Uma consulta para a página inteira, com os indicadores em subqueries.
+    """
+    query = request.GET.get('q', '').strip()
+    tamanho = ler_tamanho(request.GET.get('tamanho'))
 
     # Filtro do ano
-    ano_filtro = request.GET.get('ano')
-    try:
-        ano_filtro = int(ano_filtro) if ano_filtro else ano_atual
-    except ValueError:
-        ano_filtro = ano_atual
-
-    # Garantir que o ano_filtro existe no banco ou pelo menos no ano atual
-    if ano_filtro not in anos_disponiveis:
-        anos_disponiveis.append(ano_filtro)
-        anos_disponiveis.sort(reverse=True)
+    ano_filtro, anos_disponiveis = escolher_ano(request)
 
     # Filtra as turmas
     turmas = Turma.objects.filter(ano=ano_filtro)
     if query:
         turmas = turmas.filter(nome__icontains=query)
 
+    pagina = paginar_por_chave(com_indicadores(turmas), ['nome', 'id'], request.GET.get('cursor'), tamanho)
+
+    # Filtros repetidos nos links de página
+    filtros = urlencode({
+        chave: valor for chave, valor in
+        {'q': query, 'ano': ano_filtro, 'tamanho': request.GET.get('tamanho') and tamanho}.items()
+        if valor
+    })
+
     return render(request, 'core/listar_turmas.html', {
-        'turmas': turmas,
+        'turmas': pagina['itens'],
+        'proxima': pagina['proxima'],
+        'anterior': pagina['anterior'],
+        'filtros': filtros,
         'query': query,
         'ano_filtro': ano_filtro,
         'anos_disponiveis': anos_disponiveis
     })
 
 
+# ======================== IMPORTAÇÃO DE NOTAS ========================
+@login_required
+@perfil_passes_test(is_super_ou_gestor)
+def importar_notas(request):
+    resultado = None
+
+    if request.method == 'POST':
+        form = ImportarNotasForm(request.POST, request.FILES)
+        if form.is_valid():
+            arquivo = form.cleaned_data['arquivo']
+            try:
+                resultado = importar_planilha(
+                    ler_linhas(arquivo.file, arquivo.name),
+                    form.disciplinas(),
+                    simular=form.cleaned_data['simular'],
+                )
+            except ImportacaoInvalida as e:
+                form.add_error('arquivo', str(e))
+            else:
+                if not resultado['simulacao']:
+                    messages.success(request, f"{resultado['alteradas']} nota(s) importada(s).")
+    else:
+        form = ImportarNotasForm(initial={'turma': request.GET.get('turma')})
+
+    return render(request, 'core/importar_notas.html', {
+        'form': form,
+        'resultado': resultado,
+    })
+
+
+@login_required
+@perfil_passes_test(is_super_ou_gestor)
+def exportar_notas(request):
+    """CSV/XLSX de uma turma (?turma=), disciplina (?disciplina=) ou ano (?ano=)"""
+    escopo = {}
+    for chave in ('turma', 'disciplina', 'ano'):
+        valor = request.GET.get(chave, '')
+        if valor.isdigit():
+            escopo[chave] = int(valor)
+    if not escopo:
+        escopo['ano'] = escolher_ano(request)[0]
+
+    nome = 'notas_' + '_'.join(f'{chave}{valor}' for chave, valor in escopo.items())
+    linhas = linhas_exportacao(**escopo)
+
+    if request.GET.get('formato') == 'xlsx':
+        return FileResponse(gerar_xlsx(linhas), as_attachment=True, filename=f'{nome}.xlsx')
+
+    resposta = StreamingHttpResponse(gerar_csv(linhas), content_type='text/csv; charset=utf-8')
+    resposta['Content-Disposition'] = f'attachment; filename="{nome}.csv"'
+    return resposta
+
+
+# ======================== ANÁLISE DE NOTAS ========================
+@login_required
+@perfil_passes_test(is_super_ou_gestor)
+def analise_notas(request):
+    ano_filtro, anos_disponiveis = escolher_ano(request)
+
+    return render(request, 'core/analise_notas.html', {
+        **distribuicao_notas(ano_filtro),
+        'ano_filtro': ano_filtro,
+        'anos_disponiveis': anos_disponiveis,
+    })
+
+
+@login_required
+@perfil_passes_test(is_super_ou_gestor)
+def analise_notas_json(request):
+    ano_filtro, _ = escolher_ano(request)
+    return JsonResponse(distribuicao_notas(ano_filtro))
+
+
+# ======================== BUSCA GLOBAL ========================
+@login_required
+def busca_global(request):
+    """Typeahead do cabeçalho: pessoas, turmas e disciplinas que o papel pode ver"""
+    termo = request.GET.get('q', '').strip()
+    limite = ler_tamanho(request.GET.get('limite'), padrao=8)
+    return JsonResponse({
+        'q': termo,
+        'resultados': resultados_typeahead(termo, request.perfil, limite=min(limite, 20)),
+    })
+
+
 
 
 from datetime import datetime
@@ -689,7 +771,7 @@ from django.shortcuts import render, redirect
 from .models import Turma
 
 @login_required
-@user_passes_test(lambda u: u.is_superuser or hasattr(u, 'gestor'))
+@perfil_passes_test(lambda p: p.is_superuser or p.is_gestor)
 def cadastrar_turma(request):
 
 
@@ -734,7 +816,7 @@ def cadastrar_turma(request):
 
 
 @login_required
-@user_passes_test(lambda u: u.is_superuser or hasattr(u, 'gestor'))
+@perfil_passes_test(lambda p: p.is_superuser or p.is_gestor)
 def editar_turma(request, turma_id):
     turma = Turma.objects.get(id=turma_id)
     erro = None
@@ -744,14 +826,27 @@ def editar_turma(request, turma_id):
         turno = request.POST.get('turno')
         ano = request.POST.get('ano')
 
+        # Aulas em horários que o turno novo não tem saem da grade ao salvar
+        fora = aulas_fora_do_turno(turma.id, turno) if turno != turma.turno else turma.aulas.none()
+
         if Turma.objects.filter(nome=nome, ano=ano).exclude(id=turma.id).exists():
             erro = 'Já existe outra turma com esse nome neste ano.'
+        elif not horarios_do_turno(turno or ''):
+            erro = 'Turno inválido.'
+        elif (str(turma.ano), turma.turno) != (ano, turno) and choques(
+            turma.aulas.exclude(id__in=fora), ano=int(ano), turno=turno
+        ):
+            erro = 'Com esse ano/turno, professores desta turma ficariam com duas aulas no mesmo horário. Ajuste a grade horária antes.'
         else:
+            removidas = fora.count()
             turma.nome = nome
             turma.turno = turno
             turma.ano = ano
             turma.save()
             messages.success(request, "Turma atualizada com sucesso!")
+            if removidas:
+                messages.warning(request, f"{removidas} aula(s) da grade ficaram fora dos horários do turno novo "
+                                          "e foram removidas; confira a grade horária da turma.")
             return redirect('listar_turmas')
 
     return render(request, 'core/cadastrar_turma.html', {
@@ -762,7 +857,7 @@ def editar_turma(request, turma_id):
 
 
 @login_required
-@user_passes_test(lambda u: u.is_superuser or (hasattr(u, 'gestor') and u.gestor.cargo != 'secretario'))
+@perfil_passes_test(lambda p: p.is_superuser or (p.is_gestor and p.cargo != 'secretario'))
 def excluir_turma(request, turma_id):
 
     turma = get_object_or_404(Turma, id=turma_id)
@@ -774,115 +869,22 @@ def excluir_turma(request, turma_id):
 @login_required
 def painel_professor(request):
     """Tela principal do professor com estatísticas e visão geral"""
-    if not hasattr(request.user, 'professor'):
+    if not request.perfil.is_professor:
         return redirect('login')
     
-    professor = request.user.professor
-    foto_perfil_url = get_foto_perfil(request.user)
-    
-    # Buscar todas as disciplinas do professor
-    disciplinas = Disciplina.objects.filter(professor=professor).select_related('turma')
-    
-    # Anos disponíveis baseados nas turmas onde o professor leciona
-    anos_disponiveis_qs = Turma.objects.filter(
-        disciplina__professor=professor
-    ).values_list('ano', flat=True).distinct().order_by('=ano')
-    anos_disponiveis = list(anos_disponiveis_qs)
-    
-    ano_atual = datetime.now().year
-    
-    if not anos_disponiveis:
-        anos_disponiveis = [ano_atual]
-    
-    # Filtro de ano
-    ano_filtro = request.GET.get('ano')
-    
-    if ano_filtro:
-        # Se veio do GET, usa e salva na sessão
-        try:
-            ano_filtro = int(ano_filtro)
-            request.session['ano_filtro_professor'] = ano_filtro
-        except ValueError:
-            ano_filtro = request.session.get('ano_filtro_professor', ano_atual)
-    else:
-        # Se não veio no GET, tenta pegar da sessão
-        ano_filtro = request.session.get('ano_filtro_professor', ano_atual)
-    
-    if ano_filtro not in anos_disponiveis:
-        anos_disponiveis.append(ano_filtro)
-        anos_disponiveis.sort(reverse=True)
-    
-    # Filtrar disciplinas por ano
-    disciplinas_filtradas = disciplinas.filter(turma__ano=ano_filtro)
-    
-    # ESTATÍSTICAS
-    total_disciplinas = disciplinas_filtradas.count()
-    total_turmas = disciplinas_filtradas.values('turma').distinct().count()
+    professor = request.perfil.professor
+    foto_perfil_url = request.perfil.foto_url
     
-    # Total de alunos (sem duplicatas)
-    alunos_ids = set()
-    for disciplina in disciplinas_filtradas:
-        alunos_turma = Aluno.objects.filter(turma=disciplina.turma).values_list('id', flat=True)
-        alunos_ids.update(alunos_turma)
-    total_alunos = len(alunos_ids)
+    # Anos das turmas onde o professor leciona (ano salvo na sessão)
+    ano_filtro, anos_disponiveis = escolher_ano(request, professor)
     
-    # Notas lançadas vs pendentes
-    total_notas_possiveis = 0
-    total_notas_lancadas = 0
-    
-    for disciplina in disciplinas_filtradas:
-        alunos_disciplina = Aluno.objects.filter(turma=disciplina.turma)
-        total_notas_possiveis += alunos_disciplina.count() * 4
-        
-        notas = Nota.objects.filter(disciplina=disciplina)
-        for nota in notas:
-            if nota.nota1 is not None:
-                total_notas_lancadas += 1
-            if nota.nota2 is not None:
-                total_notas_lancadas += 1
-            if nota.nota3 is not None:
-                total_notas_lancadas += 1
-            if nota.nota4 is not None:
-                total_notas_lancadas += 1
-    
-    # Lista de disciplinas com informações detalhadas
-    disciplinas_detalhadas = []
-    for disciplina in disciplinas_filtradas:
-        alunos_count = Aluno.objects.filter(turma=disciplina.turma).count()
-        notas_disciplina = Nota.objects.filter(disciplina=disciplina)
-        
-        notas_lancadas_disc = 0
-        for nota in notas_disciplina:
-            if nota.nota1 is not None:
-                notas_lancadas_disc += 1
-            if nota.nota2 is not None:
-                notas_lancadas_disc += 1
-            if nota.nota3 is not None:
-                notas_lancadas_disc += 1
-            if nota.nota4 is not None:
-                notas_lancadas_disc += 1
-        
-        notas_possiveis_disc = alunos_count * 4
-        
-        
-
-        disciplinas_detalhadas.append({
-            'disciplina': disciplina,
-            'alunos_count': alunos_count,
-            'notas_lancadas': notas_lancadas_disc,
-            'notas_possiveis': notas_possiveis_disc,
-            'percentual': int((notas_lancadas_disc / notas_possiveis_disc * 100) if notas_possiveis_disc > 0 else 0)
-        })
+    # ESTATÍSTICAS (consultas agregadas, independem do nº de disciplinas)
+    estatisticas = estatisticas_professor(professor, ano_filtro)
     
     return render(request, 'core/painel_professor.html', {
         'professor': professor,
         'nome_exibicao': professor.nome_completo,
-        'total_disciplinas': total_disciplinas,
-        'total_turmas': total_turmas,
-        'total_alunos': total_alunos,
-        'total_notas_lancadas': total_notas_lancadas,
-        'total_notas_possiveis': total_notas_possiveis,
-        'disciplinas_detalhadas': disciplinas_detalhadas,
+        **estatisticas,
         'foto_perfil_url': foto_perfil_url,
         'agora': datetime.now(),
         'calendario': gerar_calendario(),
@@ -899,45 +901,19 @@ def painel_professor(request):
 @login_required
 def disciplinas_professor(request):
     """Lista todas as turmas onde o professor leciona com filtro de ano"""
-    if not hasattr(request.user, 'professor'):
+    if not request.perfil.is_professor:
         return redirect('login')
     
-    professor = request.user.professor
-    foto_perfil_url = get_foto_perfil(request.user)
+    professor = request.perfil.professor
+    foto_perfil_url = request.perfil.foto_url
     
     # Busca turmas onde o professor tem disciplinas
     turmas_ids = Disciplina.objects.filter(
         professor=professor
     ).values_list('turma_id', flat=True).distinct()
     
-    # Anos disponíveis
-    anos_disponiveis_qs = Turma.objects.filter(
-        id__in=turmas_ids
-    ).values_list('ano', flat=True).distinct().order_by('=ano')
-    anos_disponiveis = list(anos_disponiveis_qs)
-    
-    ano_atual = datetime.now().year
-    
-    if not anos_disponiveis:
-        anos_disponiveis = [ano_atual]
-    
-    # 🔥 LÓGICA DO FILTRO COM SESSÃO
-    ano_filtro = request.GET.get('ano')
-    
-    if ano_filtro:
-        # Se veio do GET, usa e salva na sessão
-        try:
-            ano_filtro = int(ano_filtro)
-            request.session['ano_filtro_professor'] = ano_filtro
-        except ValueError:
-            ano_filtro = request.session.get('ano_filtro_professor', ano_atual)
-    else:
-        # Se não veio no GET, tenta pegar da sessão
-        ano_filtro = request.session.get('ano_filtro_professor', ano_atual)
-    
-    if ano_filtro not in anos_disponiveis:
-        anos_disponiveis.append(ano_filtro)
-        anos_disponiveis.sort(reverse=True)
+    # 🔥 FILTRO DE ANO COM SESSÃO
+    ano_filtro, anos_disponiveis = escolher_ano(request, professor)
     
     # Filtrar turmas por ano
     turmas = Turma.objects.filter(
@@ -980,12 +956,12 @@ def disciplinas_professor(request):
 @login_required
 def disciplinas_turma(request, turma_id):
     """Mostra as disciplinas que o professor leciona em uma turma específica"""
-    if not hasattr(request.user, 'professor'):
+    if not request.perfil.is_professor:
         return redirect('login')
     
-    professor = request.user.professor
+    professor = request.perfil.professor
     turma = get_object_or_404(Turma, id=turma_id)
-    foto_perfil_url = get_foto_perfil(request.user)
+    foto_perfil_url = request.perfil.foto_url
     
     # Busca apenas as disciplinas do professor nesta turma
     disciplinas = Disciplina.objects.filter(
@@ -999,31 +975,7 @@ def disciplinas_turma(request, turma_id):
         return redirect('minhas_turmas')
     
     # Informações detalhadas de cada disciplina
-    disciplinas_detalhadas = []
-    for disciplina in disciplinas:
-        alunos_count = Aluno.objects.filter(turma=turma).count()
-        notas_disciplina = Nota.objects.filter(disciplina=disciplina)
-        
-        notas_lancadas_disc = 0
-        for nota in notas_disciplina:
-            if nota.nota1 is not None:
-                notas_lancadas_disc += 1
-            if nota.nota2 is not None:
-                notas_lancadas_disc += 1
-            if nota.nota3 is not None:
-                notas_lancadas_disc += 1
-            if nota.nota4 is not None:
-                notas_lancadas_disc += 1
-        
-        notas_possiveis_disc = alunos_count * 4
-        
-        disciplinas_detalhadas.append({
-            'disciplina': disciplina,
-            'alunos_count': alunos_count,
-            'notas_lancadas': notas_lancadas_disc,
-            'notas_possiveis': notas_possiveis_disc,
-            'percentual': int((notas_lancadas_disc / notas_possiveis_disc * 100) if notas_possiveis_disc > 0 else 0)
-        })
+    disciplinas_detalhadas = [progresso_disciplina(disciplina) for disciplina in disciplinas]
     
     return render(request, 'core/disciplinas_turma.html', {
         'turma': turma,
@@ -1035,10 +987,10 @@ def disciplinas_turma(request, turma_id):
 @login_required
 def visualizar_grade_professor(request, turma_id):
     """Visualização da grade horária para o professor (somente leitura)"""
-    if not hasattr(request.user, 'professor'):
+    if not request.perfil.is_professor:
         return redirect('login')
     
-    professor = request.user.professor
+    professor = request.perfil.professor
     turma = get_object_or_404(Turma, id=turma_id)
     
     # Verifica se o professor leciona nesta turma
@@ -1051,274 +1003,162 @@ def visualizar_grade_professor(request, turma_id):
         messages.error(request, 'Você não leciona nenhuma disciplina nesta turma.')
         return redirect('disciplinas_professor')
     
-    # Pegar horários do turno
-    turno_key = turma.turno.lower().replace("ã", "a").replace("á", "a")
-    
-    HORARIOS = {
-        "manha": [
-            "07:00 às 07:45",
-            "07:45 às 08:30",
-            "08:50 às 09:35",
-            "09:35 às 10:20",
-            "10:30 às 11:15",
-            "11:15 às 12:00",
-        ],
-        "tarde": [
-            "13:00 às 13:45",
-            "13:45 às 14:30",
-            "14:50 às 15:35",
-            "15:35 às 16:20",
-            "16:30 às 17:15",
-            "17:15 às 18:00",
-        ],
-        "noite": [
-            "19:00 às 19:45",
-            "19:45 às 20:30",
-            "20:40 às 21:25",
-            "21:25 às 22:00",
-        ],
-    }
-    
-    horarios = HORARIOS.get(turno_key, [])
-    grade_formatada = None
-    
-    try:
-        grade_obj = GradeHorario.objects.get(turma=turma)
-        
-        if horarios and grade_obj.dados:
-            grade_formatada = {}
-            
-            for i, horario in enumerate(horarios):
-                segunda = grade_obj.dados.get('segunda', [])[i] if i < len(grade_obj.dados.get('segunda', [])) else ""
-                terca = grade_obj.dados.get('terca', [])[i] if i < len(grade_obj.dados.get('terca', [])) else ""
-                quarta = grade_obj.dados.get('quarta', [])[i] if i < len(grade_obj.dados.get('quarta', [])) else ""
-                quinta = grade_obj.dados.get('quinta', [])[i] if i < len(grade_obj.dados.get('quinta', [])) else ""
-                sexta = grade_obj.dados.get('sexta', [])[i] if i < len(grade_obj.dados.get('sexta', [])) else ""
-                
-                grade_formatada[horario] = {
-                    'segunda': segunda,
-                    'terca': terca,
-                    'quarta': quarta,
-                    'quinta': quinta,
-                    'sexta': sexta,
-                }
-                
-    except GradeHorario.DoesNotExist:
-        grade_formatada = None
+    grade_formatada = obter_grade_turma(turma)['grade']
     
     return render(request, 'core/visualizar_grade_professor.html', {
         'turma': turma,
         'grade_horario': grade_formatada,
         'disciplinas_professor': disciplinas_prof,
+        'minhas_disciplinas': {d.nome for d in disciplinas_prof},
     })
 
+@login_required
+def minha_semana(request):
+    """Semana do professor: aulas de todas as turmas do ano escolhido"""
+    if not request.perfil.is_professor:
+        return redirect('login')
+
+    professor = request.perfil.professor
+    ano_filtro, anos_disponiveis = escolher_ano(request, professor)
+
+    return render(request, 'core/minha_semana.html', {
+        **obter_semana(professor.id, ano_filtro),
+        'nomes_dias': NOMES_DIAS,
+        'anos_disponiveis': anos_disponiveis,
+        'ano_filtro': ano_filtro,
+    })
+
+
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404, redirect, render
 
 @login_required
-@user_passes_test(lambda u: u.is_superuser or hasattr(u, 'gestor') or hasattr(u, 'professor'))
-
+@perfil_passes_test(lambda p: p.is_superuser or p.is_gestor or p.is_professor)
+@escrita_imediata
 def lancar_nota(request, disciplina_id):
-    disciplina = get_object_or_404(Disciplina, id=disciplina_id)
+    disciplina = get_object_or_404(Disciplina.objects.select_related('turma'), id=disciplina_id)
 
-    # FORÇA queryset de MODEL (sem values)
-    alunos = Aluno.objects.filter(turma_id=disciplina.turma_id).order_by('nome_completo')
+    if not pode_lancar_notas(request.perfil, disciplina):
+        messages.error(request, 'Você não tem permissão para lançar notas nesta disciplina.')
+        return redirect('login')
 
-    # DEBUG no terminal (pra provar que tem id)
-    if alunos.exists():
-        a0 = alunos.first()
-        print("DEBUG ALUNO:", type(a0), "id=", a0.id, "pk=", a0.pk, "nome=", a0.nome_completo)
+    alunos = Aluno.objects.filter(turma_id=disciplina.turma_id).order_by('nome_completo')
+    erros = {}
 
     if request.method == 'POST':
-        for aluno in alunos:
-            nota_obj, _ = Nota.objects.get_or_create(
-                aluno_id=aluno.pk,
-                disciplina_id=disciplina.id
-            )
-
-            for i in range(1, 5):
-                campo = f'nota{i}_{aluno.pk}'
-                valor = request.POST.get(campo, '').strip()
-
-                if valor == '':
-                    continue
-
-                try:
-                    valor_float = float(valor.replace(',', '.'))
-                except ValueError:
-                    messages.error(request, f'Nota inválida: "{valor}" para {aluno.nome_completo} (B{i}).')
-                    continue
-
-                setattr(nota_obj, f'nota{i}', valor_float)
-
-            nota_obj.save()
-
-        messages.success(request, 'Notas salvas com sucesso!')
-        return redirect('lancar_nota', disciplina_id=disciplina.id)
+        # Lê o formulário inteiro, mas grava só as células que mudaram (em lote)
+        # e não sobrescreve o que outra pessoa mudou depois que a tela abriu
+        celulas, erros = ler_formulario_notas(request.POST, alunos)
+        alteradas, conflitos = salvar_notas(disciplina, celulas, ler_anteriores(request.POST, alunos))
+
+        for conflito in conflitos:
+            atual = 'vazio' if conflito['atual'] is None else conflito['atual']
+            erros.setdefault(conflito['aluno_id'], {})[conflito['bimestre']] = {
+                'valor': request.POST.get(f"nota{conflito['bimestre']}_{conflito['aluno_id']}", '').strip(),
+                'mensagem': f'alterada por outra pessoa enquanto você editava; valor atual: {atual}',
+            }
+
+        if not erros:
+            messages.success(request, 'Notas salvas com sucesso!')
+            return redirect('lancar_nota', disciplina_id=disciplina.id)
+
+        disciplina.refresh_from_db(fields=CONTADORES_DISCIPLINA)
+        total_erros = sum(len(e) for e in erros.values())
+        messages.error(
+            request,
+            f'{total_erros} nota(s) não foram salvas (inválidas ou alteradas por outra pessoa); '
+            f'as demais alterações ({alteradas}) foram gravadas. Confira as células destacadas.'
+        )
 
-    notas_dict = {n.aluno_id: n for n in Nota.objects.filter(disciplina_id=disciplina.id)}
+    notas_dict = {n.aluno_id: n for n in Nota.objects.filter(disciplina_id=disciplina.id).com_media()}
 
     return render(request, 'core/lancar_nota.html', {
         'disciplina': disciplina,
         'alunos': alunos,
         'notas_dict': notas_dict,
+        'erros': erros,
     })
 
 
+@login_required
+@require_POST
+@escrita_imediata
+def lancar_nota_autosave(request, disciplina_id):
+    """Autosave da tela de notas: grava só as células enviadas (JSON)"""
+    disciplina = get_object_or_404(Disciplina.objects.select_related('turma'), id=disciplina_id)
+
+    if not pode_lancar_notas(request.perfil, disciplina):
+        return JsonResponse({'erro': 'Você não tem permissão para lançar notas nesta disciplina.'}, status=403)
+
+    try:
+        brutas = json.loads(request.body)['celulas']
+        if not isinstance(brutas, list):
+            raise TypeError
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'erro': 'Envie {"celulas": [...]} em JSON.'}, status=400)
+
+    alunos_ids = set(Aluno.objects.filter(turma_id=disciplina.turma_id).values_list('id', flat=True))
+    celulas, erros = ler_celulas_json(brutas, alunos_ids)
+    salvas, conflitos = salvar_celulas(disciplina, celulas)
+
+    # Contadores já acertados no banco → devolve o progresso atualizado
+    disciplina.refresh_from_db(fields=CONTADORES_DISCIPLINA)
+
+    # Médias das linhas que mudaram, para a tela não esperar o recarregamento
+    medias = dict(
+        Nota.objects.filter(disciplina=disciplina, aluno_id__in={c['aluno_id'] for c in salvas})
+        .com_media().values_list('aluno_id', 'media_anual')
+    )
+
+    return JsonResponse({
+        'salvas': salvas,
+        'conflitos': conflitos,
+        'erros': erros,
+        'medias': medias,
+        'progresso': {
+            **{campo: getattr(disciplina, campo) for campo in CONTADORES_DISCIPLINA},
+            'notas_lancadas': disciplina.notas_lancadas,
+            'notas_possiveis': disciplina.notas_possiveis,
+            'percentual': disciplina.percentual_lancado,
+        },
+    })
+
 
 from datetime import datetime
 import calendar
 
-# Horários por turno
-HORARIOS = {
-    "manha": [
-        "07:00 às 07:45",
-        "07:45 às 08:30",
-        "08:50 às 09:35",
-        "09:35 às 10:20",
-        "10:30 às 11:15",
-        "11:15 às 12:00",
-    ],
-    "tarde": [
-        "13:00 às 13:45",
-        "13:45 às 14:30",
-        "14:50 às 15:35",
-        "15:35 às 16:20",
-        "16:30 às 17:15",
-        "17:15 às 18:00",
-    ],
-    "noite": [
-        "19:00 às 19:45",
-        "19:45 às 20:30",
-        "20:40 às 21:25",
-        "21:25 às 22:00",
-    ],
-}
-
 
 @login_required
 def painel_aluno(request):
-    if not hasattr(request.user, 'aluno'):
+    if not request.perfil.is_aluno:
         return redirect('login')
 
-    aluno = request.user.aluno
-    disciplinas = Disciplina.objects.filter(turma=aluno.turma)
-    
-    disciplinas_com_notas = []
-    soma_medias = 0
-    total_disciplinas_com_media = 0
-    total_notas_lancadas = 0
-    total_notas_possiveis = disciplinas.count() * 4
-    
-    # LÓGICA DA SITUAÇÃO GERAL
-    tem_reprovacao = False
-    tem_recuperacao = False
-    todas_aprovadas = True
-    
-    for disciplina in disciplinas:
-        nota = Nota.objects.filter(aluno=aluno, disciplina=disciplina).first()
-        
-        if nota:
-            if nota.nota1 is not None:
-                total_notas_lancadas += 1
-            if nota.nota2 is not None:
-                total_notas_lancadas += 1
-            if nota.nota3 is not None:
-                total_notas_lancadas += 1
-            if nota.nota4 is not None:
-                total_notas_lancadas += 1
-        
-        disciplinas_com_notas.append({
-            "disciplina": disciplina,
-            "nota": nota
-        })
-        
-        if nota and nota.media:
-            soma_medias += nota.media
-            total_disciplinas_com_media += 1
-            
-            if nota.media < 4:
-                tem_reprovacao = True
-                todas_aprovadas = False
-            elif nota.media < 6:
-                tem_recuperacao = True
-                todas_aprovadas = False
-        else:
-            todas_aprovadas = False
-    
-    media_geral = soma_medias / total_disciplinas_com_media if total_disciplinas_com_media > 0 else None
-
-    # SITUAÇÃO GERAL
-    if total_notas_lancadas == total_notas_possiveis and total_notas_possiveis > 0:
-        if tem_reprovacao:
-            situacao_geral = "Reprovado"
-            situacao_classe = "reprovado"
-        elif tem_recuperacao:
-            situacao_geral = "Recuperação"
-            situacao_classe = "recuperacao"
-        elif todas_aprovadas:
-            situacao_geral = "Aprovado"
-            situacao_classe = "aprovado"
-        else:
-            situacao_geral = "=="
-            situacao_classe = ""
-    else:
-        situacao_geral = "=="
-        situacao_classe = ""
+    aluno = request.perfil.aluno
+
+    # Boletim (uma consulta, cacheado por aluno)
+    boletim = obter_boletim(aluno)
 
     # ========================================
     # GRADE HORÁRIA = FORMATADA PARA O ALUNO
     # ========================================
-    grade_formatada = None
-    
-    try:
-        grade_obj = GradeHorario.objects.get(turma=aluno.turma)
-        
-        # Pegar horários do turno correto
-        turno_key = aluno.turma.turno.lower().replace("ã", "a").replace("á", "a")
-        horarios = HORARIOS.get(turno_key, [])
-        
-        if horarios and grade_obj.dados:
-            grade_formatada = {}
-            
-            # Para cada horário, pegar as disciplinas de cada dia
-            for i, horario in enumerate(horarios):
-                segunda = grade_obj.dados.get('segunda', [])[i] if i < len(grade_obj.dados.get('segunda', [])) else ""
-                terca = grade_obj.dados.get('terca', [])[i] if i < len(grade_obj.dados.get('terca', [])) else ""
-                quarta = grade_obj.dados.get('quarta', [])[i] if i < len(grade_obj.dados.get('quarta', [])) else ""
-                quinta = grade_obj.dados.get('quinta', [])[i] if i < len(grade_obj.dados.get('quinta', [])) else ""
-                sexta = grade_obj.dados.get('sexta', [])[i] if i < len(grade_obj.dados.get('sexta', [])) else ""
-                
-                grade_formatada[horario] = {
-                    'segunda': segunda,
-                    'terca': terca,
-                    'quarta': quarta,
-                    'quinta': quinta,
-                    'sexta': sexta,
-                }
-                
-    except GradeHorario.DoesNotExist:
-        grade_formatada = None
+    # Mesma tabela (e HTML) para toda a turma, em cache até a grade mudar
+    grade = obter_grade_turma(aluno.turma)
 
     calendario = gerar_calendario()
     agora = datetime.now()
 
     return render(request, 'core/painel_aluno.html', {
         "aluno": aluno,
-        "disciplinas_com_notas": disciplinas_com_notas,
-        "media_geral": media_geral,
-        "total_notas_lancadas": total_notas_lancadas,
-        "total_notas_possiveis": total_notas_possiveis,
-        "situacao_geral": situacao_geral,
-        "situacao_classe": situacao_classe,
-        "grade_horario": grade_formatada,  # ← agora formatada corretamente
+        **boletim,
+        "grade_horario": grade["grade"],
+        "grade_html": grade["html"],
         "calendario": calendario,
         "agora": agora,
     })
 
 @login_required
-@user_passes_test(lambda u: u.is_superuser or hasattr(u, 'gestor'))
+@perfil_passes_test(lambda p: p.is_superuser or p.is_gestor)
 def cadastrar_disciplina_para_turma(request, turma_id):
 
     turma = get_object_or_404(Turma, id=turma_id)
@@ -1326,9 +1166,12 @@ def cadastrar_disciplina_para_turma(request, turma_id):
     if request.method == 'POST':
         nome = request.POST.get('nome')
         professor_id = request.POST.get('professor')
+        aulas_semanais = ler_aulas_semanais(request.POST)
 
         if not nome or not professor_id:
             messages.error(request, "Preencha todos os campos.")
+        elif aulas_semanais is None:
+            messages.error(request, "Aulas por semana deve ser um número de 0 a 30.")
         else:
             professor = get_object_or_404(Professor, id=professor_id)
 
@@ -1338,7 +1181,8 @@ def cadastrar_disciplina_para_turma(request, turma_id):
                 Disciplina.objects.create(
                     nome=nome,
                     professor=professor,
-                    turma=turma
+                    turma=turma,
+                    aulas_semanais=aulas_semanais,
                 )
                 messages.success(request, "Disciplina cadastrada com sucesso!")
                 return redirect('listar_disciplinas_turma', turma_id=turma.id)
@@ -1354,12 +1198,12 @@ def cadastrar_disciplina_para_turma(request, turma_id):
 
 
 @login_required
-@user_passes_test(lambda u: u.is_superuser or hasattr(u, 'gestor'))
+@perfil_passes_test(lambda p: p.is_superuser or p.is_gestor)
 def listar_disciplinas_turma(request, turma_id):
     turma = get_object_or_404(Turma, id=turma_id)
 
     query = request.GET.get("q", "")
-    disciplinas = Disciplina.objects.filter(turma=turma)
+    disciplinas = Disciplina.objects.filter(turma=turma).select_related('professor').order_by('nome', 'id')
 
     if query:
         disciplinas = disciplinas.filter(nome__icontains=query)
@@ -1371,142 +1215,58 @@ def listar_disciplinas_turma(request, turma_id):
     })
 
 
-# helper para pegar foto do usuário de forma segura
-def get_foto_perfil(user):
-    # Professor
-    try:
-        if hasattr(user, "professor") and user.professor.foto:
-            return user.professor.foto.url
-    except:
-        pass
-
-    # Aluno
-    try:
-        if hasattr(user, "aluno") and user.aluno.foto:
-            return user.aluno.foto.url
-    except:
-        pass
-
-    # Gestor
-    try:
-        if hasattr(user, "gestor") and user.gestor.foto:
-            return user.gestor.foto.url
-    except:
-        pass
-
-    return None
-
-
-
-from .models import GradeHorario
-
-from .models import GradeHorario
-from django.contrib import messages
-from django.shortcuts import render, get_object_or_404, redirect
-from django.contrib.auth.decorators import login_required
-
-
-
-
-from .models import GradeHorario
 from django.contrib import messages
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 
-HORARIOS = {
-    "manha": [
-        "07:00 às 07:45",
-        "07:45 às 08:30",
-        "08:50 às 09:35",
-        "09:35 às 10:20",
-        "10:30 às 11:15",
-        "11:15 às 12:00",
-    ],
-    "tarde": [
-        "13:00 às 13:45",
-        "13:45 às 14:30",
-        "14:50 às 15:35",
-        "15:35 às 16:20",
-        "16:30 às 17:15",
-        "17:15 às 18:00",
-    ],
-    "noite": [
-        "19:00 às 19:45",
-        "19:45 às 20:30",
-        "20:40 às 21:25",
-        "21:25 às 22:00",
-    ],
-}
 
 @login_required
+@escrita_imediata
 def grade_horaria(request, turma_id):
     turma = get_object_or_404(Turma, id=turma_id)
-    grade, criado = GradeHorario.objects.get_or_create(turma=turma)
 
-    dias = ["segunda", "terca", "quarta", "quinta", "sexta"]
-    nomes_dias = ["Segunda", "Terça", "Quarta", "Quinta", "Sexta"]
+    dias = DIAS
+    nomes_dias = NOMES_DIAS
 
-    turno_key = (
-        turma.turno.lower()
-        .replace("ã", "a")
-        .replace("á", "a")
-    )
-
-    horarios = HORARIOS.get(turno_key, [])
+    horarios = horarios_do_turno(turma.turno)
 
     if not horarios:
         messages.error(request, "Turno inválido nesta turma.")
         horarios = [""]
 
-    if not grade.dados:
-        grade.dados = {dia: [""] * len(horarios) for dia in dias}
-        grade.save()
-
-    disciplinas_turma = Disciplina.objects.filter(turma=turma)
+    disciplinas_turma = list(Disciplina.objects.filter(turma=turma).select_related("professor"))
 
     # =============================================================
-    # 1) MAPEAR TODAS AS OCUPAÇÕES DE PROFESSORES
+    # 1) OCUPAÇÕES DOS PROFESSORES DA TURMA (índice, uma consulta)
     # =============================================================
-    ocupados = {}   # {professor_id: {(dia, index)} }
-
-    outras_grades = GradeHorario.objects.exclude(turma=turma)
-
-    for g in outras_grades:
-        for dia in dias:
-            lista = g.dados.get(dia, [])
-            for idx, nome_disciplina in enumerate(lista):
-                if not nome_disciplina:
-                    continue
-
-                try:
-                    disc = Disciplina.objects.get(nome=nome_disciplina, turma=g.turma)
-                except Disciplina.DoesNotExist:
-                    continue
-
-                prof = disc.professor_id
-
-                if prof not in ocupados:
-                    ocupados[prof] = set()
-
-                ocupados[prof].add((dia, idx))
+    # {(professor_id, dia, index)} em outras turmas do mesmo ano e turno
+    ocupados = horarios_ocupados(turma, {d.professor_id for d in disciplinas_turma})
 
     # =============================================================
     # 2) SALVAR (POST)
     # =============================================================
+    # {(dia, index): disciplina_id} da grade atual
+    valores = {chave: disciplina_id for chave, (disciplina_id, _) in celulas_da_grade(turma.id).items()}
+
     if request.method == "POST":
-        new_data = {dia: [] for dia in dias}
+        por_id = {str(d.id): d for d in disciplinas_turma}
+        celulas = {}
 
         for i in range(len(horarios)):
             for dia in dias:
-                campo = f"{dia}_{i}"
-                valor = request.POST.get(campo, "")
-                new_data[dia].append(valor)
-
-        grade.dados = new_data
-        grade.save()
+                valor = request.POST.get(f"{dia}_{i}", "")
+                if valor in por_id:
+                    celulas[(dia, i)] = por_id[valor]
 
-        messages.success(request, "Grade horária atualizada com sucesso!")
-        return redirect("grade_horaria", turma_id=turma.id)
+        try:
+            salvar_grade(turma, celulas)
+        except GradeInvalida as erro:
+            # Mostra de novo o que foi enviado, para corrigir só o choque
+            messages.error(request, str(erro))
+            valores = {chave: d.id for chave, d in celulas.items()}
+        else:
+            messages.success(request, "Grade horária atualizada com sucesso!")
+            return redirect("grade_horaria", turma_id=turma.id)
 
     # =============================================================
     # 3) MONTAR TABELA PARA O TEMPLATE
@@ -1518,11 +1278,8 @@ def grade_horaria(request, turma_id):
 
         for dia in dias:
 
-            # valor atual da célula
-            lista = grade.dados.get(dia, [])
-            valor = ""
-            if isinstance(lista, list) and i < len(lista):
-                valor = lista[i] or ""
+            # valor atual da célula (id da disciplina)
+            valor = valores.get((dia, i))
 
             # =====================================
             # FILTRAR DISCIPLINAS DISPONÍVEIS
@@ -1530,10 +1287,8 @@ def grade_horaria(request, turma_id):
             disciplinas_disponiveis = []
             for d in disciplinas_turma:
 
-                prof_id = d.professor_id
-
                 # se o professor está ocupado neste dia e horário → pula
-                if prof_id in ocupados and (dia, i) in ocupados[prof_id]:
+                if (d.professor_id, dia, i) in ocupados:
                     continue
 
                 disciplinas_disponiveis.append(d)
@@ -1552,3 +1307,67 @@ def grade_horaria(request, turma_id):
         "rows": rows,
         "disciplinas": disciplinas_turma,  # ainda enviado para o loop externo
     })
+
+
+# ======================== GERAÇÃO AUTOMÁTICA DE GRADES ========================
+@login_required
+@perfil_passes_test(is_super_ou_gestor)
+def gerar_grades(request):
+    """Gera as grades de todas as turmas do ano: visualizar antes, aplicar de uma vez"""
+    ano_filtro, anos_disponiveis = escolher_ano(request)
+    previa = None
+
+    if request.method == "POST":
+        horarios_por_turno = {turno: len(horarios) for turno, horarios in HORARIOS.items()}
+
+        if request.POST.get("acao") == "aplicar":
+            # Grava a prévia que o usuário viu, não uma geração nova
+            guardada = request.session.pop(SESSAO_PREVIA_GRADES, None)
+            if not guardada or guardada["ano"] != ano_filtro:
+                messages.error(request, "Visualize as grades antes de aplicar.")
+            else:
+                try:
+                    turmas = aplicar_previa(guardada, horarios_por_turno)
+                except GradeInvalida as erro:
+                    messages.error(request, str(erro))
+                else:
+                    messages.success(request, f"Grades de {len(turmas)} turma(s) de {ano_filtro} aplicadas com sucesso!")
+                    return redirect(f"{request.path}?ano={ano_filtro}")
+        else:
+            # Impressão antes de gerar: se algo mudar no meio, o aplicar recusa
+            impressao = impressao_do_ano(ano_filtro, horarios_por_turno)
+            try:
+                turmas, grades, folga = gerar_grades_ano(ano_filtro, horarios_por_turno)
+            except (SemSolucao, GradeInvalida) as erro:
+                messages.error(request, str(erro))
+            else:
+                request.session[SESSAO_PREVIA_GRADES] = guardar_previa(ano_filtro, impressao, grades)
+
+                if folga != 0:
+                    messages.warning(request, "Não foi possível espalhar todas as disciplinas pela semana: "
+                                              "algumas ficaram com mais aulas no mesmo dia que o ideal.")
+                previa = [
+                    {
+                        "turma": turma,
+                        "grade": formatar_grade(horarios_do_turno(turma.turno), {
+                            chave: (d.id, d) for chave, d in grades.get(turma.id, {}).items()
+                        }),
+                    }
+                    for turma in turmas
+                ]
+
+    turmas_ano = (
+        Turma.objects.filter(ano=ano_filtro)
+        .annotate(aulas_semanais=Coalesce(Sum("disciplina__aulas_semanais"), 0))
+        .order_by("nome", "id")
+    )
+    for turma in turmas_ano:
+        turma.capacidade = len(DIAS) * len(horarios_do_turno(turma.turno))
+
+    return render(request, "core/gerar_grades.html", {
+        "ano_filtro": ano_filtro,
+        "anos_disponiveis": anos_disponiveis,
+        "turmas": turmas_ano,
+        "previa": previa,
+        "nomes_dias": NOMES_DIAS,
+    })
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -54,6 +55,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.PerfilMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -90,6 +92,44 @@ DATABASES = {
     }
 }
 
+# Perfil de produção do SQLite (desligue com SIGE_SQLITE_PRODUCAO=0 para
+# comparar com a configuração padrão, ex. no comando estresse_escrita):
+# - WAL: leituras não esperam a escrita em andamento, e vice-versa;
+# - synchronous=NORMAL: com WAL não corrompe o banco, só pode perder as
+#   últimas transações numa queda de energia, e não faz fsync a cada commit;
+# - timeout: quem encontra o banco travado espera até 20 s pela vez;
+# - mmap_size / cache_size: leitura pela memória mapeada e 64 MB de cache
+#   de páginas por conexão;
+# - IMMEDIATE: toda transação (atomic) já começa com a trava de escrita,
+#   então nada falha ao passar de leitura para escrita no meio dela (ver
+#   core/escrita.py, usado nas views que gravam).
+SQLITE_PRODUCAO = os.environ.get('SIGE_SQLITE_PRODUCAO', '1') != '0'
+
+if SQLITE_PRODUCAO:
+    DATABASES['default']['OPTIONS'] = {
+        'init_command': (
+            'PRAGMA journal_mode=WAL;'
+            'PRAGMA synchronous=NORMAL;'
+            'PRAGMA mmap_size=268435456;'
+            'PRAGMA cache_size=-64000;'
+            'PRAGMA temp_store=MEMORY;'
+        ),
+        'timeout': 20,
+        'transaction_mode': 'IMMEDIATE',
+    }
+
+# Cache compartilhado por todos os processos do servidor: boletins, grades e
+# anos letivos são invalidados trocando uma versão no cache, e a troca feita
+# num processo precisa valer para os outros (o LocMemCache padrão é de cada
+# processo). Em arquivos, na pasta SIGE_CACHE_DIR.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('SIGE_CACHE_DIR', str(BASE_DIR / 'cache')),
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators